@@ -0,0 +1,97 @@
+import asyncio
+import random
+from collections import Counter
+from dataclasses import dataclass
+
+from aiohttp import web
+
+
+@dataclass
+class FakePayhipConfig:
+    latency_ms: float = 80.0       # mean response latency
+    jitter_ms: float = 40.0        # +/- uniform jitter around the mean
+    error_rate: float = 0.0        # fraction of requests answered with a 500
+    rate_limit_rate: float = 0.0   # fraction of requests answered with a 429
+    invalid_rate: float = 0.0      # fraction of verify calls treated as an unknown key (400)
+
+
+class FakePayhip:
+    """
+    Local stand-in for the three Payhip license endpoints the bot calls.
+    Every key that passes validation is a valid, unused license until it is marked used.
+    """
+
+    def __init__(self, cfg: FakePayhipConfig):
+        self.cfg = cfg
+        self.uses = Counter()
+        self.calls = Counter()
+        self.runner = None
+
+    async def _simulate(self, endpoint: str):
+        self.calls[endpoint] += 1
+        delay = self.cfg.latency_ms + random.uniform(-self.cfg.jitter_ms, self.cfg.jitter_ms)
+        await asyncio.sleep(max(0.0, delay) / 1000)
+        roll = random.random()
+        if roll < self.cfg.rate_limit_rate:
+            self.calls[f"{endpoint}:429"] += 1
+            return web.json_response({"error": "Too many requests"}, status=429, headers={"Retry-After": "1"})
+        if roll < self.cfg.rate_limit_rate + self.cfg.error_rate:
+            self.calls[f"{endpoint}:500"] += 1
+            return web.json_response({"error": "Internal error"}, status=500)
+        return None
+
+    async def verify(self, request):
+        if (failure := await self._simulate("verify")) is not None:
+            return failure
+        key = request.query.get("license_key", "")
+        if not key or random.random() < self.cfg.invalid_rate:
+            return web.json_response({"error": "License key not found"}, status=400)
+        return web.json_response({"data": {"license_key": key, "enabled": True, "uses": self.uses[key]}})
+
+    async def usage(self, request):
+        if (failure := await self._simulate("usage")) is not None:
+            return failure
+        key = (await request.post()).get("license_key", "")
+        self.uses[key] += 1
+        return web.json_response({"data": {"license_key": key, "enabled": True, "uses": self.uses[key]}})
+
+    async def decrease(self, request):
+        if (failure := await self._simulate("decrease")) is not None:
+            return failure
+        key = (await request.post()).get("license_key", "")
+        self.uses[key] = max(0, self.uses[key] - 1)
+        return web.json_response({"data": {"license_key": key, "enabled": True, "uses": self.uses[key]}})
+
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/v2/license/verify", self.verify)
+        app.router.add_put("/api/v2/license/usage", self.usage)
+        app.router.add_put("/api/v2/license/decrease", self.decrease)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8899) -> str:
+        self.runner = web.AppRunner(self.create_app())
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        return f"http://{host}:{port}/api/v2"
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+
+
+if __name__ == "__main__":
+    # Standalone mode, for pointing a real bot instance at it via PAYHIP_API_URL.
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run a local fake of the Payhip license API.")
+    parser.add_argument("--port", type=int, default=8899)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    fake = FakePayhip(FakePayhipConfig(
+        latency_ms=args.latency_ms, error_rate=args.error_rate, rate_limit_rate=args.rate_limit_rate
+    ))
+    web.run_app(fake.create_app(), host="127.0.0.1", port=args.port)
@@ -0,0 +1,287 @@
+"""
+Stand-ins for the disnake objects the cogs and handlers touch, so slash commands, buttons
+and modals can be driven in-process without a gateway connection.
+
+Every response, followup and member/channel REST call is recorded on the interaction (or
+channel) with its offset from interaction creation, and can be delayed by a simulated REST
+latency configured per guild.
+"""
+import asyncio
+import datetime
+import itertools
+import time
+from types import SimpleNamespace
+
+_ids = itertools.count(10_000_000)
+
+
+def next_id() -> int:
+    return next(_ids)
+
+
+class FakeRole:
+    def __init__(self, name: str, position: int = 1, role_id: int | None = None):
+        self.id = role_id or next_id()
+        self.name = name
+        self.position = position
+
+    @property
+    def mention(self):
+        return f"<@&{self.id}>"
+
+    def is_default(self) -> bool:
+        return self.name == "@everyone"
+
+    def __ge__(self, other):
+        return self.position >= other.position
+
+    def __eq__(self, other):
+        return isinstance(other, FakeRole) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeMember:
+    def __init__(self, guild: "FakeGuild", name: str, member_id: int | None = None):
+        self.id = member_id or next_id()
+        self.name = name
+        self.guild = guild
+        self.roles = []
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    @property
+    def top_role(self):
+        return max(self.roles, key=lambda r: r.position, default=self.guild.default_role)
+
+    def __str__(self):
+        return self.name
+
+    async def add_roles(self, *roles, reason=None):
+        await self.guild.rest()
+        for role in roles:
+            if role not in self.roles:
+                self.roles.append(role)
+
+    async def remove_roles(self, *roles, reason=None):
+        await self.guild.rest()
+        self.roles = [r for r in self.roles if r not in roles]
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.rest()
+
+
+class FakeChannel:
+    def __init__(self, guild: "FakeGuild", name: str, channel_id: int | None = None):
+        self.id = channel_id or next_id()
+        self.name = name
+        self.guild = guild
+        self.sent = []
+
+    @property
+    def mention(self):
+        return f"<#{self.id}>"
+
+    def permissions_for(self, member):
+        return SimpleNamespace(send_messages=True, view_channel=True, embed_links=True)
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.rest()
+        self.sent.append({"content": content, **kwargs})
+
+
+class FakeGuild:
+    def __init__(self, name: str, guild_id: int | None = None, *, rest_latency: float = 0.0):
+        self.id = guild_id or next_id()
+        self.name = name
+        self.rest_latency = rest_latency
+        self.default_role = FakeRole("@everyone", position=0, role_id=self.id)
+        self.roles = [self.default_role]
+        self.members = {}
+        self.channels = {}
+        self.owner = self.add_member("owner")
+        self.owner_id = self.owner.id
+        self.me = self.add_member("KeyVerify")
+        self.me.roles.append(self.add_role("KeyVerify", position=100))
+
+    async def rest(self):
+        # Simulated Discord REST round trip for anything that would hit the API.
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+
+    def add_role(self, name: str, position: int = 1) -> FakeRole:
+        role = FakeRole(name, position)
+        self.roles.append(role)
+        return role
+
+    def add_member(self, name: str) -> FakeMember:
+        member = FakeMember(self, name)
+        self.members[member.id] = member
+        return member
+
+    def add_channel(self, name: str) -> FakeChannel:
+        channel = FakeChannel(self, name)
+        self.channels[channel.id] = channel
+        return channel
+
+    def get_role(self, role_id: int):
+        return next((r for r in self.roles if r.id == role_id), None)
+
+    def get_member(self, member_id: int):
+        return self.members.get(member_id)
+
+    def get_channel(self, channel_id: int):
+        return self.channels.get(channel_id)
+
+    async def create_role(self, name: str, reason=None) -> FakeRole:
+        await self.rest()
+        return self.add_role(name)
+
+    async def leave(self):
+        await self.rest()
+
+
+class FakeHTTP:
+    """The slice of disnake's HTTPClient the role scheduler uses, routed to the fake guilds."""
+
+    def __init__(self, bot: "FakeBot"):
+        self._bot = bot
+
+    def _member_and_role(self, guild_id, user_id, role_id):
+        guild = self._bot.get_guild(guild_id)
+        return guild.get_member(user_id), guild.get_role(role_id)
+
+    async def add_role(self, guild_id, user_id, role_id, *, reason=None):
+        member, role = self._member_and_role(guild_id, user_id, role_id)
+        await member.add_roles(role, reason=reason)
+
+    async def remove_role(self, guild_id, user_id, role_id, *, reason=None):
+        member, role = self._member_and_role(guild_id, user_id, role_id)
+        await member.remove_roles(role, reason=reason)
+
+
+class FakeBot:
+    def __init__(self, *guilds: FakeGuild):
+        self.guilds = list(guilds)
+        self.http = FakeHTTP(self)
+
+    def get_guild(self, guild_id: int):
+        return next((g for g in self.guilds if g.id == guild_id), None)
+
+    async def wait_until_ready(self):
+        return
+
+
+class FakeResponse:
+    def __init__(self, inter: "FakeInteraction"):
+        self._inter = inter
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _ack(self, kind: str, **kwargs):
+        if self._done:
+            raise RuntimeError("Interaction has already been responded to.")
+        self._done = True
+        await self._inter.record(kind, kwargs)
+
+    async def send_message(self, content=None, **kwargs):
+        await self._ack("send_message", content=content, **kwargs)
+
+    async def defer(self, **kwargs):
+        await self._ack("defer", **kwargs)
+
+    async def send_modal(self, modal):
+        await self._ack("send_modal", modal=modal)
+
+    async def edit_message(self, content=None, **kwargs):
+        await self._ack("edit_message", content=content, **kwargs)
+
+
+class FakeFollowup:
+    def __init__(self, inter: "FakeInteraction"):
+        self._inter = inter
+
+    async def send(self, content=None, **kwargs):
+        await self._inter.record("followup", {"content": content, **kwargs})
+
+
+class FakeInteraction:
+    """The surface shared by every interaction type the bot handles."""
+
+    def __init__(self, guild: FakeGuild, author: FakeMember):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.author = author
+        self.user = author
+        self.channel = None
+        self.channel_id = next_id()
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self._created = time.perf_counter()
+        self.calls = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def record(self, kind: str, kwargs: dict):
+        await self.guild.rest()
+        self.calls.append((kind, kwargs, time.perf_counter() - self._created))
+
+    async def edit_original_response(self, content=None, **kwargs):
+        await self.record("edit_original", {"content": content, **kwargs})
+
+    edit_original_message = edit_original_response
+
+    async def original_response(self):
+        return SimpleNamespace(edit=self.edit_original_response, attachments=[])
+
+    original_message = original_response
+
+    async def send(self, content=None, **kwargs):
+        if self.response.is_done():
+            await self.followup.send(content, **kwargs)
+        else:
+            await self.response.send_message(content, **kwargs)
+
+    def time_to_ack(self) -> float | None:
+        kinds = {"send_message", "defer", "send_modal", "edit_message"}
+        return next((t for kind, _, t in self.calls if kind in kinds), None)
+
+    def last_content(self) -> str | None:
+        for _, kwargs, _ in reversed(self.calls):
+            if kwargs.get("content"):
+                return kwargs["content"]
+        return None
+
+
+class FakeMessageInteraction(FakeInteraction):
+    """Button clicks and select menus; `values` is what a select submitted."""
+
+    def __init__(self, guild: FakeGuild, author: FakeMember, *, values=None, custom_id: str = ""):
+        super().__init__(guild, author)
+        self.data = {"values": values or [], "custom_id": custom_id}
+        self.values = values or []
+
+
+class FakeModalInteraction(FakeInteraction):
+    def __init__(self, guild: FakeGuild, author: FakeMember, *, text_values: dict):
+        super().__init__(guild, author)
+        self.text_values = text_values
+        self.data = {"values": []}
+
+
+class FakeApplicationCommandInteraction(FakeInteraction):
+    def __init__(self, guild: FakeGuild, author: FakeMember, *, command: str, options: dict | None = None):
+        super().__init__(guild, author)
+        self.application_command = SimpleNamespace(name=command, qualified_name=command)
+        self.options = options or {}
+        self.data = {"name": command, "options": self.options}
+
+
+async def invoke_slash(cog, command_name: str, inter: FakeApplicationCommandInteraction, **kwargs):
+    """Call a cog's slash command callback directly, bypassing disnake's option parsing."""
+    command = getattr(cog, command_name)
+    await command.callback(cog, inter, **kwargs)
@@ -0,0 +1,62 @@
+"""Shared setup for the benchmarks: a query-counting pool and synthetic guild data."""
+import os
+
+from cryptography.fernet import Fernet
+
+# utils.encryption refuses to run without a key.
+os.environ.setdefault("ENCRYPTION_KEYS", Fernet.generate_key().decode())
+
+import asyncpg
+
+from utils import database
+from utils.encryption import encrypt_data
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, record):
+        self.count += 1
+
+
+async def connect_bench_database(pool_size: int = 10) -> QueryCounter:
+    """
+    Run the normal schema setup, then swap the shared pool for one whose connections
+    count every statement they execute.
+    """
+    await database.initialize_database()
+    counter = QueryCounter()
+
+    async def _init(conn):
+        conn.add_query_logger(counter)
+
+    await database.database_pool.close()
+    database.database_pool = await asyncpg.create_pool(
+        database.DATABASE_URL, min_size=pool_size, max_size=pool_size, init=_init
+    )
+    return counter
+
+
+async def seed_products(guild, count: int) -> dict:
+    """Register `count` products with fresh roles under the fake guild; returns name -> secret."""
+    products = {}
+    async with database.database_pool.acquire() as conn:
+        await conn.execute("DELETE FROM products WHERE guild_id = $1", str(guild.id))
+        for i in range(count):
+            role = guild.add_role(f"Verified-Bench-{i}")
+            name = f"Bench Product {i:03d}"
+            products[name] = f"bench-secret-{i}"
+            await conn.execute(
+                "INSERT INTO products (guild_id, product_name, product_secret, role_id) VALUES ($1, $2, $3, $4)",
+                str(guild.id), name, encrypt_data(products[name]), str(role.id)
+            )
+    return products
+
+
+async def teardown(guild):
+    async with database.database_pool.acquire() as conn:
+        await conn.execute("DELETE FROM verified_licenses WHERE guild_id = $1", str(guild.id))
+        await conn.execute("DELETE FROM verification_outbox WHERE guild_id = $1", str(guild.id))
+        await conn.execute("DELETE FROM products WHERE guild_id = $1", str(guild.id))
+    await database.database_pool.close()
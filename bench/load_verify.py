@@ -0,0 +1,147 @@
+"""
+End-to-end verification load benchmark.
+
+Drives VerificationButton.on_button_click and VerifyLicenseModal.callback at a fixed
+concurrency against a local Postgres and a local fake of the Payhip license API, with the
+outbox dispatcher applying the role grants, then reports throughput, latency percentiles and
+per-verification DB/Payhip call counts. The run ends once every outbox entry it wrote has
+been attempted.
+
+    DATABASE_URL=postgresql://localhost/keyverify_bench python -m bench.load_verify \\
+        --verifications 2000 --concurrency 100 --latency-ms 120 --rate-limit-rate 0.01
+
+Never point DATABASE_URL at production: the benchmark writes rows under a synthetic guild
+and removes them afterwards.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from collections import Counter
+
+import asyncpg
+
+from bench.fake_payhip import FakePayhip, FakePayhipConfig
+
+
+def _percentiles(samples: list) -> str:
+    if not samples:
+        return "n/a"
+    samples = sorted(samples)
+    pick = lambda pct: samples[min(len(samples) - 1, int(len(samples) * pct))] * 1000
+    return (
+        f"p50={pick(0.50):.1f}ms p95={pick(0.95):.1f}ms p99={pick(0.99):.1f}ms "
+        f"mean={statistics.fmean(samples) * 1000:.1f}ms"
+    )
+
+
+async def _drain_outbox(guild, poll: float = 0.05):
+    """Wait until the dispatcher has attempted every entry for `guild`, polling outside the counted pool."""
+    from utils import database
+    from utils.outbox import outbox_dispatcher
+
+    conn = await asyncpg.connect(database.DATABASE_URL)
+    try:
+        # Entries that failed are rescheduled with attempts > 0 and reported as retried.
+        while await conn.fetchval(
+            "SELECT COUNT(*) FROM verification_outbox WHERE guild_id = $1 AND attempts = 0 AND NOT dead",
+            str(guild.id)
+        ):
+            outbox_dispatcher.notify()
+            await asyncio.sleep(poll)
+    finally:
+        await conn.close()
+
+
+async def run(args):
+    fake = FakePayhip(FakePayhipConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        invalid_rate=args.invalid_rate,
+    ))
+    os.environ["PAYHIP_API_URL"] = await fake.start(port=args.payhip_port)
+
+    # Imported late so the handlers pick up the fake Payhip URL.
+    from bench.harness import connect_bench_database, seed_products, teardown
+    from bench.fakes import FakeBot, FakeGuild, FakeMessageInteraction, FakeModalInteraction
+    from handlers.verification_handler import VerificationButton
+    from handlers.verify_license_modal import VerifyLicenseModal
+    from utils.outbox import outbox_dispatcher
+    from utils.role_scheduler import role_scheduler
+
+    queries = await connect_bench_database(args.pool_size)
+    guild = FakeGuild("KeyVerify Bench")
+    # Role grants go through the outbox and the scheduler, which talks to the fake guild's "REST API".
+    bot = FakeBot(guild)
+    role_scheduler.start(bot)
+    outbox_dispatcher.start(bot)
+    products = await seed_products(guild, args.products)
+    product_names = list(products)
+
+    button = VerificationButton()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    click_latency, submit_latency = [], []
+    outcomes = Counter()
+
+    async def one_verification(n: int):
+        async with semaphore:
+            member = guild.add_member(f"bench-user-{n}")
+            product = product_names[n % len(product_names)]
+
+            start = time.perf_counter()
+            await button.on_button_click(FakeMessageInteraction(guild, member, custom_id="verify_button"))
+            click_latency.append(time.perf_counter() - start)
+
+            inter = FakeModalInteraction(guild, member, text_values={"license_key": f"BENCH-{n:08d}"})
+            start = time.perf_counter()
+            await VerifyLicenseModal(product).callback(inter)
+            submit_latency.append(time.perf_counter() - start)
+
+            content = inter.last_content() or ""
+            outcomes["verified" if content.startswith("✅") else "rejected"] += 1
+
+    queries_before = queries.count
+    started = time.perf_counter()
+    await asyncio.gather(*(one_verification(n) for n in range(args.verifications)))
+    responded = time.perf_counter() - started
+    await _drain_outbox(guild)
+    elapsed = time.perf_counter() - started
+    query_total = queries.count - queries_before
+
+    await outbox_dispatcher.stop()
+    await teardown(guild)
+    await fake.stop()
+
+    payhip_calls = sum(v for k, v in fake.calls.items() if ":" not in k)
+    n = args.verifications
+    print(f"verifications:        {n} at concurrency {args.concurrency} ({args.products} products)")
+    print(f"outcomes:             {dict(outcomes)}")
+    print(f"throughput:           {n / elapsed:.1f} verifications/s over {elapsed:.2f}s "
+          f"(responses done at {responded:.2f}s, outbox drained {elapsed - responded:.2f}s later)")
+    print(f"outbox:               {outbox_dispatcher.snapshot()}")
+    print(f"button click latency: {_percentiles(click_latency)}")
+    print(f"modal submit latency: {_percentiles(submit_latency)}")
+    print(f"db queries/verify:    {query_total / n:.2f}")
+    print(f"payhip calls/verify:  {payhip_calls / n:.2f}  {dict(fake.calls)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the verification flow against a fake Payhip.")
+    parser.add_argument("--verifications", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--products", type=int, default=10)
+    parser.add_argument("--pool-size", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--jitter-ms", type=float, default=40.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rate", type=float, default=0.0)
+    parser.add_argument("--invalid-rate", type=float, default=0.0)
+    parser.add_argument("--payhip-port", type=int, default=8899)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
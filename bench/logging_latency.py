@@ -0,0 +1,92 @@
+"""
+Event-loop latency under heavy logging, with the handlers attached directly to the root
+logger versus behind the QueueHandler/QueueListener pair.
+
+    python -m bench.logging_latency --messages 50000 --format json
+
+A monitor task sleeps for a fixed tick and records how late it wakes up; log-writing tasks
+run alongside it. Late wake-ups are time the loop spent blocked inside logging I/O.
+Log files go to a temporary directory; console output goes to /dev/null unless --stdout.
+"""
+import argparse
+import asyncio
+import contextlib
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from utils.logging_config import setup_logging, stop_logging, log_fields
+
+
+async def _measure(args) -> tuple[list, float]:
+    logger = logging.getLogger("bench.logging")
+    lags = []
+    done = asyncio.Event()
+
+    async def monitor():
+        tick = args.tick_ms / 1000
+        while not done.is_set():
+            start = time.perf_counter()
+            await asyncio.sleep(tick)
+            lags.append(time.perf_counter() - start - tick)
+
+    async def writer(worker: int):
+        for n in range(args.messages // args.writers):
+            logger.warning(
+                f"[Invalid Key] bench-user-{worker}-{n} entered an unrecognised key for 'Bench Product' in 'Bench Guild'.",
+                extra=log_fields(guild_id=1234, user_id=worker, product="Bench Product", outcome="invalid_key"),
+            )
+            if n % args.batch == 0:
+                await asyncio.sleep(0)
+
+    monitor_task = asyncio.create_task(monitor())
+    started = time.perf_counter()
+    await asyncio.gather(*(writer(w) for w in range(args.writers)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await monitor_task
+    return lags, elapsed
+
+
+def _report(label: str, lags: list, elapsed: float, messages: int):
+    lags = sorted(lags) or [0.0]
+    pick = lambda pct: lags[min(len(lags) - 1, int(len(lags) * pct))] * 1000
+    print(
+        f"{label:>7}: {messages / elapsed:>9.0f} msg/s on the loop | loop lag "
+        f"p50={pick(0.5):.2f}ms p99={pick(0.99):.2f}ms max={pick(1.0):.2f}ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure event-loop lag while logging heavily.")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--writers", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=1, help="Messages logged between yields to the loop.")
+    parser.add_argument("--tick-ms", type=float, default=1.0)
+    parser.add_argument("--format", choices=["text", "json"], default="text")
+    parser.add_argument("--stdout", action="store_true", help="Keep console output instead of /dev/null.")
+    args = parser.parse_args()
+
+    report_stream = sys.stdout
+    with tempfile.TemporaryDirectory() as tmp, open(os.devnull, "w") as devnull:
+        os.chdir(tmp)
+        for label, queued in (("direct", False), ("queued", True)):
+            console = sys.stdout if args.stdout else devnull
+            with contextlib.redirect_stdout(console):
+                setup_logging("INFO", args.format, queued=queued)
+            lags, elapsed = asyncio.run(_measure(args))
+            # Include draining the queue so the queued run can't look faster by dropping work.
+            drain_start = time.perf_counter()
+            stop_logging()
+            drain = time.perf_counter() - drain_start
+            with contextlib.redirect_stdout(report_stream):
+                _report(label, lags, elapsed, args.messages)
+                if queued:
+                    print(f"         listener drained the remaining backlog in {drain * 1000:.0f}ms")
+            logging.getLogger().handlers.clear()
+
+
+if __name__ == "__main__":
+    main()
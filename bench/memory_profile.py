@@ -0,0 +1,179 @@
+"""
+Resident memory of the gateway cache per 1,000 guilds, with the default client settings
+versus LEAN_CACHE (see utils/gateway.py).
+
+    python -m bench.memory_profile --guilds 5000 --roles 40 --channels 60
+
+Each mode runs in its own subprocess so one can't inherit the other's heap. The child builds
+the bot's client with that mode's options and feeds synthetic GUILD_CREATE payloads through
+disnake's own parser, shaped by the mode's intents: voice states and the members in voice
+are only sent with the voice intent, and guild messages only with the message intent. RSS is
+sampled before and after, so the figure covers the cache plus the allocator's overhead.
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+
+import disnake
+from disnake.ext import commands
+
+from utils.gateway import client_options
+
+BOT_ID = 900_000_000_000_000_001
+
+
+def _rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+        # Peak rather than current outside Linux; still comparable between the two modes.
+        scale = 1 if sys.platform == "darwin" else 1024
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale
+
+
+def _user(user_id: int, name: str) -> dict:
+    return {"id": str(user_id), "username": name, "discriminator": "0", "global_name": name, "avatar": None}
+
+
+def _member(user_id: int, name: str, role_ids: list[int]) -> dict:
+    return {
+        "user": _user(user_id, name), "roles": [str(r) for r in role_ids], "nick": None,
+        "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0,
+    }
+
+
+def _role(role_id: int, name: str, position: int) -> dict:
+    return {
+        "id": str(role_id), "name": name, "permissions": "0", "position": position, "color": 0,
+        "colors": {"primary_color": 0, "secondary_color": None, "tertiary_color": None},
+        "hoist": False, "managed": False, "mentionable": False, "flags": 0,
+    }
+
+
+def _guild_payload(guild_id: int, args, voice: bool) -> dict:
+    base = guild_id * 1000
+    roles = [_role(guild_id, "@everyone", 0)] + [_role(base + i, f"role-{i}", i) for i in range(1, args.roles)]
+    role_ids = [int(r["id"]) for r in roles[1:4]]
+    text = [
+        {"id": str(base + 200 + i), "type": 0, "name": f"text-{i}", "position": i, "parent_id": None,
+         "permission_overwrites": [], "topic": None, "nsfw": False, "rate_limit_per_user": 0}
+        for i in range(args.channels)
+    ]
+    voice_channels = [
+        {"id": str(base + 400 + i), "type": 2, "name": f"voice-{i}", "position": i, "parent_id": None,
+         "permission_overwrites": [], "bitrate": 64000, "user_limit": 0, "rtc_region": None}
+        for i in range(max(1, args.channels // 10))
+    ]
+    members = [_member(BOT_ID, "keyverify", role_ids[:1])]
+    voice_states = []
+    if voice:
+        for i in range(args.voice_members):
+            user_id = base + 600 + i
+            members.append(_member(user_id, f"user-{guild_id}-{i}", role_ids))
+            voice_states.append({
+                "user_id": str(user_id), "channel_id": voice_channels[i % len(voice_channels)]["id"],
+                "session_id": "x", "deaf": False, "mute": False, "self_deaf": False, "self_mute": False,
+                "self_video": False, "suppress": False, "request_to_speak_timestamp": None,
+            })
+    return {
+        "id": str(guild_id), "name": f"guild-{guild_id}", "icon": None, "owner_id": str(base + 999),
+        "member_count": args.member_count, "large": args.member_count >= 250,
+        "roles": roles, "channels": text + voice_channels, "members": members,
+        "voice_states": voice_states, "threads": [], "stage_instances": [], "guild_scheduled_events": [],
+        "emojis": [
+            {"id": str(base + 800 + i), "name": f"emoji_{i}", "roles": [], "require_colons": True,
+             "managed": False, "animated": False, "available": True}
+            for i in range(args.emojis)
+        ],
+        "stickers": [], "features": [], "premium_tier": 0, "verification_level": 0,
+        "default_message_notifications": 0, "explicit_content_filter": 0, "mfa_level": 0,
+        "system_channel_flags": 0, "preferred_locale": "en-US", "nsfw_level": 0,
+    }
+
+
+def _message_payload(message_id: int, guild_id: int, channel_id: int) -> dict:
+    return {
+        "id": str(message_id), "channel_id": str(channel_id), "guild_id": str(guild_id),
+        "author": _user(message_id, "author"), "content": "x" * 80, "timestamp": "2024-01-01T00:00:00+00:00",
+        "edited_timestamp": None, "tts": False, "mention_everyone": False, "mentions": [],
+        "mention_roles": [], "attachments": [], "embeds": [], "pinned": False, "type": 0,
+    }
+
+
+async def _measure(lean: bool, args) -> dict:
+    options = client_options(lean)
+    bot = commands.InteractionBot(**options)
+    state = bot._connection
+    state.user = disnake.ClientUser(state=state, data=_user(BOT_ID, "keyverify"))
+    intents = options["intents"]
+
+    gc.collect()
+    before = _rss_bytes()
+    started = time.perf_counter()
+    for n in range(args.guilds):
+        state._add_guild_from_data(_guild_payload(1_000_000 + n, args, intents.voice_states))
+    if intents.guild_messages:
+        for i in range(args.messages):
+            guild_id = 1_000_000 + i % args.guilds
+            state.parse_message_create(_message_payload(10**15 + i, guild_id, guild_id * 1000 + 200))
+        await asyncio.sleep(0)
+    gc.collect()
+    after = _rss_bytes()
+
+    return {
+        "mode": "lean" if lean else "default",
+        "guilds": len(bot.guilds),
+        "cached_members": sum(len(g.members) for g in bot.guilds),
+        "cached_messages": len(state._messages or ()),
+        "load_seconds": round(time.perf_counter() - started, 2),
+        "rss_mb": round(after / 2**20, 1),
+        "mb_per_1000_guilds": round((after - before) / 2**20 / args.guilds * 1000, 2),
+    }
+
+
+def _run_child(mode: str, argv: list[str]) -> dict:
+    out = subprocess.run(
+        [sys.executable, "-m", "bench.memory_profile", "--child", mode, *argv],
+        check=True, capture_output=True, text=True,
+    )
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure gateway cache RSS per 1,000 guilds.")
+    parser.add_argument("--guilds", type=int, default=2000)
+    parser.add_argument("--roles", type=int, default=30)
+    parser.add_argument("--channels", type=int, default=40)
+    parser.add_argument("--emojis", type=int, default=20)
+    parser.add_argument("--voice-members", type=int, default=5, help="Members in voice per guild.")
+    parser.add_argument("--member-count", type=int, default=500)
+    parser.add_argument("--messages", type=int, default=5000, help="Guild messages received in total.")
+    parser.add_argument("--child", choices=["default", "lean"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_measure(args.child == "lean", args))))
+        return
+
+    results = [_run_child(mode, sys.argv[1:]) for mode in ("default", "lean")]
+    print(f"{args.guilds} guilds, {args.roles} roles, {args.channels} channels, {args.emojis} emojis, "
+          f"{args.voice_members} members in voice per guild; {args.messages} messages\n")
+    print(f"{'mode':<8} {'RSS MB':>8} {'MB/1k guilds':>13} {'members':>9} {'messages':>9} {'load s':>7}")
+    for r in results:
+        print(f"{r['mode']:<8} {r['rss_mb']:>8} {r['mb_per_1000_guilds']:>13} "
+              f"{r['cached_members']:>9} {r['cached_messages']:>9} {r['load_seconds']:>7}")
+    default, lean = results
+    if default["mb_per_1000_guilds"] > 0:
+        saved = 1 - lean["mb_per_1000_guilds"] / default["mb_per_1000_guilds"]
+        print(f"\nLean mode uses {saved:.0%} less memory per guild.")
+
+
+if __name__ == "__main__":
+    main()
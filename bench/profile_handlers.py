@@ -0,0 +1,141 @@
+"""
+Run the hot interaction paths thousands of times in-process under cProfile, using the fake
+interaction objects from bench.fakes instead of a gateway connection.
+
+    DATABASE_URL=postgresql://localhost/keyverify_bench python -m bench.profile_handlers \\
+        --iterations 2000 --scenario verify_button --scenario list_products
+
+Each scenario prints its wall time, mean time-to-ack and the top functions by cumulative time.
+"""
+import argparse
+import asyncio
+import cProfile
+import io
+import os
+import pstats
+import statistics
+import time
+
+from bench.fake_payhip import FakePayhip, FakePayhipConfig
+
+SCENARIOS = ["list_products", "remove_user", "verify_button", "verify_modal", "reset_key_modal"]
+
+
+async def run(args):
+    fake = FakePayhip(FakePayhipConfig(latency_ms=args.payhip_latency_ms, jitter_ms=0))
+    os.environ["PAYHIP_API_URL"] = await fake.start(port=args.payhip_port)
+    os.environ.setdefault("PAYHIP_API_KEY", "bench")
+    # The same owner/members repeat every iteration; rate limits would turn the run into a rejection benchmark.
+    from utils import rate_limit
+    for action in rate_limit.DEFAULT_LIMITS:
+        os.environ.setdefault(f"RATE_LIMIT_{action.upper()}", "")
+    # The limiter was built at import time; rebuild its limits from the environment above.
+    rate_limit.rate_limiter.limits = rate_limit._build_limiter().limits
+
+    from bench.harness import connect_bench_database, seed_products, teardown
+    from bench.fakes import (
+        FakeBot, FakeGuild, FakeApplicationCommandInteraction, FakeMessageInteraction,
+        FakeModalInteraction, invoke_slash,
+    )
+    from utils.database import save_verified_license
+    from cogs.list_products import ListProducts
+    from cogs.blacklist import RemoveUser
+    from cogs.reset_key import ResetKeyModal
+    from handlers.verification_handler import VerificationButton
+    from handlers.verify_license_modal import VerifyLicenseModal
+    from utils.role_scheduler import role_scheduler
+
+    await connect_bench_database(args.pool_size)
+    guild = FakeGuild("KeyVerify Profile", rest_latency=args.rest_latency_ms / 1000)
+    # Role mutations go through the scheduler, which talks to the fake guild's "REST API".
+    role_scheduler.start(FakeBot(guild))
+    products = await seed_products(guild, args.products)
+    first_product = next(iter(products))
+    owner = guild.owner
+    button = VerificationButton()
+
+    async def list_products(n):
+        inter = FakeApplicationCommandInteraction(guild, owner, command="list_products")
+        await invoke_slash(ListProducts(), "list_products", inter)
+        return inter
+
+    async def remove_user(n):
+        member = members[n]
+        inter = FakeApplicationCommandInteraction(guild, owner, command="remove_user")
+        await invoke_slash(RemoveUser(None), "remove_user", inter, user=member)
+        return inter
+
+    async def verify_button(n):
+        inter = FakeMessageInteraction(guild, guild.add_member(f"click-{n}"), custom_id="verify_button")
+        await button.on_button_click(inter)
+        return inter
+
+    async def verify_modal(n):
+        inter = FakeModalInteraction(guild, guild.add_member(f"modal-{n}"), text_values={"license_key": f"PROF-{n:08d}"})
+        await VerifyLicenseModal(first_product).callback(inter)
+        return inter
+
+    async def reset_key_modal(n):
+        inter = FakeModalInteraction(guild, owner, text_values={"license_key": f"PROF-{n:08d}"})
+        await ResetKeyModal(first_product, products[first_product], "bench").callback(inter)
+        return inter
+
+    scenarios = {
+        "list_products": list_products,
+        "remove_user": remove_user,
+        "verify_button": verify_button,
+        "verify_modal": verify_modal,
+        "reset_key_modal": reset_key_modal,
+    }
+
+    members = []
+    if "remove_user" in args.scenario:
+        # Give every target member a record up front so each iteration has something to remove.
+        for n in range(args.iterations):
+            member = guild.add_member(f"removable-{n}")
+            members.append(member)
+            for name in products:
+                await save_verified_license(member.id, guild.id, name)
+
+    for name in args.scenario:
+        scenario = scenarios[name]
+        profiler = cProfile.Profile()
+        acks = []
+        started = time.perf_counter()
+        profiler.enable()
+        for n in range(args.iterations):
+            inter = await scenario(n)
+            if (ack := inter.time_to_ack()) is not None:
+                acks.append(ack)
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(args.top)
+        mean_ack = f"{statistics.fmean(acks) * 1000:.2f}ms" if acks else "n/a"
+        print(f"=== {name}: {args.iterations} runs in {elapsed:.2f}s "
+              f"({elapsed / args.iterations * 1000:.2f}ms/run, mean time-to-ack {mean_ack})")
+        print(out.getvalue())
+
+    await teardown(guild)
+    await fake.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile interaction handlers with fake Discord objects.")
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Scenario to run; repeat for several. Defaults to all.")
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=30)
+    parser.add_argument("--pool-size", type=int, default=5)
+    parser.add_argument("--rest-latency-ms", type=float, default=0.0)
+    parser.add_argument("--payhip-latency-ms", type=float, default=0.0)
+    parser.add_argument("--payhip-port", type=int, default=8899)
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+    args.scenario = args.scenario or SCENARIOS
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,34 @@
-import asyncio
-import warnings
-import disnake
-from disnake.ext import commands
-import os
-import logging
+from utils.startup import startup  # first, so startup timings begin with the process
 from dotenv import load_dotenv
-from utils.database import initialize_database, get_database_pool, run_auto_rotation, get_setting
-from utils.logging_config import setup_logging
-from utils.errors import ConfigurationError, DatabaseError
-from handlers.verification_handler import VerificationButton
-from bot_api import start_bot_api
-import config
 
+# Loaded once, before any module below reads its settings at import time.
 load_dotenv()
 
+with startup.phase("imports"):
+    import asyncio
+    import asyncpg
+    import warnings
+    import disnake
+    from disnake.ext import commands
+    import os
+    import logging
+    from utils.database import initialize_database, get_database_pool, run_auto_rotation, get_setting
+    from utils.logging_config import setup_logging
+    from utils.errors import ConfigurationError, DatabaseError
+    from handlers.verification_handler import VerificationButton
+    from handlers.verify_license_modal import verification_queue
+    from utils.outbox import outbox_dispatcher
+    from utils.role_scheduler import role_scheduler
+    from utils.warm_start import warm_start
+    from utils.verification_stats import verification_stats
+    from utils.verification_events import verification_events
+    from utils.cleanup import orphan_cleanup
+    from utils.reconcile import reconciler
+    from utils.gateway import client_options, LEAN_CACHE
+    from bot_api import start_bot_api
+    from utils import tracing
+    import config
+
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
 
@@ -23,55 +38,123 @@ logger = logging.getLogger(__name__)
 # Disnake creates this coroutine internally during shutdown but never awaits it — harmless.
 warnings.filterwarnings("ignore", message="coroutine 'AsyncWebhookAdapter.request' was never awaited")
 
-intents = disnake.Intents.default()
-intents.guilds = True
 command_sync_flags = commands.CommandSyncFlags.default()
 command_sync_flags.sync_commands_debug = True
 
+# Intents and cache limits; LEAN_CACHE=1 trims them for very large guild counts (see utils/gateway.py).
 bot = commands.InteractionBot(
-    intents=intents,
     command_sync_flags=command_sync_flags,
+    **client_options(),
 )
 
+# Time every interaction against Discord's 3-second acknowledgement window.
+tracing.install()
+
+# Command sync runs in disnake's own task; its debug log lines put it in the startup profile.
+startup.watch_command_sync()
+
+
+@bot.before_slash_command_invoke
+async def _begin_command_trace(inter: disnake.ApplicationCommandInteraction):
+    tracing.begin(inter, f"/{inter.application_command.qualified_name}")
+
+
+@bot.after_slash_command_invoke
+async def _finish_command_trace(inter: disnake.ApplicationCommandInteraction):
+    tracing.finish()
+
 # Signals that the database is ready so on_ready doesn't race ahead of on_connect
 _db_ready = asyncio.Event()
 
 COG_DIR = "cogs"
-for filename in os.listdir(COG_DIR):
+for filename in sorted(os.listdir(COG_DIR)):
     if filename.endswith(".py") and not filename.startswith("__"):
         cog_path = f"{COG_DIR}.{filename[:-3]}"
         try:
-            bot.load_extension(cog_path)
+            with startup.phase(f"cog:{filename[:-3]}"):
+                bot.load_extension(cog_path)
         except Exception as e:
             # Log and continue — one bad cog should not prevent the bot from starting.
             logger.error(f"Failed to load cog '{cog_path}': {e}", exc_info=True)
 
 
+# Startup jobs (key rotation, warm start) are held here until done so they can't be
+# garbage-collected mid-run, and on_close waits for them before the pool goes away.
+_background: set[asyncio.Task] = set()
+
+
+def _spawn(coro, name: str):
+    task = asyncio.create_task(coro, name=name)
+    _background.add(task)
+    task.add_done_callback(_background_done)
+
+
+def _background_done(task: asyncio.Task):
+    _background.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logger.error(f"Background task '{task.get_name()}' failed", exc_info=task.exception())
+
+
+async def _rotate_keys():
+    # Not needed to serve interactions (old keys still decrypt), so it runs once the bot is up.
+    try:
+        with startup.phase("key_rotation"):
+            await run_auto_rotation()
+    except ConfigurationError as e:
+        logger.critical(f"Startup failed — aborting: {e}", exc_info=True)
+        await bot.close()
+    except DatabaseError as e:
+        logger.error(f"[Key Rotation] {e}", exc_info=True)
+
+
+async def _warm_caches():
+    # Needs bot.guilds, so it starts at first ready; interactions meanwhile just load on demand.
+    with startup.phase("warm_start"):
+        await warm_start.preload(bot)
+
+
 @bot.event
 async def on_connect():
+    startup.mark("gateway_connected")
+    # Up before the database so health probes can report startup progress.
+    await start_bot_api(bot, _db_ready)
+    if _db_ready.is_set():
+        # Gateway reconnect: the pool and background workers are still running.
+        return
     logger.info("Connected to Discord. Initializing database...")
     try:
         await initialize_database()
-        await run_auto_rotation()
     except (ConfigurationError, DatabaseError) as e:
         logger.critical(f"Startup failed — aborting: {e}", exc_info=True)
         await bot.close()
         return
-    await start_bot_api(bot)
+    role_scheduler.start(bot)
+    # Applies role grants and log posts queued by verifications, including any left over from before a restart.
+    outbox_dispatcher.start(bot)
+    verification_stats.start()
+    verification_events.start()
+    orphan_cleanup.start(bot)
     _db_ready.set()
+    startup.mark("db_ready")
+    _spawn(_rotate_keys(), "key-rotation")
 
 
 @bot.event
 async def on_ready():
     await _db_ready.wait()
-    logger.info(f"Bot is online as {bot.user}!")
-    status = await get_setting("status", f"/help | {config.version}")
-    await bot.change_presence(activity=disnake.Game(name=status))
-
     # One global persistent view handles button clicks from every server's verification message.
     # No per-message or per-guild registration needed — guild context comes from the interaction.
+    # Registered before anything else here so clicks are answered as soon as possible.
     bot.add_view(VerificationButton())
+    startup.mark("first_ready")
+    logger.info(f"Bot is online as {bot.user} in {len(bot.guilds)} guilds{' (lean cache)' if LEAN_CACHE else ''}!")
     logger.info("Persistent verification button view registered.")
+    startup.report()
+    if warm_start.result is None:
+        _spawn(_warm_caches(), "warm-start")
+
+    status = await get_setting("status", f"/help | {config.version}")
+    await bot.change_presence(activity=disnake.Game(name=status))
 
 
 @bot.event
@@ -84,11 +167,53 @@ async def on_guild_join(guild: disnake.Guild):
     if row:
         logger.warning(f"[Blacklist] Joined blacklisted guild '{guild.name}' ({guild.id}). Leaving immediately.")
         await guild.leave()
+        return
+    await orphan_cleanup.guild_joined(guild.id)
+
+
+@bot.event
+async def on_guild_remove(guild: disnake.Guild):
+    await _db_ready.wait()
+    # Data is kept for CLEANUP_GRACE_DAYS in case the bot is invited back.
+    try:
+        await orphan_cleanup.guild_left(guild.id)
+    except asyncpg.PostgresError as e:
+        # The cleanup job also picks up guilds missing from the guild list.
+        logger.error(f"[Cleanup] Could not record removal from '{guild.name}' ({guild.id}): {e}")
+    logger.info(f"Removed from guild '{guild.name}' ({guild.id}).")
+
+
+@bot.event
+async def on_guild_role_delete(role: disnake.Role):
+    await _db_ready.wait()
+    try:
+        await reconciler.role_deleted(bot, role)
+    except DatabaseError as e:
+        logger.error(f"[Reconcile] {e}")
+
+
+@bot.event
+async def on_guild_channel_delete(channel: disnake.abc.GuildChannel):
+    await _db_ready.wait()
+    try:
+        await reconciler.channel_deleted(bot, channel)
+    except DatabaseError as e:
+        logger.error(f"[Reconcile] {e}")
 
 
 @bot.event
 async def on_close():
     logger.info("Bot is shutting down...")
+    await verification_queue.drain()
+    await outbox_dispatcher.stop()
+    await role_scheduler.drain()
+    await verification_stats.stop()
+    await verification_events.stop()
+    await orphan_cleanup.stop()
+    if _background:
+        _, unfinished = await asyncio.wait(_background, timeout=10)
+        for task in unfinished:
+            task.cancel()
     try:
         pool = await get_database_pool()
         await pool.close()
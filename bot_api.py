@@ -1,3 +1,4 @@
+import asyncio
 import os
 import logging
 import disnake
@@ -7,12 +8,18 @@ logger = logging.getLogger(__name__)
 _INTERNAL_KEY = os.getenv("ADMIN_API_KEY", "").strip()
 
 
+def _authorized(request) -> bool:
+    return bool(_INTERNAL_KEY) and request.headers.get("X-Admin-Key", "") == _INTERNAL_KEY
+
+
 def _auth(request):
-    if not _INTERNAL_KEY or request.headers.get("X-Admin-Key", "") != _INTERNAL_KEY:
+    if not _authorized(request):
         raise web.HTTPUnauthorized(text="Unauthorized")
 
 
-def create_bot_api(bot):
+def create_bot_api(bot, db_ready=None):
+    db_ready = db_ready or asyncio.Event()
+
     async def list_cogs(request):
         _auth(request)
         cog_dir = os.path.join(os.path.dirname(__file__), "cogs")
@@ -97,6 +104,127 @@ def create_bot_api(bot):
 
         return web.json_response({"message": "Bot config updated."})
 
+    async def get_metrics(request):
+        _auth(request)
+        from utils import tracing
+        from utils.logging_config import sampling_snapshot
+        from utils.rate_limit import rate_limiter
+        from handlers.verify_license_modal import verification_queue
+        from utils.outbox import outbox_dispatcher
+        from utils.activation_log import activation_log
+        from utils.role_scheduler import role_scheduler
+        from utils.payhip import payhip_circuit
+        from utils.startup import startup
+        from utils.warm_start import warm_start
+        from utils.guild_cache import guild_cache
+        from utils.verification_stats import verification_stats
+        from utils.verification_events import verification_events
+        from utils.cleanup import orphan_cleanup
+        from utils.reconcile import reconciler
+        return web.json_response({
+            "interactions": tracing.snapshot(),
+            "log_sampling": sampling_snapshot(),
+            "rate_limits": rate_limiter.snapshot(),
+            "verification_queue": verification_queue.snapshot(),
+            "outbox": outbox_dispatcher.snapshot(),
+            "activation_log": activation_log.snapshot(),
+            "role_queue": role_scheduler.snapshot(),
+            "payhip": payhip_circuit.snapshot(),
+            "startup": startup.snapshot(),
+            "warm_start": warm_start.snapshot(),
+            "guild_cache": guild_cache.snapshot(),
+            "verification_stats": verification_stats.snapshot(),
+            "verification_events": verification_events.snapshot(),
+            "cleanup": orphan_cleanup.snapshot(),
+            "reconcile": reconciler.snapshot(),
+        })
+
+    # Probes can't send the admin key, so these two are open and answer with just a status;
+    # the full dependency report needs X-Admin-Key.
+
+    # Liveness: 200 while the process is serving, 503 once the client has shut down.
+    async def get_health(request):
+        status = 503 if bot.is_closed() else 200
+        if not _authorized(request):
+            return web.json_response({"status": "ok" if status == 200 else "closed"}, status=status)
+        from utils.health import health_check
+        report = await health_check.report(bot, db_ready)
+        return web.json_response(report, status=status)
+
+    # Readiness: 200 only when the gateway is up, the database answers and the outbox is running.
+    async def get_ready(request):
+        from utils.health import health_check
+        report = await health_check.report(bot, db_ready)
+        status = 200 if report["ready"] else 503
+        if not _authorized(request):
+            return web.json_response({"status": report["status"]}, status=status)
+        return web.json_response(report, status=status)
+
+    # Verification counters per guild, product and day; ?guild_id=, ?since= and ?until= (dates) narrow it down.
+    async def get_stats(request):
+        _auth(request)
+        import datetime
+        from utils.errors import DatabaseError
+        from utils.verification_stats import verification_stats
+        query = request.query
+        try:
+            since = datetime.date.fromisoformat(query["since"]) if "since" in query else None
+            until = datetime.date.fromisoformat(query["until"]) if "until" in query else None
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        try:
+            days = await verification_stats.daily(query.get("guild_id"), since, until)
+        except DatabaseError as e:
+            logger.error(f"[BotAPI] {e}")
+            return web.json_response({"error": "database unavailable"}, status=503)
+        return web.json_response({"days": days})
+
+    async def export_table(request):
+        _auth(request)
+        import datetime
+        import json
+        from utils.export import EXPORTS, decode_cursor, encode_cursor, export_pages, json_default
+        spec = EXPORTS.get(request.match_info["table"])
+        if spec is None:
+            return web.json_response({"error": f"unknown table; choose one of {', '.join(EXPORTS)}"}, status=404)
+        query = request.query
+        try:
+            since = datetime.datetime.fromisoformat(query["since"]) if "since" in query else None
+            until = datetime.datetime.fromisoformat(query["until"]) if "until" in query else None
+            after = decode_cursor(query["cursor"]) if "cursor" in query else None
+            limit = int(query["limit"]) if "limit" in query else None
+        except ValueError as e:
+            return web.json_response({"error": str(e)}, status=400)
+        if limit is not None and limit < 1:
+            return web.json_response({"error": "limit must be positive"}, status=400)
+        if (since or until) and not spec.date_column:
+            return web.json_response({"error": f"{spec.table} has no date column to filter on"}, status=400)
+
+        # One JSON object per line, then a final {"next_cursor": ...} line; pass it back as ?cursor= to continue.
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        sent, last = 0, None
+        try:
+            async for page in export_pages(spec, guild_id=query.get("guild_id"), since=since, until=until,
+                                           after=after, limit=limit):
+                await response.write("".join(json.dumps(dict(row), default=json_default) + "\n" for row in page).encode())
+                sent += len(page)
+                last = [page[-1][column] for column in spec.key]
+        except ConnectionResetError:
+            logger.info(f"[BotAPI] Export of {spec.table} cancelled by the client after {sent} rows.")
+            return response
+        except Exception as e:
+            # Headers are already out, so the error goes in the stream and the trailer is withheld.
+            logger.error(f"[BotAPI] Export of {spec.table} failed after {sent} rows: {e}")
+            await response.write((json.dumps({"error": "export failed", "rows_sent": sent}) + "\n").encode())
+            await response.write_eof()
+            return response
+        next_cursor = encode_cursor(last) if limit is not None and sent == limit else None
+        await response.write((json.dumps({"next_cursor": next_cursor}) + "\n").encode())
+        await response.write_eof()
+        logger.info(f"[BotAPI] Exported {sent} {spec.table} rows.")
+        return response
+
     app = web.Application()
     app.router.add_get("/internal/cogs", list_cogs)
     app.router.add_post("/internal/cogs/reload", reload_cog)
@@ -104,17 +232,22 @@ def create_bot_api(bot):
     app.router.add_post("/internal/cogs/unload", unload_cog)
     app.router.add_get("/internal/config", get_bot_config)
     app.router.add_post("/internal/config", set_bot_config)
+    app.router.add_get("/internal/metrics", get_metrics)
+    app.router.add_get("/internal/health", get_health)
+    app.router.add_get("/internal/ready", get_ready)
+    app.router.add_get("/internal/stats", get_stats)
+    app.router.add_get("/internal/export/{table}", export_table)
     return app
 
 
 _started = False
 
-async def start_bot_api(bot):
+async def start_bot_api(bot, db_ready=None):
     global _started
     if _started:
         return
     _started = True
-    app = create_bot_api(bot)
+    app = create_bot_api(bot, db_ready)
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, "0.0.0.0", 8887)
@@ -3,6 +3,7 @@ from disnake.ext import commands
 from utils.encryption import encrypt_data
 from utils.database import get_database_pool
 from utils.permissions import is_authorized
+from utils.product_index import product_index
 import config
 import logging
 import uuid
@@ -223,6 +224,7 @@ class RoleSelectView(disnake.ui.View):
                         str(self.guild.id), product_name, encrypted_secret, str(role.id)
                     )
                     logger.info(f"[Product Added] '{product_name}' added to '{self.guild.name}' with role '{role.name}'")
+                    product_index.add(self.guild.id, product_name)
                     
                     # We already edited the message, so we must use followup
                     await interaction.followup.send(
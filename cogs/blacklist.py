@@ -1,8 +1,12 @@
+import asyncio
 import disnake
 from disnake.ext import commands
 from utils.database import get_database_pool
 from utils.permissions import is_authorized
+from utils.role_scheduler import role_scheduler, APPLIED
+from utils.verification_events import verification_events
 import logging
+from utils.logging_config import log_fields
 
 logger = logging.getLogger(__name__)
 
@@ -44,10 +48,16 @@ class RemoveUser(commands.Cog):
                 )
                 return
 
-            await conn.execute(
-                "DELETE FROM verified_licenses WHERE user_id = $1 AND guild_id = $2",
-                str(user.id), str(inter.guild.id)
-            )
+            async with conn.transaction():
+                await conn.execute(
+                    "DELETE FROM verified_licenses WHERE user_id = $1 AND guild_id = $2",
+                    str(user.id), str(inter.guild.id)
+                )
+                # Grants still waiting in the outbox would hand the roles straight back.
+                await conn.execute(
+                    "DELETE FROM verification_outbox WHERE user_id = $1 AND guild_id = $2 AND action = 'add_role'",
+                    str(user.id), str(inter.guild.id)
+                )
 
         roles_removed = []
         for row in rows:
@@ -57,18 +67,23 @@ class RemoveUser(commands.Cog):
                     roles_removed.append(role)
 
         if roles_removed:
-            try:
-                await user.remove_roles(*roles_removed, reason="KeyVerify: user removed by server owner")
-            except disnake.Forbidden:
-                logger.warning(f"[Permission Error] Could not remove roles from {user} in '{inter.guild.name}'")
+            outcomes = await asyncio.gather(*(
+                role_scheduler.remove(inter.guild.id, user.id, role.id, reason="KeyVerify: user removed by server owner")
+                for role in roles_removed
+            ), return_exceptions=True)
+            # Forbidden is logged by the scheduler; only report roles that actually came off.
+            roles_removed = [role for role, outcome in zip(roles_removed, outcomes) if outcome == APPLIED]
 
         products_removed = [row["product_name"] for row in rows]
+        for product_name in products_removed:
+            verification_events.record("remove", inter.guild.id, user.id, product_name, "removed", actor_id=inter.author.id)
         message = f"✅ `{user}` removed. Records cleared for: {', '.join(products_removed)}."
         if roles_removed:
             message += f"\n🔒 Roles removed: {', '.join(r.name for r in roles_removed)}"
         message += "\n\nTo disable their license on Payhip, do so from your Payhip dashboard."
 
-        logger.info(f"[User Removed] {user} removed from '{inter.guild.name}' by {inter.author}.")
+        logger.info(f"[User Removed] {user} removed from '{inter.guild.name}' by {inter.author}.",
+                    extra=log_fields(inter.guild.id, user.id, outcome="removed"))
         await inter.followup.send(message, ephemeral=True)
 
 
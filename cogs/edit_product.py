@@ -3,6 +3,9 @@ import disnake
 from disnake.ext import commands
 from utils.database import get_database_pool
 from utils.permissions import is_authorized
+from utils.product_index import product_index
+from utils.verification_stats import verification_stats
+from handlers.product_picker import ProductPicker
 import config
 import logging
 
@@ -16,63 +19,38 @@ class EditProduct(commands.Cog):
     @commands.slash_command(
         description="Edit the name or role of an existing product (owner or permitted roles).",
     )
-    async def edit_product(self, inter: disnake.ApplicationCommandInteraction):
+    async def edit_product(
+        self,
+        inter: disnake.ApplicationCommandInteraction,
+        product_name: str = commands.Param(default=None, description="Product to edit (leave empty to pick from a list)"),
+    ):
         if not await is_authorized(inter, "edit_product"):
             return
 
-        async with (await get_database_pool()).acquire() as conn:
-            rows = await conn.fetch(
-                "SELECT product_name, role_id FROM products WHERE guild_id = $1 ORDER BY product_name",
-                str(inter.guild.id)
-            )
-
-        if not rows:
+        if product_name:
+            if not await product_index.contains(inter.guild.id, product_name):
+                await inter.response.send_message(
+                    f"❌ Product '{product_name}' not found.", ephemeral=True, delete_after=config.message_timeout
+                )
+                return
             await inter.response.send_message(
-                "❌ No products found. Add one first with `/add_product`.",
-                ephemeral=True,
-                delete_after=config.message_timeout
+                f"Editing **{product_name}** — choose what to change:",
+                view=EditOptionsView(inter.guild, product_name),
+                ephemeral=True
             )
             return
 
-        options = [
-            disnake.SelectOption(label=row["product_name"])
-            for row in rows
-        ]
-
-        view = ProductPickerView(inter.guild, options)
-        await inter.response.send_message(
-            "Select a product to edit:",
-            view=view,
-            ephemeral=True
-        )
-        view.message = await inter.original_message()
-
+        async def on_pick(interaction: disnake.MessageInteraction, name: str):
+            await interaction.response.edit_message(
+                content=f"Editing **{name}** — choose what to change:",
+                view=EditOptionsView(inter.guild, name)
+            )
 
-class ProductPickerView(disnake.ui.View):
-    def __init__(self, guild: disnake.Guild, options: list):
-        super().__init__(timeout=120)
-        self.guild = guild
-        dropdown = disnake.ui.StringSelect(
-            placeholder="Choose a product",
-            options=options[:25]
-        )
-        dropdown.callback = self.on_select
-        self.add_item(dropdown)
-        self.message = None
-
-    async def on_select(self, interaction: disnake.MessageInteraction):
-        product_name = interaction.data["values"][0]
-        await interaction.response.edit_message(
-            content=f"Editing **{product_name}** — choose what to change:",
-            view=EditOptionsView(self.guild, product_name)
-        )
+        await ProductPicker(inter.guild, on_pick, prompt="Select a product to edit:").send(inter)
 
-    async def on_timeout(self):
-        if self.message:
-            try:
-                await self.message.edit(content="❌ Session timed out. Run the command again.", view=None)
-            except (disnake.NotFound, disnake.Forbidden):
-                pass
+    @edit_product.autocomplete("product_name")
+    async def product_name_autocomplete(self, inter: disnake.ApplicationCommandInteraction, user_input: str):
+        return await product_index.complete(inter.guild_id, user_input)
 
 
 class EditOptionsView(disnake.ui.View):
@@ -123,7 +101,7 @@ class EditOptionsView(disnake.ui.View):
         try:
             async with (await get_database_pool()).acquire() as conn:
                 await conn.execute(
-                    "UPDATE products SET role_id = $1 WHERE guild_id = $2 AND product_name = $3",
+                    "UPDATE products SET role_id = $1, role_missing = FALSE WHERE guild_id = $2 AND product_name = $3",
                     str(role.id), str(self.guild.id), self.product_name
                 )
         except asyncpg.PostgresError as e:
@@ -135,6 +113,7 @@ class EditOptionsView(disnake.ui.View):
             return
 
         logger.info(f"[Role Updated] '{self.product_name}' in '{self.guild.name}' → role '{role.name}'")
+        product_index.changed(self.guild.id)
 
         bot_top_role = self.guild.me.top_role
         hierarchy_warning = (
@@ -192,14 +171,34 @@ class RenameProductModal(disnake.ui.Modal):
                     )
                     return
 
-                await conn.execute(
-                    "UPDATE products SET product_name = $1 WHERE guild_id = $2 AND product_name = $3",
-                    new_name, str(self.guild.id), self.current_name
-                )
-                await conn.execute(
-                    "UPDATE verified_licenses SET product_name = $1 WHERE guild_id = $2 AND product_name = $3",
-                    new_name, str(self.guild.id), self.current_name
-                )
+                async with conn.transaction():
+                    await conn.execute(
+                        "UPDATE products SET product_name = $1 WHERE guild_id = $2 AND product_name = $3",
+                        new_name, str(self.guild.id), self.current_name
+                    )
+                    await conn.execute(
+                        "UPDATE verified_licenses SET product_name = $1 WHERE guild_id = $2 AND product_name = $3",
+                        new_name, str(self.guild.id), self.current_name
+                    )
+                    # Queued role grants and log posts follow the product.
+                    await conn.execute(
+                        "UPDATE verification_outbox SET product_name = $1 WHERE guild_id = $2 AND product_name = $3",
+                        new_name, str(self.guild.id), self.current_name
+                    )
+                    # Merged rather than updated: a product removed earlier may have left stats under the new name.
+                    await conn.execute(
+                        """
+                        WITH moved AS (
+                            DELETE FROM verification_stats WHERE guild_id = $2 AND product_name = $3
+                            RETURNING day, outcome, count
+                        )
+                        INSERT INTO verification_stats (guild_id, product_name, day, outcome, count)
+                        SELECT $2, $1, day, outcome, count FROM moved
+                        ON CONFLICT (guild_id, product_name, day, outcome)
+                        DO UPDATE SET count = verification_stats.count + EXCLUDED.count
+                        """,
+                        new_name, str(self.guild.id), self.current_name
+                    )
         except asyncpg.PostgresError as e:
             logger.error(f"[DB Error] Failed to rename '{self.current_name}' → '{new_name}' in '{self.guild.name}': {e}")
             await interaction.response.send_message(
@@ -210,6 +209,8 @@ class RenameProductModal(disnake.ui.Modal):
             return
 
         logger.info(f"[Product Renamed] '{self.current_name}' → '{new_name}' in '{self.guild.name}'")
+        product_index.rename(self.guild.id, self.current_name, new_name)
+        verification_stats.rename(self.guild.id, self.current_name, new_name)
         await interaction.response.send_message(
             f"✅ Product renamed from **`{self.current_name}`** to **`{new_name}`**.",
             ephemeral=True,
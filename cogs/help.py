@@ -41,6 +41,8 @@ class HelpCommand(commands.Cog):
             name="🎁 Product Management",
             value=(
                 "/add_product — Add a product with role assignment\n"
+                "/import_products — Add many products from a CSV file\n"
+                "/import_verified — Import users verified by another bot from a CSV file\n"
                 "/edit_product — Rename a product or change its assigned role\n"
                 "/list_products — View all added products\n"
                 "/remove_product — Delete a product from the server"
@@ -52,7 +54,8 @@ class HelpCommand(commands.Cog):
             name="🔁 License Actions",
             value=(
                 "/reset_key — Reset usage for a license key\n"
-                "/remove_user — Revoke a user's access and remove all their verification records"
+                "/remove_user — Revoke a user's access and remove all their verification records\n"
+                "/revoke_product — Revoke every verified user of a product at once"
             ),
             inline=False
         )
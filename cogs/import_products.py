@@ -0,0 +1,253 @@
+import asyncio
+import codecs
+import csv
+import io
+import os
+import re
+import asyncpg
+import disnake
+from disnake.ext import commands
+from utils.database import get_database_pool
+from utils.encryption import encrypt_data
+from utils.permissions import is_authorized
+from utils.product_index import product_index
+from utils.role_scheduler import role_scheduler
+import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(1024 * 1024)))
+IMPORT_MAX_ROWS = int(os.getenv("IMPORT_MAX_ROWS", "2000"))
+_ENCRYPT_BATCH = 200
+_MAX_GUILD_ROLES = 250  # Discord's per-guild role cap
+_ROLE_MENTION = re.compile(r"^<@&(\d+)>$")
+_AUTO_ROLE = {"", "auto", "create", "new"}
+
+
+class ImportRow:
+    __slots__ = ("line", "name", "secret", "role_ref", "role", "status", "detail")
+
+    def __init__(self, line: int, name: str, secret: str, role_ref: str):
+        self.line = line
+        self.name = name
+        self.secret = secret
+        self.role_ref = role_ref
+        self.role = None
+        self.status = None
+        self.detail = ""
+
+    def fail(self, detail: str):
+        self.status = "error"
+        self.detail = detail
+
+
+def parse_rows(data: bytes) -> tuple[list[ImportRow], list[ImportRow]]:
+    """
+    Parse the CSV line by line; returns (rows, rejected). Columns are name, secret, role —
+    by header if the first line has one, otherwise in that order. The role column may be a
+    role ID, a role mention, a role name, or empty / "auto" to create one.
+    """
+    lines = codecs.iterdecode(io.BytesIO(data), "utf-8-sig")
+    reader = csv.reader(lines)
+    rows, rejected, seen = [], [], set()
+    columns, first = (0, 1, 2), True
+    for record in reader:
+        if not any(cell.strip() for cell in record):
+            continue
+        if first:
+            first = False
+            header = [cell.strip().lower() for cell in record]
+            if "name" in header and "secret" in header:
+                columns = (header.index("name"), header.index("secret"), header.index("role") if "role" in header else None)
+                continue
+        cell = lambda i: record[i].strip() if i is not None and i < len(record) else ""
+        row = ImportRow(reader.line_num, cell(columns[0]), cell(columns[1]), cell(columns[2]))
+        if len(rows) + len(rejected) >= IMPORT_MAX_ROWS:
+            row.fail(f"over the {IMPORT_MAX_ROWS}-row limit")
+            rejected.append(row)
+            continue
+        if not row.name or not row.secret:
+            row.fail("name and secret are required")
+        elif len(row.name) > 100 or len(row.secret) > 100:
+            row.fail("name and secret must be 100 characters or fewer")
+        elif row.name in seen:
+            row.fail("duplicate name in file")
+        if row.status:
+            rejected.append(row)
+        else:
+            seen.add(row.name)
+            rows.append(row)
+    return rows, rejected
+
+
+def _encrypt_batch(secrets: list[str]) -> list[str]:
+    return [encrypt_data(secret) for secret in secrets]
+
+
+def _resolve_role(guild: disnake.Guild, ref: str):
+    if (match := _ROLE_MENTION.match(ref)) or ref.isdigit():
+        return guild.get_role(int(match.group(1) if match else ref))
+    return disnake.utils.get(guild.roles, name=ref)
+
+
+def build_report(rows: list[ImportRow]) -> io.BytesIO:
+    out = io.StringIO()
+    writer = csv.writer(out)
+    writer.writerow(["line", "name", "status", "role", "detail"])
+    for row in sorted(rows, key=lambda r: r.line):
+        writer.writerow([row.line, row.name, row.status, row.role.name if row.role else "", row.detail])
+    return io.BytesIO(out.getvalue().encode())
+
+
+class ImportProducts(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.slash_command(
+        description="Import products from a CSV file of name, secret, role (owner or permitted roles).",
+    )
+    async def import_products(
+        self,
+        inter: disnake.ApplicationCommandInteraction,
+        file: disnake.Attachment = commands.Param(description="CSV with columns name, secret, role (role ID, name, or empty to create one)"),
+    ):
+        if not await is_authorized(inter, "import_products"):
+            return
+
+        if file.size > IMPORT_MAX_BYTES:
+            await inter.response.send_message(
+                f"❌ The file is too large (limit {IMPORT_MAX_BYTES // 1024} KB).",
+                ephemeral=True, delete_after=config.message_timeout
+            )
+            return
+
+        await inter.response.defer(ephemeral=True)
+        guild = inter.guild
+
+        try:
+            rows, rejected = parse_rows(await file.read())
+        except (UnicodeDecodeError, csv.Error) as e:
+            await inter.edit_original_message(content=f"❌ Couldn't read the file as UTF-8 CSV: {e}")
+            return
+        if not rows and not rejected:
+            await inter.edit_original_message(content="❌ The file has no product rows.")
+            return
+
+        try:
+            async with (await get_database_pool()).acquire() as conn:
+                existing = {
+                    r["product_name"] for r in await conn.fetch(
+                        "SELECT product_name FROM products WHERE guild_id = $1 AND product_name = ANY($2::text[])",
+                        str(guild.id), [row.name for row in rows]
+                    )
+                }
+        except asyncpg.PostgresError as e:
+            logger.error(f"[DB Error] Import pre-check failed in '{guild.name}': {e}")
+            await inter.edit_original_message(content="❌ Database error while checking existing products. Please try again.")
+            return
+
+        pending, to_create = [], []
+        for row in rows:
+            if row.name in existing:
+                row.status, row.detail = "skipped", "product already exists"
+            elif row.role_ref.lower() in _AUTO_ROLE:
+                to_create.append(row)
+                pending.append(row)
+            elif (role := _resolve_role(guild, row.role_ref)) is None:
+                row.fail(f"role '{row.role_ref}' not found")
+            else:
+                row.role = role
+                pending.append(row)
+
+        room = _MAX_GUILD_ROLES - len(guild.roles)
+        for row in to_create[max(room, 0):]:
+            row.fail("server is at Discord's 250-role limit")
+        to_create = to_create[:max(room, 0)]
+
+        if to_create:
+            await inter.edit_original_message(content=f"⏳ Creating {len(to_create)} role(s)…")
+            await self._create_roles(inter, guild, to_create)
+        pending = [row for row in pending if row.status is None]
+
+        # Encrypt off the event loop in batches; Fernet is CPU-bound.
+        encrypted = []
+        for start in range(0, len(pending), _ENCRYPT_BATCH):
+            batch = pending[start:start + _ENCRYPT_BATCH]
+            encrypted.extend(await asyncio.to_thread(_encrypt_batch, [row.secret for row in batch]))
+        for row in pending:
+            row.secret = None
+
+        inserted = set()
+        if pending:
+            try:
+                async with (await get_database_pool()).acquire() as conn:
+                    async with conn.transaction():
+                        # One statement for the whole file; RETURNING tells us exactly which rows landed.
+                        result = await conn.fetch(
+                            """
+                            INSERT INTO products (guild_id, product_name, product_secret, role_id)
+                            SELECT $1, name, secret, role_id
+                            FROM unnest($2::text[], $3::text[], $4::text[]) AS t(name, secret, role_id)
+                            ON CONFLICT (guild_id, product_name) DO NOTHING
+                            RETURNING product_name
+                            """,
+                            str(guild.id),
+                            [row.name for row in pending],
+                            encrypted,
+                            [str(row.role.id) for row in pending],
+                        )
+                inserted = {r["product_name"] for r in result}
+            except asyncpg.PostgresError as e:
+                logger.error(f"[DB Error] Product import failed in '{guild.name}': {e}")
+                for row in pending:
+                    row.fail("database error — nothing was imported")
+
+        for row in pending:
+            if row.status is not None:
+                continue
+            if row.name in inserted:
+                row.status = "imported"
+                product_index.add(guild.id, row.name)
+                if row.role >= guild.me.top_role:
+                    row.detail = "bot's role is below this role — move it up so it can be assigned"
+            else:
+                row.status, row.detail = "skipped", "product already exists"
+
+        all_rows = rows + rejected
+        counts = {status: sum(1 for row in all_rows if row.status == status) for status in ("imported", "skipped", "error")}
+        logger.info(
+            f"[Products Imported] {counts['imported']} imported, {counts['skipped']} skipped, "
+            f"{counts['error']} failed in '{guild.name}' by {inter.author}."
+        )
+        summary = f"📦 Import finished: **{counts['imported']}** imported, **{counts['skipped']}** skipped, **{counts['error']}** failed."
+        if counts["skipped"] or counts["error"] or any(row.detail for row in all_rows):
+            summary += "\nSee the attached report for details on each row."
+            await inter.edit_original_message(
+                content=summary, file=disnake.File(build_report(all_rows), filename="import_report.csv")
+            )
+        else:
+            await inter.edit_original_message(content=summary)
+
+    async def _create_roles(self, inter, guild: disnake.Guild, rows: list[ImportRow]):
+        # Queued on the guild's REST scheduler so a big import doesn't starve role grants.
+        futures = [
+            role_scheduler.submit(
+                guild.id,
+                lambda name=f"Verified-{row.name}": guild.create_role(name=name, reason="KeyVerify product import"),
+            )
+            for row in rows
+        ]
+        for done, (row, future) in enumerate(zip(rows, futures), start=1):
+            try:
+                row.role = await future
+            except disnake.Forbidden:
+                row.fail("missing Manage Roles permission to create the role")
+            except disnake.HTTPException as e:
+                row.fail(f"role creation failed: {e}")
+            if done % 25 == 0 and done < len(rows):
+                await inter.edit_original_message(content=f"⏳ Created {done}/{len(rows)} role(s)…")
+
+
+def setup(bot):
+    bot.add_cog(ImportProducts(bot))
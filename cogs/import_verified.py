@@ -0,0 +1,163 @@
+import asyncio
+import codecs
+import csv
+import io
+import os
+import re
+import asyncpg
+import disnake
+from disnake.ext import commands
+from utils.database import get_database_pool, import_verified_licenses
+from utils.errors import DatabaseError
+from utils.permissions import is_authorized
+from utils.outbox import outbox_dispatcher
+import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+IMPORT_VERIFIED_MAX_BYTES = int(os.getenv("IMPORT_VERIFIED_MAX_BYTES", str(8 * 1024 * 1024)))
+IMPORT_VERIFIED_MAX_ROWS = int(os.getenv("IMPORT_VERIFIED_MAX_ROWS", "200000"))
+IMPORT_VERIFIED_CHUNK = int(os.getenv("IMPORT_VERIFIED_CHUNK", "5000"))
+_USER_MENTION = re.compile(r"^<@!?(\d+)>$")
+
+
+def parse_pairs(data: bytes) -> tuple[list[tuple[str, str]], int, int]:
+    """
+    Parse a user_id, product_name CSV (header optional; user IDs may be mentions). Returns the
+    distinct pairs in file order plus counts of invalid and duplicate rows.
+    """
+    reader = csv.reader(codecs.iterdecode(io.BytesIO(data), "utf-8-sig"))
+    pairs, seen = [], set()
+    invalid = duplicates = 0
+    columns, first = (0, 1), True
+    for record in reader:
+        if not any(cell.strip() for cell in record):
+            continue
+        if first:
+            first = False
+            header = [cell.strip().lower() for cell in record]
+            if "user_id" in header and "product_name" in header:
+                columns = (header.index("user_id"), header.index("product_name"))
+                continue
+        if len(record) <= max(columns):
+            invalid += 1
+            continue
+        user_ref, product_name = record[columns[0]].strip(), record[columns[1]].strip()
+        if match := _USER_MENTION.match(user_ref):
+            user_ref = match.group(1)
+        if not user_ref.isdigit() or not product_name:
+            invalid += 1
+            continue
+        pair = (user_ref, product_name)
+        if pair in seen:
+            duplicates += 1
+            continue
+        seen.add(pair)
+        pairs.append(pair)
+        if len(pairs) > IMPORT_VERIFIED_MAX_ROWS:
+            raise ValueError(f"the file has more than {IMPORT_VERIFIED_MAX_ROWS} rows")
+    return pairs, invalid, duplicates
+
+
+class ImportVerified(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.slash_command(
+        description="Import verified users from another bot as a CSV of user_id, product_name (owner or permitted roles).",
+    )
+    async def import_verified(
+        self,
+        inter: disnake.ApplicationCommandInteraction,
+        file: disnake.Attachment = commands.Param(description="CSV with columns user_id, product_name"),
+        grant_roles: bool = commands.Param(default=False, description="Also give imported users their product roles"),
+    ):
+        if not await is_authorized(inter, "import_verified"):
+            return
+
+        if file.size > IMPORT_VERIFIED_MAX_BYTES:
+            await inter.response.send_message(
+                f"❌ The file is too large (limit {IMPORT_VERIFIED_MAX_BYTES // (1024 * 1024)} MB).",
+                ephemeral=True, delete_after=config.message_timeout
+            )
+            return
+
+        await inter.response.defer(ephemeral=True)
+        guild = inter.guild
+
+        try:
+            pairs, invalid, duplicates = await asyncio.to_thread(parse_pairs, await file.read())
+        except (UnicodeDecodeError, csv.Error, ValueError) as e:
+            await inter.edit_original_message(content=f"❌ Couldn't import the file: {e}")
+            return
+
+        try:
+            async with (await get_database_pool()).acquire() as conn:
+                products = {
+                    row["product_name"]: row["role_id"] for row in await conn.fetch(
+                        "SELECT product_name, role_id FROM products WHERE guild_id = $1 AND product_name = ANY($2::text[])",
+                        str(guild.id), list({name for _, name in pairs})
+                    )
+                }
+        except asyncpg.PostgresError as e:
+            logger.error(f"[DB Error] Verified import pre-check failed in '{guild.name}': {e}")
+            await inter.edit_original_message(content="❌ Database error while checking products. Please try again.")
+            return
+
+        unknown = sorted({name for _, name in pairs if name not in products})
+        pairs = [pair for pair in pairs if pair[1] in products]
+        if not pairs:
+            await inter.edit_original_message(
+                content="❌ No rows to import." + (f" Unknown products: {', '.join(unknown[:10])}" if unknown else "")
+            )
+            return
+
+        imported = existing = grants = 0
+        chunks = range(0, len(pairs), IMPORT_VERIFIED_CHUNK)
+        for number, start in enumerate(chunks, start=1):
+            chunk = pairs[start:start + IMPORT_VERIFIED_CHUNK]
+            try:
+                inserted = await import_verified_licenses(guild.id, chunk, products if grant_roles else None)
+            except DatabaseError as e:
+                logger.error(f"[DB Error] Verified import failed in '{guild.name}' after {imported} row(s): {e.__cause__}")
+                await inter.edit_original_message(
+                    content=f"❌ Database error on chunk {number}/{len(chunks)}. "
+                            f"{imported} user(s) were imported before it stopped; running the import again is safe."
+                )
+                return
+            imported += len(inserted)
+            existing += len(chunk) - len(inserted)
+
+            if grant_roles:
+                # Queued in the outbox with the chunk; the dispatcher applies them.
+                queued = sum(1 for _, product_name in inserted if products[product_name])
+                if queued:
+                    grants += queued
+                    outbox_dispatcher.notify()
+
+            if number < len(chunks):
+                await inter.edit_original_message(
+                    content=f"⏳ Importing… {start + len(chunk)}/{len(pairs)} rows ({number}/{len(chunks)} chunks)."
+                )
+
+        logger.info(
+            f"[Verified Imported] {imported} verification(s) imported into '{guild.name}' by {inter.author} "
+            f"({existing} already present, {grants} role grant(s) queued)."
+        )
+        lines = [f"✅ Imported **{imported}** verification(s)."]
+        if existing:
+            lines.append(f"↩️ {existing} were already verified and left unchanged.")
+        if duplicates or invalid:
+            lines.append(f"⚠️ Skipped {duplicates} duplicate and {invalid} invalid row(s).")
+        if unknown:
+            shown = ", ".join(f"`{name}`" for name in unknown[:10])
+            more = f" and {len(unknown) - 10} more" if len(unknown) > 10 else ""
+            lines.append(f"❓ Rows for unknown products were skipped: {shown}{more}. Add them with `/add_product` first.")
+        if grants:
+            lines.append(f"🎭 {grants} role grant(s) queued — they'll be applied over the next few minutes.")
+        await inter.edit_original_message(content="\n".join(lines))
+
+
+def setup(bot):
+    bot.add_cog(ImportVerified(bot))
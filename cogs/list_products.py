@@ -2,6 +2,8 @@ import disnake
 from disnake.ext import commands
 from utils.database import get_database_pool
 from utils.permissions import is_authorized
+from utils.verification_stats import verification_stats
+from utils.errors import DatabaseError
 import config
 import logging
 
@@ -17,7 +19,7 @@ class ListProducts(commands.Cog):
 
         async with (await get_database_pool()).acquire() as conn:
             rows = await conn.fetch(
-                "SELECT product_name, role_id FROM products WHERE guild_id = $1",
+                "SELECT product_name, role_id, role_missing FROM products WHERE guild_id = $1",
                 str(inter.guild.id)
             )
 
@@ -29,12 +31,23 @@ class ListProducts(commands.Cog):
             )
             return
 
+        # Counts come from the write-behind counters, never from counting verified_licenses.
+        try:
+            totals = await verification_stats.product_totals(inter.guild.id)
+        except DatabaseError as e:
+            logger.error(f"[List Products] {e}")
+            totals = None
+
         # Prepare the full list of formatted lines
         product_entries = []
         for row in rows:
-            role = inter.guild.get_role(int(row["role_id"]))
+            role = inter.guild.get_role(int(row["role_id"])) if row["role_id"] and not row["role_missing"] else None
             role_display = role.mention if role else "*⚠️ Role deleted — use `/edit_product` to reassign*"
-            product_entries.append(f"• **{row['product_name']}** → {role_display}")
+            line = f"• **{row['product_name']}** → {role_display}"
+            if totals is not None:
+                stats = totals.get(row["product_name"], {"attempts": 0, "successes": 0})
+                line += f"\n  ✅ {stats['successes']} verified · {stats['attempts']} attempts"
+            product_entries.append(line)
 
         # The Paginated View for Listing
         class ListPaginatorView(disnake.ui.View):
@@ -6,10 +6,16 @@ import os
 from utils.encryption import decrypt_data
 from utils.database import get_database_pool
 from utils.validation import validate_license_key
+from utils.payhip import DECREASE_USAGE_URL, payhip_circuit
 from utils.errors import ValidationError
 from utils.permissions import is_authorized
+from utils.tracing import span, traced
+from utils.rate_limit import rate_limiter
+from utils.product_index import product_index
+from utils.verification_events import verification_events
 import config
 import logging
+from utils.logging_config import log_fields
 
 logger = logging.getLogger(__name__)
 
@@ -31,52 +37,86 @@ class ResetKeyModal(disnake.ui.Modal):
         ]
         super().__init__(title=f"Reset License: {display_name}", custom_id="reset_key_modal", components=components)
 
+    @traced("reset_key_modal")
     async def callback(self, interaction: disnake.ModalInteraction):
         license_key = interaction.text_values["license_key"].strip()
 
+        def log_ctx(outcome: str) -> dict:
+            return log_fields(interaction.guild_id, interaction.author.id, self.product_name, outcome)
+
+        def record(outcome: str, detail: str | None = None):
+            verification_events.record("reset", interaction.guild_id, product_name=self.product_name,
+                                       outcome=outcome, actor_id=interaction.author.id, detail=detail)
+
+        retry_after = await rate_limiter.check("reset_key", interaction)
+        if retry_after:
+            record("cooldown")
+            await interaction.response.send_message(
+                f"⏳ Too many attempts, try again in `{int(retry_after) + 1}s`.",
+                ephemeral=True, delete_after=config.message_timeout
+            )
+            return
+
         try:
             license_key = validate_license_key(license_key)
         except ValidationError as e:
+            record("invalid_input")
             await interaction.response.send_message(f"❌ {str(e)}", ephemeral=True, delete_after=config.message_timeout)
             return
 
-        PAYHIP_RESET_USAGE_URL = "https://payhip.com/api/v2/license/decrease"
+        PAYHIP_RESET_USAGE_URL = DECREASE_USAGE_URL
         headers = {
             "product-secret-key": self.product_secret_key,
             "payhip-api-key": self.payhip_api_key,
             "Accept-Encoding": "gzip, deflate"
         }
 
+        if not payhip_circuit.allow():
+            record("payhip_unavailable")
+            await interaction.response.send_message(
+                "❌ Payhip isn't responding right now. Please try again in a minute.",
+                ephemeral=True, delete_after=config.message_timeout
+            )
+            return
+
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.put(
-                    PAYHIP_RESET_USAGE_URL,
-                    headers=headers,
-                    data={"license_key": license_key},
-                    timeout=10
-                ) as response:
-                    if response.status == 200:
-                        logger.info(f"[Key Reset] License for '{self.product_name}' reset by {interaction.author} in '{interaction.guild.name}'.")
-                        await interaction.response.send_message(
-                            f"✅ License key for '{self.product_name}' has been reset successfully.",
-                            ephemeral=True, delete_after=config.message_timeout
-                        )
-                    else:
-                        body = await response.text()
-                        logger.error(f"[Key Reset Failed] Status {response.status} for '{self.product_name}' by {interaction.author}. Response: {body}")
-                        await interaction.response.send_message(
-                            f"❌ Failed to reset the license key. Status: {response.status}",
-                            ephemeral=True, delete_after=config.message_timeout
-                        )
+            with span("payhip"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.put(
+                        PAYHIP_RESET_USAGE_URL,
+                        headers=headers,
+                        data={"license_key": license_key},
+                        timeout=10
+                    ) as response:
+                        payhip_circuit.record_response(response.status)
+                        if response.status == 200:
+                            record("reset")
+                            logger.info(f"[Key Reset] License for '{self.product_name}' reset by {interaction.author} in '{interaction.guild.name}'.", extra=log_ctx("reset"))
+                            await interaction.response.send_message(
+                                f"✅ License key for '{self.product_name}' has been reset successfully.",
+                                ephemeral=True, delete_after=config.message_timeout
+                            )
+                        else:
+                            body = await response.text()
+                            record("reset_failed", f"HTTP {response.status}")
+                            logger.error(f"[Key Reset Failed] Status {response.status} for '{self.product_name}' by {interaction.author}. Response: {body}", extra=log_ctx("reset_failed"))
+                            await interaction.response.send_message(
+                                f"❌ Failed to reset the license key. Status: {response.status}",
+                                ephemeral=True, delete_after=config.message_timeout
+                            )
 
         except asyncio.TimeoutError:
-            logger.error(f"[Key Reset Timeout] Request timed out for '{self.product_name}' by {interaction.author}")
+            payhip_circuit.record_failure("timeout")
+            record("payhip_timeout")
+            logger.error(f"[Key Reset Timeout] Request timed out for '{self.product_name}' by {interaction.author}", extra=log_ctx("payhip_timeout"))
             await interaction.response.send_message(
                 "❌ Request timed out. Please try again later.",
                 ephemeral=True, delete_after=config.message_timeout
             )
         except aiohttp.ClientError as e:
-            logger.error(f"[Key Reset Error] Network error for '{self.product_name}' by {interaction.author}: {e}")
+            payhip_circuit.record_failure(type(e).__name__)
+            record("payhip_error", type(e).__name__)
+            logger.error(f"[Key Reset Error] Network error for '{self.product_name}' by {interaction.author}: {e}", extra=log_ctx("payhip_error"))
             await interaction.response.send_message(
                 "❌ Unable to reset license. Please try again later.",
                 ephemeral=True, delete_after=config.message_timeout
@@ -102,11 +142,12 @@ class ResetKey(commands.Cog):
         if not await is_authorized(inter, "reset_key"):
             return
 
-        async with (await get_database_pool()).acquire() as conn:
-            row = await conn.fetchrow(
-                "SELECT product_secret FROM products WHERE guild_id = $1 AND product_name = $2",
-                str(inter.guild.id), product_name
-            )
+        with span("db"):
+            async with (await get_database_pool()).acquire() as conn:
+                row = await conn.fetchrow(
+                    "SELECT product_secret FROM products WHERE guild_id = $1 AND product_name = $2",
+                    str(inter.guild.id), product_name
+                )
 
         if not row:
             await inter.response.send_message(
@@ -114,9 +155,14 @@ class ResetKey(commands.Cog):
             )
             return
 
-        product_secret_key = decrypt_data(row["product_secret"])
+        with span("crypto"):
+            product_secret_key = decrypt_data(row["product_secret"])
         await inter.response.send_modal(ResetKeyModal(product_name, product_secret_key, self.payhip_api_key))
 
+    @reset_key.autocomplete("product_name")
+    async def product_name_autocomplete(self, inter: disnake.ApplicationCommandInteraction, user_input: str):
+        return await product_index.complete(inter.guild_id, user_input)
+
 
 def setup(bot: commands.InteractionBot):
     bot.add_cog(ResetKey(bot))
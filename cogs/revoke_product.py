@@ -0,0 +1,188 @@
+import os
+import asyncpg
+import disnake
+from disnake.ext import commands
+from utils.database import get_database_pool
+from utils.permissions import is_authorized
+from utils.product_index import product_index
+from utils.outbox import outbox_dispatcher
+from utils.verification_events import verification_events
+import logging
+
+logger = logging.getLogger(__name__)
+
+REVOKE_CHUNK = int(os.getenv("REVOKE_CHUNK", "1000"))
+
+# (guild_id, product_name) pairs with a revoke in progress.
+_running: set[tuple[int, str]] = set()
+
+
+async def revoke_chunk(guild_id, product_name: str, role_id: str | None, limit: int) -> tuple[list[str], list[str]]:
+    """
+    Delete up to `limit` verifications of a product. Returns the revoked user IDs and, of those,
+    the ones whose role should come off: users still verified for another product with the
+    same role keep it. Their `remove_role` outbox entries are queued in the same transaction,
+    so a restart can't leave revoked users holding the role.
+    """
+    async with (await get_database_pool()).acquire() as conn:
+        async with conn.transaction():
+            revoked = [
+                row["user_id"] for row in await conn.fetch(
+                    """
+                    DELETE FROM verified_licenses WHERE ctid = ANY(ARRAY(
+                        SELECT ctid FROM verified_licenses WHERE guild_id = $1 AND product_name = $2 LIMIT $3
+                    ))
+                    RETURNING user_id
+                    """,
+                    str(guild_id), product_name, limit
+                )
+            ]
+            if not revoked:
+                return revoked, []
+            # Grants still waiting in the outbox would hand the role straight back.
+            await conn.execute(
+                """
+                DELETE FROM verification_outbox
+                WHERE guild_id = $1 AND product_name = $2 AND action = 'add_role' AND user_id = ANY($3::text[])
+                """,
+                str(guild_id), product_name, revoked
+            )
+            if not role_id:
+                return revoked, []
+            keep = {
+                row["user_id"] for row in await conn.fetch(
+                    """
+                    SELECT DISTINCT v.user_id FROM verified_licenses v
+                    JOIN products p ON p.guild_id = v.guild_id AND p.product_name = v.product_name
+                    WHERE v.guild_id = $1 AND p.role_id = $2 AND v.user_id = ANY($3::text[])
+                    """,
+                    str(guild_id), role_id, revoked
+                )
+            }
+            unroled = [user_id for user_id in revoked if user_id not in keep]
+            if unroled:
+                await conn.execute(
+                    """
+                    INSERT INTO verification_outbox (guild_id, user_id, product_name, action, role_id)
+                    SELECT $1, user_id, $2, 'remove_role', $3 FROM unnest($4::text[]) AS u (user_id)
+                    """,
+                    str(guild_id), product_name, role_id, unroled
+                )
+    return revoked, unroled
+
+
+class RevokeProduct(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+
+    @commands.slash_command(
+        description="Remove every verified user of a product and take their role away (owner or permitted roles).",
+    )
+    async def revoke_product(
+        self,
+        inter: disnake.ApplicationCommandInteraction,
+        product_name: str = commands.Param(description="Product whose verifications should be revoked"),
+        remove_roles: bool = commands.Param(default=True, description="Also remove the product role from revoked users"),
+    ):
+        if not await is_authorized(inter, "revoke_product"):
+            return
+
+        await inter.response.defer(ephemeral=True)
+        try:
+            async with (await get_database_pool()).acquire() as conn:
+                product = await conn.fetchrow(
+                    "SELECT role_id FROM products WHERE guild_id = $1 AND product_name = $2",
+                    str(inter.guild.id), product_name
+                )
+                count = await conn.fetchval(
+                    "SELECT COUNT(*) FROM verified_licenses WHERE guild_id = $1 AND product_name = $2",
+                    str(inter.guild.id), product_name
+                ) if product else 0
+        except asyncpg.PostgresError as e:
+            logger.error(f"[DB Error] Revoke pre-check failed for '{product_name}' in '{inter.guild.name}': {e}")
+            await inter.edit_original_message(content="❌ Database error while checking the product. Please try again.")
+            return
+
+        if not product:
+            await inter.edit_original_message(content=f"❌ Product '{product_name}' not found.")
+            return
+        if not count:
+            await inter.edit_original_message(content=f"ℹ️ Nobody is verified for **`{product_name}`**.")
+            return
+
+        role_note = " and remove their product role" if remove_roles and product["role_id"] else ""
+        await inter.edit_original_message(
+            content=f"⚠️ This will revoke **{count}** verification(s) of **`{product_name}`**{role_note}. "
+                    f"Their licenses stay used on Payhip. Continue?",
+            view=ConfirmRevokeView(inter, product_name, product["role_id"] if remove_roles else None, count)
+        )
+
+    @revoke_product.autocomplete("product_name")
+    async def product_name_autocomplete(self, inter: disnake.ApplicationCommandInteraction, user_input: str):
+        return await product_index.complete(inter.guild_id, user_input)
+
+
+class ConfirmRevokeView(disnake.ui.View):
+    def __init__(self, inter: disnake.ApplicationCommandInteraction, product_name: str, role_id: str | None, count: int):
+        super().__init__(timeout=60)
+        self.inter = inter
+        self.product_name = product_name
+        self.role_id = role_id
+        self.count = count
+
+    @disnake.ui.button(label="✅ Revoke", style=disnake.ButtonStyle.danger)
+    async def confirm(self, button: disnake.ui.Button, button_inter: disnake.MessageInteraction):
+        self.stop()
+        guild = self.inter.guild
+        key = (guild.id, self.product_name)
+        if key in _running:
+            await button_inter.response.edit_message(content=f"⏳ `{self.product_name}` is already being revoked.", view=None)
+            return
+        _running.add(key)
+        await button_inter.response.edit_message(content=f"⏳ Revoking `{self.product_name}`… 0/{self.count}", view=None)
+        try:
+            await self._revoke(guild, button_inter.author)
+        finally:
+            _running.discard(key)
+
+    async def _revoke(self, guild: disnake.Guild, actor: disnake.abc.User):
+        revoked = removals = 0
+        try:
+            while True:
+                users, unroled = await revoke_chunk(guild.id, self.product_name, self.role_id, REVOKE_CHUNK)
+                revoked += len(users)
+                for user_id in users:
+                    verification_events.record("revoke", guild.id, user_id, self.product_name, "revoked", actor_id=actor.id)
+                if unroled:
+                    removals += len(unroled)
+                    outbox_dispatcher.notify()
+                if len(users) < REVOKE_CHUNK:
+                    break
+                await self.inter.edit_original_message(
+                    content=f"⏳ Revoking `{self.product_name}`… {revoked}/{max(self.count, revoked)}"
+                )
+        except asyncpg.PostgresError as e:
+            logger.error(f"[DB Error] Revoke of '{self.product_name}' in '{guild.name}' stopped after {revoked} row(s): {e}")
+            await self.inter.edit_original_message(
+                content=f"❌ Database error after revoking {revoked} verification(s). Running `/revoke_product` again continues where it stopped."
+            )
+            return
+
+        logger.info(
+            f"[Product Revoked] {revoked} verification(s) of '{self.product_name}' revoked in '{guild.name}' by {actor} "
+            f"({removals} role removal(s) queued)."
+        )
+        lines = [f"✅ Revoked **{revoked}** verification(s) of **`{self.product_name}`**."]
+        if removals:
+            lines.append(f"🔒 {removals} role removal(s) queued — they'll be applied over the next few minutes.")
+        lines.append("To disable the licenses on Payhip, do so from your Payhip dashboard.")
+        await self.inter.edit_original_message(content="\n".join(lines))
+
+    @disnake.ui.button(label="❌ Cancel", style=disnake.ButtonStyle.secondary)
+    async def cancel(self, button: disnake.ui.Button, button_inter: disnake.MessageInteraction):
+        self.stop()
+        await button_inter.response.edit_message(content="Revoke cancelled 💨", view=None)
+
+
+def setup(bot):
+    bot.add_cog(RevokeProduct(bot))
@@ -2,6 +2,7 @@ import asyncpg
 import disnake
 from disnake.ext import commands
 from utils.database import get_database_pool
+from utils.guild_cache import guild_cache
 from utils.permissions import is_authorized
 import config
 import asyncio
@@ -13,22 +14,6 @@ logger = logging.getLogger(__name__)
 class SetLogChannel(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        # Schedule the database table creation as a background task after the bot is ready
-        self.bot.loop.create_task(self.setup_table())
-        
-    # Ensures the required table exists for storing log channel mappings
-    async def setup_table(self):
-        await self.bot.wait_until_ready()
-        try:
-            async with (await get_database_pool()).acquire() as conn:
-                await conn.execute("""
-                    CREATE TABLE IF NOT EXISTS server_log_channels (
-                        guild_id TEXT PRIMARY KEY,
-                        channel_id TEXT NOT NULL
-                    );
-                """)
-        except asyncpg.PostgresError as e:
-            logger.error(f"[DB Error] Failed to create server_log_channels table: {e}")
 
     @commands.slash_command(
         description="Set a channel to log successful verifications (owner or permitted roles).",
@@ -48,7 +33,7 @@ class SetLogChannel(commands.Cog):
                     """
                     INSERT INTO server_log_channels (guild_id, channel_id)
                     VALUES ($1, $2)
-                    ON CONFLICT (guild_id) DO UPDATE SET channel_id = $2
+                    ON CONFLICT (guild_id) DO UPDATE SET channel_id = $2, channel_missing = FALSE
                     """,
                     str(inter.guild.id), str(channel.id)
                 )
@@ -60,6 +45,7 @@ class SetLogChannel(commands.Cog):
                 delete_after=config.message_timeout
             )
             return
+        guild_cache.set_log_channel(inter.guild.id, channel.id)
 
         perms = channel.permissions_for(inter.guild.me)
         if not perms.send_messages or not perms.view_channel:
@@ -3,6 +3,7 @@ from disnake.ext import commands
 import config
 import logging
 from utils.database import get_role_permissions, set_role_permissions
+from utils.guild_cache import guild_cache
 from utils.permissions import PERMISSIONS, PERMISSION_LABELS
 
 logger = logging.getLogger(__name__)
@@ -27,6 +28,7 @@ class PermissionSelect(disnake.ui.StringSelect):
         # The submitted selection is the role's complete, replacing permission set.
         selected = set(self.values)
         await set_role_permissions(str(inter.guild.id), str(self.role.id), selected)
+        guild_cache.invalidate_permissions(inter.guild.id)
 
         if selected:
             granted = ", ".join(PERMISSION_LABELS[key] for key in selected)
@@ -2,6 +2,7 @@ import disnake
 import logging
 from disnake.ext import commands
 from utils.database import get_database_pool, fetch_products
+from utils.guild_cache import guild_cache
 from utils.permissions import is_authorized
 from handlers.verification_handler import create_verification_embed, create_verification_view
 import config
@@ -65,6 +66,7 @@ class StartVerification(commands.Cog):
                         """,
                         str(inter.guild.id), str(new_message.id), str(inter.channel.id)
                     )
+                    guild_cache.set_verification_channel(inter.guild.id, inter.channel.id)
                     await inter.response.send_message(
                         f"✅ New verification message created successfully.{no_products_note}",
                         ephemeral=True,
@@ -90,6 +92,7 @@ class StartVerification(commands.Cog):
                     """,
                     str(inter.guild.id), str(new_message.id), str(inter.channel.id)
                 )
+                guild_cache.set_verification_channel(inter.guild.id, inter.channel.id)
                 await inter.response.send_message(
                     f"✅ Verification message created successfully.{no_products_note}",
                     ephemeral=True,
@@ -0,0 +1,175 @@
+import disnake
+from utils.database import get_database_pool
+from utils.errors import DatabaseError
+from utils.tracing import span
+import asyncpg
+import config
+import logging
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 25  # Discord's limit on select options
+
+
+async def fetch_product_page(guild_id, after: str | None = None, before: str | None = None,
+                             search: str | None = None, limit: int = PAGE_SIZE) -> tuple[list[str], bool]:
+    """
+    One page of product names in name order, using the (guild_id, product_name) primary key as
+    the keyset: `after` pages forward, `before` pages back. Returns (names, more) where `more`
+    says whether another page exists in the direction of travel.
+    """
+    conditions = ["guild_id = $1"]
+    args = [str(guild_id)]
+    if search:
+        # Escape LIKE wildcards so the search is a plain substring match.
+        pattern = search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        args.append(f"%{pattern}%")
+        conditions.append(f"product_name ILIKE ${len(args)}")
+    if after is not None:
+        args.append(after)
+        conditions.append(f"product_name > ${len(args)}")
+    if before is not None:
+        args.append(before)
+        conditions.append(f"product_name < ${len(args)}")
+    args.append(limit + 1)
+    order = "DESC" if before is not None else "ASC"
+    query = (
+        f"SELECT product_name FROM products WHERE {' AND '.join(conditions)} "
+        f"ORDER BY product_name {order} LIMIT ${len(args)}"
+    )
+    try:
+        with span("db"):
+            async with (await get_database_pool()).acquire() as conn:
+                rows = await conn.fetch(query, *args)
+    except asyncpg.PostgresError as e:
+        raise DatabaseError(f"Failed to fetch products for guild {guild_id}.") from e
+    names = [row["product_name"] for row in rows[:limit]]
+    if before is not None:
+        names.reverse()
+    return names, len(rows) > limit
+
+
+class ProductSearchModal(disnake.ui.Modal):
+    def __init__(self, picker: "ProductPicker"):
+        self.picker = picker
+        components = [
+            disnake.ui.TextInput(
+                label="Product name contains",
+                custom_id="query",
+                value=picker.search or None,
+                required=False,
+                style=disnake.TextInputStyle.short,
+                max_length=100,
+            )
+        ]
+        super().__init__(title="Search Products", custom_id="product_search_modal", components=components)
+
+    async def callback(self, interaction: disnake.ModalInteraction):
+        self.picker.search = interaction.text_values["query"].strip() or None
+        await self.picker.load_page()
+        await interaction.response.edit_message(content=self.picker.content(), view=self.picker)
+
+
+class ProductPicker(disnake.ui.View):
+    """
+    Shared product chooser: a select with the current page of names, Previous/Next buttons
+    and a search modal. Only the visible page is held in memory; pages are fetched from the
+    database by keyset as the user moves, so catalogs of any size stay selectable.
+
+    `on_pick(interaction, product_name)` is awaited when a product is chosen.
+    """
+
+    def __init__(self, guild: disnake.Guild, on_pick, *, prompt: str, placeholder: str = "Choose a product",
+                 timeout: float = 120):
+        super().__init__(timeout=timeout)
+        self.guild = guild
+        self.on_pick = on_pick
+        self.prompt = prompt
+        self.placeholder = placeholder
+        self.search: str | None = None
+        self.names: list[str] = []
+        self.page = 0
+        self.has_prev = False
+        self.has_next = False
+        self.message = None
+
+    async def load_page(self, after: str | None = None, before: str | None = None):
+        names, more = await fetch_product_page(self.guild.id, after=after, before=before, search=self.search)
+        if after is None and before is None:
+            self.page = 0
+            self.has_prev, self.has_next = False, more
+        elif after is not None:
+            self.page += 1
+            self.has_prev, self.has_next = True, more
+        else:
+            self.page -= 1
+            self.has_prev, self.has_next = more, True
+        self.names = names
+        self._render()
+
+    def content(self) -> str:
+        if self.names:
+            return self.prompt if not self.search else f"{self.prompt} (matching **{self.search}**)"
+        return f"❌ No products match **{self.search}**." if self.search else "❌ No products found."
+
+    def _render(self):
+        self.clear_items()
+        if self.names:
+            dropdown = disnake.ui.StringSelect(
+                placeholder=f"{self.placeholder} (Page {self.page + 1})",
+                options=[disnake.SelectOption(label=name) for name in self.names],
+                row=0
+            )
+            dropdown.callback = self._select
+            self.add_item(dropdown)
+
+        buttons = [
+            ("⬅️ Previous", not self.has_prev, self._prev),
+            ("Next ➡️", not self.has_next, self._next),
+            ("🔍 Search", False, self._open_search),
+        ]
+        if self.search:
+            buttons.append(("✖ Clear search", False, self._clear_search))
+        for label, disabled, callback in buttons:
+            button = disnake.ui.Button(label=label, style=disnake.ButtonStyle.gray, disabled=disabled, row=1)
+            button.callback = callback
+            self.add_item(button)
+
+    async def send(self, inter: disnake.ApplicationCommandInteraction) -> bool:
+        """Send the first page as an ephemeral reply; returns False if the guild has no products."""
+        await self.load_page()
+        if not self.names:
+            await inter.response.send_message(
+                "❌ No products found. Add one first with `/add_product`.",
+                ephemeral=True, delete_after=config.message_timeout
+            )
+            return False
+        await inter.response.send_message(self.content(), view=self, ephemeral=True)
+        self.message = await inter.original_message()
+        return True
+
+    async def _select(self, interaction: disnake.MessageInteraction):
+        await self.on_pick(interaction, interaction.data["values"][0])
+
+    async def _prev(self, interaction: disnake.MessageInteraction):
+        await self.load_page(before=self.names[0] if self.names else None)
+        await interaction.response.edit_message(content=self.content(), view=self)
+
+    async def _next(self, interaction: disnake.MessageInteraction):
+        await self.load_page(after=self.names[-1] if self.names else None)
+        await interaction.response.edit_message(content=self.content(), view=self)
+
+    async def _open_search(self, interaction: disnake.MessageInteraction):
+        await interaction.response.send_modal(ProductSearchModal(self))
+
+    async def _clear_search(self, interaction: disnake.MessageInteraction):
+        self.search = None
+        await self.load_page()
+        await interaction.response.edit_message(content=self.content(), view=self)
+
+    async def on_timeout(self):
+        if self.message:
+            try:
+                await self.message.edit(content="❌ Session timed out. Run the command again.", view=None)
+            except (disnake.NotFound, disnake.Forbidden):
+                pass
@@ -1,11 +1,16 @@
+import asyncio
+from collections import OrderedDict
 import disnake
-from disnake.ext.commands import CooldownMapping, BucketType
 from handlers.verify_license_modal import VerifyLicenseModal
-from utils.database import fetch_products, get_database_pool, get_verified_license
+from utils.database import get_database_pool
+from utils.product_index import product_index, PRODUCT_INDEX_MAX_GUILDS
+from utils.tracing import span, traced
+from utils.rate_limit import rate_limiter
+from utils.role_scheduler import role_scheduler, APPLIED
 
 import config
-import time
 import logging
+from utils.logging_config import log_fields
 
 logger = logging.getLogger(__name__)
 
@@ -24,46 +29,78 @@ def create_verification_view():
     return VerificationButton()
 
 
-# Cooldown rate limiter: allows 1 verification request every 20 seconds per user
-verify_cooldown = CooldownMapping.from_cooldown(1, 20, BucketType.user)
+PAGE_SIZE = 24
+
+
+class _OptionPages:
+    """A guild's verify-dropdown options, built once per catalog version and shared by every open view."""
+
+    def __init__(self, version: int, names: tuple):
+        self.version = version
+        self.names = names
+        self.options = {
+            name: disnake.SelectOption(label=name, description=f"Verify {name}"[:100]) for name in names
+        }
+        option_list = list(self.options.values())
+        self.pages = [option_list[i:i + PAGE_SIZE] for i in range(0, len(option_list), PAGE_SIZE)]
+
+
+_option_pages: OrderedDict[str, _OptionPages] = OrderedDict()
+
+
+def get_option_pages(guild_id: str, names: tuple) -> _OptionPages:
+    # Reuse while the catalog version matches; the name check also catches edits made by another process.
+    version = product_index.version(guild_id)
+    cached = _option_pages.get(guild_id)
+    if cached is None or cached.version != version or cached.names != names:
+        cached = _option_pages[guild_id] = _OptionPages(version, names)
+    _option_pages.move_to_end(guild_id)
+    while len(_option_pages) > PRODUCT_INDEX_MAX_GUILDS:
+        _option_pages.popitem(last=False)
+    return cached
 
 
 class ProductPaginationView(disnake.ui.View):
-    def __init__(self, products: dict):
+    # Holds only the shared option pages, the page index and, when the user already owns some
+    # products, the names still left to verify. Secrets are fetched by the modal, not kept here.
+    def __init__(self, option_pages: _OptionPages, unowned: tuple | None = None):
         super().__init__(timeout=60)
-        self.products = products
-        self.product_names = list(products.keys())
+        self.option_pages = option_pages
+        self.unowned = unowned
         self.page = 0
-        self.page_size = 24
         self.update_items()
 
+    @property
+    def total(self) -> int:
+        return len(self.option_pages.names if self.unowned is None else self.unowned)
+
     def update_items(self):
         self.clear_items()
 
-        start = self.page * self.page_size
-        end = start + self.page_size
-        current_chunk = self.product_names[start:end]
+        start = self.page * PAGE_SIZE
+        end = start + PAGE_SIZE
+        if self.unowned is None:
+            options = self.option_pages.pages[self.page]
+        else:
+            options = [self.option_pages.options[name] for name in self.unowned[start:end]]
 
-        options = [
-            disnake.SelectOption(label=name, description=f"Verify {name}")
-            for name in current_chunk
-        ]
         dropdown = disnake.ui.StringSelect(placeholder=f"Products (Page {self.page + 1})", options=options)
         dropdown.callback = self.select_callback
         self.add_item(dropdown)
 
-        if len(self.product_names) > self.page_size:
+        if self.total > PAGE_SIZE:
             prev_btn = disnake.ui.Button(label="⬅️ Previous", disabled=(self.page == 0))
             prev_btn.callback = self.prev_page
 
-            next_btn = disnake.ui.Button(label="Next ➡️", disabled=(end >= len(self.product_names)))
+            next_btn = disnake.ui.Button(label="Next ➡️", disabled=(end >= self.total))
             next_btn.callback = self.next_page
 
             self.add_item(prev_btn)
             self.add_item(next_btn)
 
+    @traced("product_select")
     async def select_callback(self, interaction: disnake.MessageInteraction):
-        await handle_product_dropdown(interaction, self.products)
+        await handle_product_dropdown(interaction)
 
     async def prev_page(self, interaction: disnake.MessageInteraction):
         self.page -= 1
@@ -83,15 +120,18 @@ class VerificationButton(disnake.ui.View):
         button.callback = self.on_button_click
         self.add_item(button)
 
+    @traced("verify_button")
     async def on_button_click(self, interaction: disnake.MessageInteraction):
         guild_id = str(interaction.guild_id)
 
-        # Cooldown check
-        current = time.time()
-        bucket = verify_cooldown.get_bucket(interaction)
-        retry_after = bucket.update_rate_limit(current)
+        # Cooldown check (per-user by default; see utils/rate_limit.py for guild/global buckets)
+        retry_after = await rate_limiter.check("verify", interaction)
 
         if retry_after:
+            logger.warning(
+                f"[Cooldown] {interaction.user} clicked Verify too fast in '{interaction.guild.name}' ({retry_after:.0f}s left).",
+                extra=log_fields(interaction.guild_id, interaction.author.id, outcome="cooldown")
+            )
             await interaction.response.send_message(
                 f"⏳ You're clicking too fast, try again in `{int(retry_after)}s`.",
                 ephemeral=True, delete_after=config.message_timeout
@@ -100,48 +140,70 @@ class VerificationButton(disnake.ui.View):
 
         await interaction.response.defer(ephemeral=True)
 
-        products = await fetch_products(guild_id)
-        if not products:
+        # One round trip for the catalog, role IDs and which products this user already owns.
+        with span("db"):
+            async with (await get_database_pool()).acquire() as conn:
+                rows = await conn.fetch(
+                    """
+                    SELECT p.product_name, p.role_id, p.role_missing, v.user_id IS NOT NULL AS owned
+                    FROM products p
+                    LEFT JOIN verified_licenses v
+                        ON v.guild_id = p.guild_id AND v.product_name = p.product_name AND v.user_id = $2
+                    WHERE p.guild_id = $1
+                    ORDER BY p.product_name
+                    """,
+                    guild_id, str(interaction.author.id)
+                )
+        if not rows:
             await interaction.followup.send("❌ No products have been set up for this server yet. Contact the server owner.", ephemeral=True)
             return
 
-        async with (await get_database_pool()).acquire() as conn:
-            role_rows = await conn.fetch(
-                "SELECT product_name, role_id FROM products WHERE guild_id = $1",
-                guild_id
-            )
-        role_map = {row["product_name"]: row["role_id"] for row in role_rows}
-
-        reassigned_roles = []
-        unowned_products = {}
+        missing_roles = []
+        unowned = []
+        # Products whose role was deleted can't be verified until the owner reassigns one.
+        available = [row for row in rows if not row["role_missing"]]
 
-        for name, secret in products.items():
-            if await get_verified_license(interaction.author.id, guild_id, name):
-                role_id = role_map.get(name)
-                if role_id:
-                    role = disnake.utils.get(interaction.guild.roles, id=int(role_id))
+        for row in available:
+            if row["owned"]:
+                if row["role_id"]:
+                    role = interaction.guild.get_role(int(row["role_id"]))
                     if role and role not in interaction.author.roles:
-                        await interaction.author.add_roles(role)
-                        reassigned_roles.append(role.name)
+                        missing_roles.append(role)
             else:
-                unowned_products[name] = secret
+                unowned.append(row["product_name"])
+
+        outcomes = await asyncio.gather(*(
+            role_scheduler.add(interaction.guild.id, interaction.author.id, role.id, reason="KeyVerify: role reassigned")
+            for role in missing_roles
+        ), return_exceptions=True)
+        reassigned_roles = [role.name for role, outcome in zip(missing_roles, outcomes) if outcome == APPLIED]
+        failed_roles = [role.name for role, outcome in zip(missing_roles, outcomes) if outcome != APPLIED]
 
         if reassigned_roles:
             await interaction.followup.send(f"✅ Roles reassigned: {', '.join(reassigned_roles)}", ephemeral=True)
+        if failed_roles:
+            await interaction.followup.send(
+                f"⚠️ Couldn't reassign: {', '.join(failed_roles)}. Ask a server admin to check the bot's role permissions.",
+                ephemeral=True
+            )
 
-        if unowned_products:
-            view = ProductPaginationView(unowned_products)
+        if unowned:
+            option_pages = get_option_pages(guild_id, tuple(row["product_name"] for row in available))
+            # Most clickers own nothing yet, so their view can page straight through the shared options.
+            view = ProductPaginationView(option_pages, None if len(unowned) == len(available) else tuple(unowned))
             await interaction.followup.send("Select a product to verify:", view=view, ephemeral=True)
-        elif not reassigned_roles:
+        elif any(row["role_missing"] and not row["owned"] for row in rows):
+            await interaction.followup.send("⚠️ The remaining products can't be verified right now. The server owner has been notified.", ephemeral=True)
+        elif not missing_roles:
             await interaction.followup.send("✅ You are already fully verified for all products!", ephemeral=True)
 
 
-async def handle_product_dropdown(interaction, products):
+async def handle_product_dropdown(interaction):
     product_name = interaction.data["values"][0]
-    logger.info(f"[Product Selected] {interaction.user} selected '{product_name}' in '{interaction.guild.name}'.")
+    logger.info(f"[Product Selected] {interaction.user} selected '{product_name}' in '{interaction.guild.name}'.",
+                extra=log_fields(interaction.guild_id, interaction.author.id, product_name, "selected"))
 
-    product_secret_key = products[product_name]
-    modal = VerifyLicenseModal(product_name, product_secret_key)
+    modal = VerifyLicenseModal(product_name)
     try:
         await interaction.response.send_modal(modal)
     except disnake.NotFound:
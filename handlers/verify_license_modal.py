@@ -1,21 +1,41 @@
 import asyncio
 import disnake
 import aiohttp
-from utils.database import get_database_pool, save_verified_license
+from utils.database import get_database_pool, record_verification
+from utils.encryption import decrypt_data
 from utils.validation import validate_license_key
+from utils.payhip import VERIFY_URL, INCREMENT_USAGE_URL, payhip_circuit
 from utils.errors import ValidationError, DatabaseError
+from utils.tracing import span, traced
+from utils.rate_limit import rate_limiter
+from utils.work_queue import WorkQueue, QueueFullError
+from utils.outbox import outbox_dispatcher
+from utils.role_scheduler import role_scheduler, APPLIED
+from utils.verification_stats import verification_stats, VERIFIED
+from utils.verification_events import verification_events
 import config
 import logging
+import os
+from utils.logging_config import log_fields
 
 logger = logging.getLogger(__name__)
 
+# Every verification (Payhip calls, DB writes, role assignment, log post) runs on this bounded
+# pool, so a product launch queues up instead of opening thousands of connections at once.
+verification_queue = WorkQueue(
+    "verification",
+    workers=int(os.getenv("VERIFY_WORKERS", "20")),
+    max_depth=int(os.getenv("VERIFY_QUEUE_MAX", "500")),
+)
+
 
 # This modal is shown to users when they select a product to verify.
 # It prompts them to enter a license key, validates it via Payhip, and assigns the appropriate role if valid.
 class VerifyLicenseModal(disnake.ui.Modal):
-    def __init__(self, product_name, product_secret_key):
+    def __init__(self, product_name):
+        # The product secret is looked up when the modal is submitted, so open modals and the
+        # product dropdown views never hold decrypted secrets.
         self.product_name = product_name
-        self.product_secret_key = product_secret_key
 
         # --- FIX: Truncate Title for Discord Limit (45 chars) ---
         # "Verify " takes 7 characters, leaving 38 for the name.
@@ -35,127 +55,177 @@ class VerifyLicenseModal(disnake.ui.Modal):
         ]
         # Use 'display_name' for the UI title, but 'self.product_name' for logic
         super().__init__(title=f"Verify {display_name}", custom_id="verify_license_modal", components=components)
+        self._outcome: str | None = None
+
+    def _record(self, interaction: disnake.ModalInteraction, outcome: str):
+        # One outcome per submission: a reply whose edit fails must not be counted again as "error".
+        if self._outcome is not None:
+            return
+        self._outcome = outcome
+        verification_stats.record(interaction.guild_id, self.product_name, outcome)
+        verification_events.record("verify", interaction.guild_id, interaction.author.id, self.product_name, outcome)
 
     # Handles what happens after the user submits the modal.
     # It checks the license with Payhip, assigns a role, and logs the action if everything is valid.
+    @traced("verify_modal")
     async def callback(self, interaction: disnake.ModalInteraction):
         license_key = interaction.text_values["license_key"].strip()
 
+        def log_ctx(outcome: str) -> dict:
+            return log_fields(interaction.guild_id, interaction.author.id, self.product_name, outcome)
+
+        retry_after = await rate_limiter.check("license_submit", interaction)
+        if retry_after:
+            self._record(interaction, "cooldown")
+            logger.warning(f"[Cooldown] {interaction.user} is submitting license keys too fast in '{interaction.guild.name}'.", extra=log_ctx("cooldown"))
+            await interaction.response.send_message(
+                f"⏳ Too many attempts, try again in `{int(retry_after) + 1}s`.",
+                ephemeral=True, delete_after=config.message_timeout
+            )
+            return
+
         # Validate before deferring — no network call needed, so it's within the 3s window.
         try:
             license_key = validate_license_key(license_key)
         except ValidationError as e:
-            logger.warning(f"[Validation Failed] {interaction.user} provided invalid key in '{interaction.guild.name}': {str(e)}")
+            self._record(interaction, "invalid_input")
+            logger.warning(f"[Validation Failed] {interaction.user} provided invalid key in '{interaction.guild.name}': {str(e)}", extra=log_ctx("invalid_input"))
             await interaction.response.send_message(f"❌ {str(e)}", ephemeral=True, delete_after=config.message_timeout)
             return
 
         # Defer immediately — Payhip API + DB queries will exceed the 3s deadline.
         await interaction.response.defer(ephemeral=True)
 
-        PAYHIP_VERIFY_URL = f"https://payhip.com/api/v2/license/verify?license_key={license_key}"
-        PAYHIP_INCREMENT_USAGE_URL = "https://payhip.com/api/v2/license/usage"
-
-        headers = {
-            "product-secret-key": self.product_secret_key,
-            "Accept-Encoding": "gzip, deflate"
-        }
+        try:
+            result, position = verification_queue.submit(lambda: self._verify(interaction, license_key))
+        except QueueFullError:
+            self._record(interaction, "queue_full")
+            logger.warning(f"[Queue Full] Rejected verification by {interaction.user} in '{interaction.guild.name}'.", extra=log_ctx("queue_full"))
+            await interaction.edit_original_response(content="⏳ Verification is very busy right now. Please try again in a minute.")
+            return
 
-        async def reply(content: str):
-            await interaction.edit_original_response(content=content)
+        if position:
+            await interaction.edit_original_response(
+                content=f"⏳ You're in the queue (position {position}). This message will update with your result."
+            )
 
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(PAYHIP_VERIFY_URL, headers=headers, timeout=10) as response:
-                    if response.status != 200:
-                        body = await response.text()
-                        if response.status == 400:
-                            logger.warning(f"[Invalid Key] {interaction.user} entered an unrecognised key for '{self.product_name}' in '{interaction.guild.name}'.")
-                            await reply("❌ That license key wasn't found. Please double-check your key and try again.")
-                        else:
-                            logger.error(f"[Payhip Verify] Non-200 response ({response.status}) for '{self.product_name}' in '{interaction.guild.name}': {body}")
-                            await reply("❌ Failed to verify license with server. Please try again later.")
-                        return
+            await result
+        except Exception:
+            # Already logged by the worker; make sure the user isn't left looking at the queue message.
+            self._record(interaction, "error")
+            await interaction.edit_original_response(content="❌ Something went wrong while verifying. Please try again later.")
+
+    async def _verify(self, interaction: disnake.ModalInteraction, license_key: str):
+        def log_ctx(outcome: str) -> dict:
+            return log_fields(interaction.guild_id, interaction.author.id, self.product_name, outcome)
+
+        async def reply(content: str, outcome: str):
+            self._record(interaction, outcome)
+            await interaction.edit_original_response(content=content)
 
-                    try:
-                        full_response = await response.json()
-                    except Exception as e:
-                        logger.error(f"[Payhip Verify] Could not parse JSON response for '{self.product_name}': {e}")
-                        await reply("❌ Unexpected response from verification server.")
-                        return
+        user = interaction.author
+        guild = interaction.guild
 
-                    data = full_response.get("data")
+        with span("db"):
+            async with (await get_database_pool()).acquire() as conn:
+                row = await conn.fetchrow(
+                    "SELECT product_secret, role_id, role_missing FROM products WHERE guild_id = $1 AND product_name = $2",
+                    str(guild.id), self.product_name
+                )
+        if not row:
+            await reply(f"❌ '{self.product_name}' is no longer available. Please click Verify again.", "product_missing")
+            return
 
-                if not data or not data.get("enabled"):
-                    logger.warning(f"[Invalid License] {interaction.user} tried to use a disabled or invalid license in '{interaction.guild.name}'.")
-                    await reply("❌ This license is not valid or has been disabled.")
-                    return
+        # Check the role before Payhip consumes a use of the license; deletions are flagged as they happen.
+        role = guild.get_role(int(row["role_id"])) if row["role_id"] and not row["role_missing"] else None
+        if not role:
+            await reply("❌ The role associated with this product is missing or deleted.", "role_missing")
+            return
 
-                if data.get("uses", 0) > 0:
-                    logger.warning(f"[Already Used] {interaction.user} tried a used license ({data['uses']} uses) in '{interaction.guild.name}'.")
-                    await reply(f"❌ This license has already been used. Ask the server owner to reset it.")
-                    return
+        with span("crypto"):
+            product_secret_key = decrypt_data(row["product_secret"])
 
-                async with session.put(PAYHIP_INCREMENT_USAGE_URL, headers=headers, data={"license_key": license_key}, timeout=10) as increment_response:
-                    if increment_response.status != 200:
-                        body = await increment_response.text()
-                        logger.error(f"[Payhip Increment] Non-200 response ({increment_response.status}) for '{self.product_name}' by {interaction.user}: {body}")
-                        await reply("❌ Failed to mark the license as used.")
-                        return
+        PAYHIP_VERIFY_URL = f"{VERIFY_URL}?license_key={license_key}"
+        PAYHIP_INCREMENT_USAGE_URL = INCREMENT_USAGE_URL
 
-            user = interaction.author
-            guild = interaction.guild
+        headers = {
+            "product-secret-key": product_secret_key,
+            "Accept-Encoding": "gzip, deflate"
+        }
 
-            async with (await get_database_pool()).acquire() as conn:
-                row = await conn.fetchrow(
-                    "SELECT role_id FROM products WHERE guild_id = $1 AND product_name = $2",
-                    str(guild.id), self.product_name
-                )
-                if not row:
-                    await reply(f"❌ Role information for '{self.product_name}' is missing.")
-                    return
+        # Payhip has been failing repeatedly — answer now instead of after another 10s timeout.
+        if not payhip_circuit.allow():
+            logger.warning(f"[Payhip Unavailable] Skipped verification of '{self.product_name}' for {interaction.user}; circuit is open.", extra=log_ctx("payhip_unavailable"))
+            await reply("❌ The verification server isn't responding right now. Please try again in a minute.", "payhip_unavailable")
+            return
 
-                role_id = row["role_id"]
-                role = disnake.utils.get(guild.roles, id=int(role_id))
+        try:
+            with span("payhip"):
+                async with aiohttp.ClientSession() as session:
+                    async with session.get(PAYHIP_VERIFY_URL, headers=headers, timeout=10) as response:
+                        payhip_circuit.record_response(response.status)
+                        if response.status != 200:
+                            body = await response.text()
+                            if response.status == 400:
+                                logger.warning(f"[Invalid Key] {interaction.user} entered an unrecognised key for '{self.product_name}' in '{interaction.guild.name}'.", extra=log_ctx("invalid_key"))
+                                await reply("❌ That license key wasn't found. Please double-check your key and try again.", "invalid_key")
+                            else:
+                                logger.error(f"[Payhip Verify] Non-200 response ({response.status}) for '{self.product_name}' in '{interaction.guild.name}': {body}", extra=log_ctx("payhip_error"))
+                                await reply("❌ Failed to verify license with server. Please try again later.", "payhip_error")
+                            return
+
+                        try:
+                            full_response = await response.json()
+                        except Exception as e:
+                            logger.error(f"[Payhip Verify] Could not parse JSON response for '{self.product_name}': {e}", extra=log_ctx("payhip_error"))
+                            await reply("❌ Unexpected response from verification server.", "payhip_error")
+                            return
+
+                        data = full_response.get("data")
+
+                    if not data or not data.get("enabled"):
+                        logger.warning(f"[Invalid License] {interaction.user} tried to use a disabled or invalid license in '{interaction.guild.name}'.", extra=log_ctx("disabled"))
+                        await reply("❌ This license is not valid or has been disabled.", "disabled")
+                        return
 
-                if not role:
-                    await reply("❌ The role associated with this product is missing or deleted.")
-                    return
+                    if data.get("uses", 0) > 0:
+                        logger.warning(f"[Already Used] {interaction.user} tried a used license ({data['uses']} uses) in '{interaction.guild.name}'.", extra=log_ctx("already_used"))
+                        await reply(f"❌ This license has already been used. Ask the server owner to reset it.", "already_used")
+                        return
 
-            await user.add_roles(role)
-            logger.info(f"[Role Assigned] Gave role '{role.name}' to {user} in '{guild.name}' for product '{self.product_name}'.")
-            await reply(f"✅🎉 {user.mention}, your license for '{self.product_name}' is verified! Role '{role.name}' has been assigned.")
+                    async with session.put(PAYHIP_INCREMENT_USAGE_URL, headers=headers, data={"license_key": license_key}, timeout=10) as increment_response:
+                        payhip_circuit.record_response(increment_response.status)
+                        if increment_response.status != 200:
+                            body = await increment_response.text()
+                            logger.error(f"[Payhip Increment] Non-200 response ({increment_response.status}) for '{self.product_name}' by {interaction.user}: {body}", extra=log_ctx("increment_failed"))
+                            await reply("❌ Failed to mark the license as used.", "increment_failed")
+                            return
 
             try:
-                await save_verified_license(interaction.author.id, interaction.guild.id, self.product_name)
+                # Record the verification and queue the role grant and log post in one transaction;
+                # the outbox dispatcher applies them (with retries) right after we reply.
+                await record_verification(user.id, guild.id, self.product_name, role.id)
             except DatabaseError as e:
-                # Role already assigned — don't surface this to the user, just log it.
-                logger.error(f"[DB Error] Could not record verification for {user} in '{guild.name}': {e}")
+                # The license is already consumed — fall back to granting the role inline.
+                logger.error(f"[DB Error] Could not record verification for {user} in '{guild.name}': {e}", extra=log_ctx("db_error"))
+                outcome = await role_scheduler.add(guild.id, user.id, role.id, reason=f"KeyVerify: verified '{self.product_name}'")
+                if outcome != APPLIED:
+                    await reply(f"⚠️ Your license for '{self.product_name}' is verified, but the role couldn't be assigned. Please contact a server admin.", "role_failed")
+                    return
+                logger.info(f"[Role Assigned] Gave role '{role.name}' to {user} in '{guild.name}' for product '{self.product_name}'.", extra=log_ctx("verified"))
+                await reply(f"✅🎉 {user.mention}, your license for '{self.product_name}' is verified! Role '{role.name}' has been assigned.", VERIFIED)
+                return
 
-            try:
-                async with (await get_database_pool()).acquire() as conn:
-                    log_row = await conn.fetchrow(
-                        "SELECT channel_id FROM server_log_channels WHERE guild_id = $1",
-                        str(guild.id)
-                    )
-
-                if log_row:
-                    log_channel = guild.get_channel(int(log_row["channel_id"]))
-                    if log_channel:
-                        embed = disnake.Embed(
-                            title="License Activation",
-                            description=f"{user.mention} has registered the **{self.product_name}** product and has been granted the following role:",
-                            color=disnake.Color.green()
-                        )
-                        embed.add_field(name="• Role", value=role.mention, inline=False)
-                        embed.set_footer(text="Powered by KeyVerify")
-                        embed.timestamp = interaction.created_at
-                        await log_channel.send(embed=embed)
-            except Exception as e:
-                logger.warning(f"[Log Error] Failed to log license for {user}: {e}")
+            outbox_dispatcher.notify()
+            logger.info(f"[Verified] {user} verified '{self.product_name}' in '{guild.name}'; role '{role.name}' queued.", extra=log_ctx("verified"))
+            await reply(f"✅🎉 {user.mention}, your license for '{self.product_name}' is verified! Role '{role.name}' will be assigned in a moment.", VERIFIED)
 
         except asyncio.TimeoutError:
-            logger.error(f"[Payhip Timeout] Request timed out verifying '{self.product_name}' for {interaction.user}")
-            await reply("❌ Verification timed out. Please try again later.")
+            payhip_circuit.record_failure("timeout")
+            logger.error(f"[Payhip Timeout] Request timed out verifying '{self.product_name}' for {interaction.user}", extra=log_ctx("payhip_timeout"))
+            await reply("❌ Verification timed out. Please try again later.", "payhip_timeout")
         except aiohttp.ClientError as e:
-            logger.error(f"[Payhip Error] Network error verifying '{self.product_name}' for {interaction.user}: {e}")
-            await reply("❌ Unable to contact the verification server. Please try again later.")
+            payhip_circuit.record_failure(type(e).__name__)
+            logger.error(f"[Payhip Error] Network error verifying '{self.product_name}' for {interaction.user}: {e}", extra=log_ctx("payhip_error"))
+            await reply("❌ Unable to contact the verification server. Please try again later.", "payhip_error")
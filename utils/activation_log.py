@@ -0,0 +1,174 @@
+import asyncio
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import disnake
+
+logger = logging.getLogger(__name__)
+
+ACTIVATION_LOG_WINDOW = float(os.getenv("ACTIVATION_LOG_WINDOW", "5"))   # seconds to collect before posting
+
+_EMBEDS_PER_MESSAGE = 10      # Discord's limit
+_SUMMARY_CHARS = 3500         # keeps each summary embed well under the 4096/6000 char limits
+
+
+@dataclass
+class ActivationEvent:
+    user_id: str
+    product_name: str
+    role_mention: str
+    timestamp: datetime
+
+
+@dataclass
+class _Pending:
+    channel: disnake.abc.Messageable
+    events: list = field(default_factory=list)
+    futures: list = field(default_factory=list)
+
+
+class ActivationLog:
+    """
+    Collects "License Activation" events per guild for ACTIVATION_LOG_WINDOW seconds, then
+    posts them together: up to 10 individual embeds in one message, or compact summary
+    embeds for bigger bursts. A launch costs a handful of sends per channel instead of one
+    per verification, which keeps clear of Discord's per-channel rate limit.
+    """
+
+    def __init__(self, window: float = ACTIVATION_LOG_WINDOW):
+        self.window = window
+        self._pending: dict[int, _Pending] = {}
+        self._timers: dict[int, asyncio.Task] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self._posts: set[asyncio.Task] = set()
+        self._closing = False
+        self.events_posted = 0
+        self.messages_sent = 0
+        self.send_failures = 0
+
+    def add(self, guild_id: int, channel, event: ActivationEvent) -> asyncio.Future:
+        """Queue an event; the returned future resolves once it has been posted (or raises if the send failed)."""
+        future = asyncio.get_running_loop().create_future()
+        pending = self._pending.get(guild_id)
+        if pending is None or pending.channel.id != channel.id:
+            if pending is not None:
+                # Log channel changed mid-window: post what we have to the old one first.
+                timer = self._timers.pop(guild_id, None)
+                if timer is not None:
+                    timer.cancel()
+                self._spawn(self._post(guild_id, self._pending.pop(guild_id)))
+            pending = self._pending[guild_id] = _Pending(channel)
+        pending.events.append(event)
+        pending.futures.append(future)
+        if self._closing or self.window <= 0:
+            self._spawn(self.flush(guild_id))
+        elif guild_id not in self._timers:
+            self._timers[guild_id] = asyncio.create_task(self._flush_later(guild_id))
+        return future
+
+    def _spawn(self, coro):
+        # Held until done so the post isn't garbage-collected mid-flight; close() waits for them.
+        task = asyncio.create_task(coro)
+        self._posts.add(task)
+        task.add_done_callback(self._post_done)
+
+    def _post_done(self, task: asyncio.Task):
+        self._posts.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("[Activation Log] Posting activations failed", exc_info=task.exception())
+
+    async def _flush_later(self, guild_id: int):
+        await asyncio.sleep(self.window)
+        self._timers.pop(guild_id, None)
+        await self.flush(guild_id)
+
+    async def flush(self, guild_id: int):
+        pending = self._pending.pop(guild_id, None)
+        if pending is not None:
+            await self._post(guild_id, pending)
+
+    async def _post(self, guild_id: int, pending: _Pending):
+        lock = self._locks.setdefault(guild_id, asyncio.Lock())
+        async with lock:
+            for chunk, embeds in self._messages(pending.events):
+                futures = pending.futures[chunk]
+                try:
+                    await pending.channel.send(embeds=embeds)
+                except Exception as e:
+                    self.send_failures += 1
+                    logger.warning(f"[Activation Log] Failed to post {len(futures)} activation(s) for guild {guild_id}: {e}")
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                self.messages_sent += 1
+                self.events_posted += len(futures)
+                for future in futures:
+                    if not future.done():
+                        future.set_result(None)
+        if not self._pending.get(guild_id):
+            self._locks.pop(guild_id, None)
+
+    def _messages(self, events: list):
+        """Yield (slice of events, embeds) per message to send."""
+        if len(events) <= _EMBEDS_PER_MESSAGE:
+            yield slice(0, len(events)), [self._event_embed(e) for e in events]
+            return
+        # Big burst: one line per activation, packed into summary embeds.
+        start, lines, size = 0, [], 0
+        for i, event in enumerate(events):
+            line = f"<@{event.user_id}> — **{event.product_name}** → {event.role_mention}"
+            if lines and size + len(line) + 1 > _SUMMARY_CHARS:
+                yield slice(start, i), [self._summary_embed(lines, events[start:i])]
+                start, lines, size = i, [], 0
+            lines.append(line)
+            size += len(line) + 1
+        yield slice(start, len(events)), [self._summary_embed(lines, events[start:])]
+
+    @staticmethod
+    def _event_embed(event: ActivationEvent) -> disnake.Embed:
+        embed = disnake.Embed(
+            title="License Activation",
+            description=f"<@{event.user_id}> has registered the **{event.product_name}** product and has been granted the following role:",
+            color=disnake.Color.green()
+        )
+        embed.add_field(name="• Role", value=event.role_mention, inline=False)
+        embed.set_footer(text="Powered by KeyVerify")
+        embed.timestamp = event.timestamp
+        return embed
+
+    @staticmethod
+    def _summary_embed(lines: list, events: list) -> disnake.Embed:
+        embed = disnake.Embed(
+            title=f"License Activations ({len(events)})",
+            description="\n".join(lines),
+            color=disnake.Color.green()
+        )
+        embed.set_footer(text="Powered by KeyVerify")
+        embed.timestamp = events[-1].timestamp
+        return embed
+
+    async def close(self):
+        """Post everything still pending; later events are posted immediately."""
+        self._closing = True
+        for task in self._timers.values():
+            task.cancel()
+        self._timers.clear()
+        await asyncio.gather(*(self.flush(guild_id) for guild_id in list(self._pending)))
+        if self._posts:
+            await asyncio.gather(*self._posts, return_exceptions=True)
+
+    def snapshot(self) -> dict:
+        return {
+            "window_seconds": self.window,
+            "pending_events": sum(len(p.events) for p in self._pending.values()),
+            "pending_guilds": len(self._pending),
+            "events_posted": self.events_posted,
+            "messages_sent": self.messages_sent,
+            "send_failures": self.send_failures,
+        }
+
+
+activation_log = ActivationLog()
@@ -0,0 +1,231 @@
+import asyncio
+import logging
+import os
+import time
+
+import asyncpg
+
+from utils.database import get_database_pool
+from utils.errors import DatabaseError
+from utils.guild_cache import guild_cache
+from utils.product_index import product_index
+
+logger = logging.getLogger(__name__)
+
+CLEANUP_INTERVAL_SECONDS = float(os.getenv("CLEANUP_INTERVAL_SECONDS", "3600"))
+CLEANUP_GRACE_DAYS = float(os.getenv("CLEANUP_GRACE_DAYS", "7"))        # a re-invite within this keeps everything
+CLEANUP_BATCH = int(os.getenv("CLEANUP_BATCH", "1000"))                 # rows per DELETE
+CLEANUP_MAX_SECONDS = float(os.getenv("CLEANUP_MAX_SECONDS", "20"))     # time budget per run
+CLEANUP_PAUSE_SECONDS = float(os.getenv("CLEANUP_PAUSE_SECONDS", "0.2"))  # between batches
+
+# Everything keyed by a guild, deleted in this order when the guild's grace period is over.
+# Feedback and the blacklist are kept; verification_events ages out with its partitions.
+_GUILD_TABLES = [
+    "verified_licenses",
+    "verification_outbox",
+    "verification_stats",
+    "guild_role_permissions",
+    "server_log_channels",
+    "verification_message",
+    "products",
+]
+
+_ORPHAN_LICENSES = """
+    DELETE FROM verified_licenses WHERE ctid = ANY(ARRAY(
+        SELECT v.ctid FROM verified_licenses v
+        WHERE NOT EXISTS (
+            SELECT 1 FROM products p WHERE p.guild_id = v.guild_id AND p.product_name = v.product_name
+        )
+        LIMIT $1
+    ))
+"""
+
+
+def _deleted(status: str) -> int:
+    return int(status.split()[-1])
+
+
+class OrphanCleanup:
+    """
+    Deletes data nothing points at any more: rows for servers the bot left more than
+    CLEANUP_GRACE_DAYS ago (right away for blacklisted ones), and verified licenses of removed
+    products. Deletes run CLEANUP_BATCH rows at a time with a short pause between batches, and
+    a run stops after CLEANUP_MAX_SECONDS, so the job never holds long locks or competes with
+    verifications; whatever is left is picked up by the next run.
+    """
+
+    def __init__(self):
+        self._bot = None
+        self._task: asyncio.Task | None = None
+        self._cascades: set[asyncio.Task] = set()
+        self.rows_deleted = 0
+        self.guilds_purged = 0
+        self.runs = 0
+        self.last_run: dict | None = None
+
+    def start(self, bot):
+        """Start the periodic job; safe to call again on reconnect."""
+        if self._task is not None and not self._task.done():
+            return
+        self._bot = bot
+        self._task = asyncio.create_task(self._run(), name="orphan-cleanup")
+
+    async def stop(self):
+        tasks = [t for t in [self._task, *self._cascades] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        # Departures are only recorded against a complete guild list.
+        await self._bot.wait_until_ready()
+        while True:
+            try:
+                await self.run_once()
+            except (asyncpg.PostgresError, OSError, DatabaseError) as e:
+                logger.error(f"[Cleanup] Run failed: {e}")
+            await asyncio.sleep(CLEANUP_INTERVAL_SECONDS)
+
+    async def guild_left(self, guild_id):
+        """Start the grace period for a guild the bot was removed from."""
+        async with (await get_database_pool()).acquire() as conn:
+            await conn.execute(
+                "INSERT INTO guild_departures (guild_id) VALUES ($1) ON CONFLICT (guild_id) DO NOTHING", str(guild_id)
+            )
+        guild_cache.invalidate_guild(guild_id)
+
+    async def guild_joined(self, guild_id):
+        """Cancel a pending cleanup when the bot is invited back."""
+        async with (await get_database_pool()).acquire() as conn:
+            result = await conn.execute("DELETE FROM guild_departures WHERE guild_id = $1", str(guild_id))
+        if result != "DELETE 0":
+            logger.info(f"[Cleanup] Re-invited to guild {guild_id} within the grace period; its data is kept.")
+
+    def product_removed(self, guild_id, product_name: str):
+        """Delete a removed product's verified licenses and stats in the background."""
+        task = asyncio.create_task(self._purge_product(str(guild_id), product_name), name="product-cascade")
+        self._cascades.add(task)
+        task.add_done_callback(self._cascades.discard)
+
+    async def _purge_product(self, guild_id: str, product_name: str):
+        # Re-checked per batch: if the product is added back, its licenses belong to it again.
+        query = """
+            DELETE FROM {table} WHERE ctid = ANY(ARRAY(
+                SELECT ctid FROM {table}
+                WHERE guild_id = $1 AND product_name = $2
+                  AND NOT EXISTS (SELECT 1 FROM products WHERE guild_id = $1 AND product_name = $2)
+                LIMIT $3
+            ))
+        """
+        deleted = 0
+        try:
+            for table in ("verified_licenses", "verification_stats"):
+                async with (await get_database_pool()).acquire() as conn:
+                    while True:
+                        count = _deleted(await conn.execute(query.format(table=table), guild_id, product_name, CLEANUP_BATCH))
+                        deleted += count
+                        if count < CLEANUP_BATCH:
+                            break
+                        await asyncio.sleep(CLEANUP_PAUSE_SECONDS)
+        except (asyncpg.PostgresError, OSError, DatabaseError) as e:
+            # The periodic sweep finishes the licenses.
+            logger.error(f"[Cleanup] Cascade for '{product_name}' in guild {guild_id} stopped after {deleted} rows: {e}")
+        self.rows_deleted += deleted
+        if deleted:
+            logger.info(f"[Cleanup] Removed {deleted} rows left by product '{product_name}' in guild {guild_id}.")
+
+    async def run_once(self) -> dict:
+        started = time.monotonic()
+        deadline = started + CLEANUP_MAX_SECONDS
+        result = {"guilds_marked": 0, "guilds_purged": 0, "rows_deleted": 0, "finished": True}
+        current = [str(guild.id) for guild in self._bot.guilds] if self._bot else []
+
+        async with (await get_database_pool()).acquire() as conn:
+            # Reconcile with the live guild list: re-invites cancel, guilds left while offline start their grace.
+            await conn.execute("DELETE FROM guild_departures WHERE guild_id = ANY($1::text[])", current)
+            marked = await conn.fetch(
+                """
+                INSERT INTO guild_departures (guild_id)
+                SELECT guild_id FROM (
+                    SELECT guild_id FROM products
+                    UNION SELECT guild_id FROM guild_role_permissions
+                    UNION SELECT guild_id FROM server_log_channels
+                    UNION SELECT guild_id FROM verification_message
+                ) known
+                WHERE guild_id <> ALL($1::text[])
+                ON CONFLICT (guild_id) DO NOTHING
+                RETURNING guild_id
+                """,
+                current
+            )
+            result["guilds_marked"] = len(marked)
+            due = await conn.fetch(
+                """
+                SELECT guild_id FROM guild_departures d
+                WHERE left_at < NOW() - make_interval(secs => $1)
+                   OR EXISTS (SELECT 1 FROM blacklisted_guilds b WHERE b.guild_id = d.guild_id)
+                ORDER BY left_at
+                """,
+                CLEANUP_GRACE_DAYS * 86400
+            )
+
+            for row in due:
+                guild_id = row["guild_id"]
+                if self._bot and self._bot.get_guild(int(guild_id)):
+                    continue  # rejoined since the reconcile above
+                for table in _GUILD_TABLES:
+                    while True:
+                        if time.monotonic() > deadline:
+                            result["finished"] = False
+                            return self._finish(result, started)
+                        count = _deleted(await conn.execute(
+                            f"DELETE FROM {table} WHERE ctid = ANY(ARRAY(SELECT ctid FROM {table} WHERE guild_id = $1 LIMIT $2))",
+                            guild_id, CLEANUP_BATCH
+                        ))
+                        result["rows_deleted"] += count
+                        if count < CLEANUP_BATCH:
+                            break
+                        await asyncio.sleep(CLEANUP_PAUSE_SECONDS)
+                await conn.execute("DELETE FROM guild_departures WHERE guild_id = $1", guild_id)
+                product_index.invalidate(guild_id)
+                result["guilds_purged"] += 1
+                logger.info(f"[Cleanup] Purged data for guild {guild_id} after it was removed.")
+
+            # Licenses of products removed without a finished cascade (e.g. across a restart).
+            while time.monotonic() < deadline:
+                count = _deleted(await conn.execute(_ORPHAN_LICENSES, CLEANUP_BATCH))
+                result["rows_deleted"] += count
+                if count < CLEANUP_BATCH:
+                    break
+                await asyncio.sleep(CLEANUP_PAUSE_SECONDS)
+            else:
+                result["finished"] = False
+        return self._finish(result, started)
+
+    def _finish(self, result: dict, started: float) -> dict:
+        result["seconds"] = round(time.monotonic() - started, 3)
+        self.runs += 1
+        self.rows_deleted += result["rows_deleted"]
+        self.guilds_purged += result["guilds_purged"]
+        self.last_run = result
+        if result["rows_deleted"] or result["guilds_marked"]:
+            logger.info(
+                f"[Cleanup] Deleted {result['rows_deleted']} rows, purged {result['guilds_purged']} guilds, "
+                f"marked {result['guilds_marked']} departed guilds in {result['seconds']}s"
+                + ("." if result["finished"] else "; continuing next run.")
+            )
+        return result
+
+    def snapshot(self) -> dict:
+        return {
+            "grace_days": CLEANUP_GRACE_DAYS,
+            "runs": self.runs,
+            "rows_deleted": self.rows_deleted,
+            "guilds_purged": self.guilds_purged,
+            "cascades_running": len(self._cascades),
+            "last_run": self.last_run,
+        }
+
+
+orphan_cleanup = OrphanCleanup()
@@ -1,18 +1,177 @@
+import asyncio
 import asyncpg
 import logging
 from utils.encryption import decrypt_data, reencrypt_if_needed
 from utils.errors import DatabaseError, ConfigurationError, EncryptionError
-from dotenv import load_dotenv
+from utils.tracing import span
+from utils.startup import startup
 import os
 
-load_dotenv()
-
 DATABASE_URL = os.getenv("DATABASE_URL")
 database_pool = None
 
 logger = logging.getLogger(__name__)
 
 
+# Applied in one round trip at startup; every statement must be idempotent.
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS products (
+        guild_id TEXT NOT NULL,
+        product_name TEXT NOT NULL,
+        product_secret TEXT NOT NULL,
+        role_id TEXT,
+        PRIMARY KEY (guild_id, product_name)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS verification_message (
+        guild_id TEXT NOT NULL PRIMARY KEY,
+        message_id TEXT,
+        channel_id TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS verified_licenses (
+        user_id TEXT NOT NULL,
+        guild_id TEXT NOT NULL,
+        product_name TEXT NOT NULL,
+        verified_at TIMESTAMPTZ DEFAULT NOW(),
+        PRIMARY KEY (user_id, guild_id, product_name)
+    )
+    """,
+    """
+    ALTER TABLE verified_licenses ADD COLUMN IF NOT EXISTS verified_at TIMESTAMPTZ DEFAULT NOW()
+    """,
+    """
+    ALTER TABLE verified_licenses DROP COLUMN IF EXISTS license_key
+    """,
+    # Per-guild and per-product lookups (cleanup, cascades) without scanning the table.
+    """
+    CREATE INDEX IF NOT EXISTS verified_licenses_guild_product
+    ON verified_licenses (guild_id, product_name)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS blacklisted_guilds (
+        guild_id TEXT PRIMARY KEY,
+        reason   TEXT,
+        added_at TIMESTAMPTZ DEFAULT NOW()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS bot_settings (
+        key   TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS guild_role_permissions (
+        guild_id   TEXT NOT NULL,
+        role_id    TEXT NOT NULL,
+        permission TEXT NOT NULL,
+        PRIMARY KEY (guild_id, role_id, permission)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS feedback (
+        id          SERIAL PRIMARY KEY,
+        guild_id    TEXT NOT NULL,
+        guild_name  TEXT,
+        author_id   TEXT NOT NULL,
+        author_name TEXT,
+        subject     TEXT,
+        message     TEXT NOT NULL,
+        created_at  TIMESTAMPTZ DEFAULT NOW()
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS rate_limit_buckets (
+        key          TEXT PRIMARY KEY,
+        window_start DOUBLE PRECISION NOT NULL,
+        hits         INTEGER NOT NULL,
+        expires_at   DOUBLE PRECISION NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS server_log_channels (
+        guild_id   TEXT PRIMARY KEY,
+        channel_id TEXT NOT NULL
+    )
+    """,
+    """
+    ALTER TABLE server_log_channels ADD COLUMN IF NOT EXISTS permission_warned BOOLEAN DEFAULT FALSE
+    """,
+    # Set by the role/channel delete listeners (utils/reconcile.py), cleared when reassigned.
+    """
+    ALTER TABLE server_log_channels ADD COLUMN IF NOT EXISTS channel_missing BOOLEAN NOT NULL DEFAULT FALSE
+    """,
+    """
+    ALTER TABLE products ADD COLUMN IF NOT EXISTS role_missing BOOLEAN NOT NULL DEFAULT FALSE
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS verification_outbox (
+        id              BIGSERIAL PRIMARY KEY,
+        guild_id        TEXT NOT NULL,
+        user_id         TEXT NOT NULL,
+        product_name    TEXT NOT NULL,
+        action          TEXT NOT NULL,
+        role_id         TEXT,
+        attempts        INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        last_error      TEXT,
+        dead            BOOLEAN NOT NULL DEFAULT FALSE,
+        created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS verification_outbox_due
+    ON verification_outbox (next_attempt_at) WHERE NOT dead
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS verification_stats (
+        guild_id     TEXT NOT NULL,
+        product_name TEXT NOT NULL,
+        day          DATE NOT NULL,
+        outcome      TEXT NOT NULL,
+        count        INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, product_name, day, outcome)
+    )
+    """,
+    # Guilds the bot was removed from; their data is deleted once the grace period is over.
+    """
+    CREATE TABLE IF NOT EXISTS guild_departures (
+        guild_id TEXT PRIMARY KEY,
+        left_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
+    )
+    """,
+    # Partitions (one per month) are created and dropped by utils/verification_events.py.
+    """
+    CREATE TABLE IF NOT EXISTS verification_events (
+        occurred_at  TIMESTAMPTZ NOT NULL,
+        event_type   TEXT NOT NULL,
+        guild_id     TEXT NOT NULL,
+        user_id      TEXT,
+        actor_id     TEXT,
+        product_name TEXT,
+        outcome      TEXT NOT NULL,
+        detail       TEXT
+    ) PARTITION BY RANGE (occurred_at)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS verification_events_guild
+    ON verification_events (guild_id, occurred_at)
+    """,
+    # One-time backfill of past successes so product totals don't start from zero.
+    """
+    INSERT INTO verification_stats (guild_id, product_name, day, outcome, count)
+    SELECT guild_id, product_name, (verified_at AT TIME ZONE 'UTC')::date, 'verified', COUNT(*)
+    FROM verified_licenses
+    WHERE verified_at IS NOT NULL AND NOT EXISTS (SELECT 1 FROM verification_stats)
+    GROUP BY 1, 2, 3
+    """,
+]
+
+
 async def initialize_database():
     global database_pool
 
@@ -20,79 +179,15 @@ async def initialize_database():
         raise ConfigurationError("DATABASE_URL is not set in environment variables.")
 
     try:
-        pool = await asyncpg.create_pool(DATABASE_URL)
+        with startup.phase("db_connect"):
+            pool = await asyncpg.create_pool(DATABASE_URL)
     except Exception as e:
         raise DatabaseError("Could not connect to the database.") from e
 
     try:
-        async with pool.acquire() as conn:
-            await conn.execute("""
-            CREATE TABLE IF NOT EXISTS products (
-                guild_id TEXT NOT NULL,
-                product_name TEXT NOT NULL,
-                product_secret TEXT NOT NULL,
-                role_id TEXT,
-                PRIMARY KEY (guild_id, product_name)
-            )
-            """)
-            await conn.execute("""
-            CREATE TABLE IF NOT EXISTS verification_message (
-                guild_id TEXT NOT NULL PRIMARY KEY,
-                message_id TEXT,
-                channel_id TEXT
-            )
-            """)
-            await conn.execute("""
-            CREATE TABLE IF NOT EXISTS verified_licenses (
-                user_id TEXT NOT NULL,
-                guild_id TEXT NOT NULL,
-                product_name TEXT NOT NULL,
-                verified_at TIMESTAMPTZ DEFAULT NOW(),
-                PRIMARY KEY (user_id, guild_id, product_name)
-            )
-            """)
-            await conn.execute("""
-            ALTER TABLE verified_licenses ADD COLUMN IF NOT EXISTS verified_at TIMESTAMPTZ DEFAULT NOW()
-            """)
-            await conn.execute("""
-            ALTER TABLE verified_licenses DROP COLUMN IF EXISTS license_key
-            """)
-            await conn.execute("""
-            CREATE TABLE IF NOT EXISTS blacklisted_guilds (
-                guild_id TEXT PRIMARY KEY,
-                reason   TEXT,
-                added_at TIMESTAMPTZ DEFAULT NOW()
-            )
-            """)
-            await conn.execute("""
-            CREATE TABLE IF NOT EXISTS bot_settings (
-                key   TEXT PRIMARY KEY,
-                value TEXT NOT NULL
-            )
-            """)
-            await conn.execute("""
-            CREATE TABLE IF NOT EXISTS guild_role_permissions (
-                guild_id   TEXT NOT NULL,
-                role_id    TEXT NOT NULL,
-                permission TEXT NOT NULL,
-                PRIMARY KEY (guild_id, role_id, permission)
-            )
-            """)
-            await conn.execute("""
-            CREATE TABLE IF NOT EXISTS feedback (
-                id          SERIAL PRIMARY KEY,
-                guild_id    TEXT NOT NULL,
-                guild_name  TEXT,
-                author_id   TEXT NOT NULL,
-                author_name TEXT,
-                subject     TEXT,
-                message     TEXT NOT NULL,
-                created_at  TIMESTAMPTZ DEFAULT NOW()
-            )
-            """)
-            await conn.execute("""
-            ALTER TABLE server_log_channels ADD COLUMN IF NOT EXISTS permission_warned BOOLEAN DEFAULT FALSE
-            """)
+        with startup.phase("db_schema"):
+            async with pool.acquire() as conn:
+                await conn.execute(";\n".join(_SCHEMA))
     except asyncpg.PostgresError as e:
         await pool.close()
         raise DatabaseError("Failed to initialize database schema.") from e
@@ -173,26 +268,14 @@ async def save_feedback(guild_id, guild_name, author_id, author_name, subject, m
         raise DatabaseError("Failed to save feedback.") from e
 
 
-async def get_role_ids_with_permission(guild_id, permission) -> set:
-    # All role IDs granted a given capability, used to authorize an incoming command.
-    try:
-        async with (await get_database_pool()).acquire() as conn:
-            rows = await conn.fetch(
-                "SELECT role_id FROM guild_role_permissions WHERE guild_id = $1 AND permission = $2",
-                str(guild_id), permission
-            )
-        return {row["role_id"] for row in rows}
-    except asyncpg.PostgresError as e:
-        raise DatabaseError(f"Failed to fetch roles for permission '{permission}'.") from e
-
-
 async def fetch_products(guild_id) -> dict:
     try:
-        async with (await get_database_pool()).acquire() as conn:
-            rows = await conn.fetch(
-                "SELECT product_name, product_secret FROM products WHERE guild_id = $1", guild_id
-            )
-            return {row["product_name"]: decrypt_data(row["product_secret"]) for row in rows}
+        with span("db"):
+            async with (await get_database_pool()).acquire() as conn:
+                rows = await conn.fetch(
+                    "SELECT product_name, product_secret FROM products WHERE guild_id = $1", guild_id
+                )
+                return {row["product_name"]: decrypt_data(row["product_secret"]) for row in rows}
     except EncryptionError:
         raise
     except asyncpg.PostgresError as e:
@@ -201,64 +284,151 @@ async def fetch_products(guild_id) -> dict:
 
 async def save_verified_license(user_id, guild_id, product_name):
     try:
-        async with (await get_database_pool()).acquire() as conn:
-            await conn.execute(
-                """
-                INSERT INTO verified_licenses (user_id, guild_id, product_name)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (user_id, guild_id, product_name)
-                DO NOTHING
-                """,
-                str(user_id), str(guild_id), product_name
-            )
+        with span("db"):
+            async with (await get_database_pool()).acquire() as conn:
+                await conn.execute(
+                    """
+                    INSERT INTO verified_licenses (user_id, guild_id, product_name)
+                    VALUES ($1, $2, $3)
+                    ON CONFLICT (user_id, guild_id, product_name)
+                    DO NOTHING
+                    """,
+                    str(user_id), str(guild_id), product_name
+                )
     except asyncpg.PostgresError as e:
         raise DatabaseError(f"Failed to save verified license for user {user_id}.") from e
 
 
+async def record_verification(user_id, guild_id, product_name, role_id,
+                              actions=("add_role", "log_activation")):
+    # The verification record and its pending side effects commit together, so a crash or a
+    # Discord error can't leave a consumed license without a record, role or log entry.
+    # utils.outbox.OutboxDispatcher applies the queued actions.
+    try:
+        with span("db"):
+            async with (await get_database_pool()).acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(
+                        """
+                        INSERT INTO verified_licenses (user_id, guild_id, product_name)
+                        VALUES ($1, $2, $3)
+                        ON CONFLICT (user_id, guild_id, product_name)
+                        DO NOTHING
+                        """,
+                        str(user_id), str(guild_id), product_name
+                    )
+                    await conn.executemany(
+                        """
+                        INSERT INTO verification_outbox (guild_id, user_id, product_name, action, role_id)
+                        VALUES ($1, $2, $3, $4, $5)
+                        """,
+                        [(str(guild_id), str(user_id), product_name, action, str(role_id)) for action in actions]
+                    )
+    except asyncpg.PostgresError as e:
+        raise DatabaseError(f"Failed to record verification for user {user_id}.") from e
+
+
+async def import_verified_licenses(guild_id, records, roles: dict | None = None) -> list[tuple[str, str]]:
+    """
+    Bulk-load one chunk of (user_id, product_name) pairs for a guild. The chunk is COPYed into a
+    temporary table and merged in one statement, so existing pairs are skipped without a
+    round trip per row. Returns the pairs that were actually inserted.
+
+    With `roles` (product_name -> role_id), an `add_role` outbox entry is queued for every
+    inserted pair whose product has a role, in the same transaction, like record_verification.
+    """
+    try:
+        with span("db"):
+            async with (await get_database_pool()).acquire() as conn:
+                async with conn.transaction():
+                    await conn.execute(
+                        "CREATE TEMP TABLE verified_import (user_id TEXT, product_name TEXT) ON COMMIT DROP"
+                    )
+                    await conn.copy_records_to_table("verified_import", records=records)
+                    rows = await conn.fetch(
+                        """
+                        INSERT INTO verified_licenses (user_id, guild_id, product_name)
+                        SELECT user_id, $1, product_name FROM verified_import
+                        ON CONFLICT (user_id, guild_id, product_name)
+                        DO NOTHING
+                        RETURNING user_id, product_name
+                        """,
+                        str(guild_id)
+                    )
+                    inserted = [(row["user_id"], row["product_name"]) for row in rows]
+                    grants = [(user_id, name, roles[name]) for user_id, name in inserted if roles and roles.get(name)]
+                    if grants:
+                        await conn.execute(
+                            """
+                            INSERT INTO verification_outbox (guild_id, user_id, product_name, action, role_id)
+                            SELECT $1, user_id, product_name, 'add_role', role_id
+                            FROM unnest($2::text[], $3::text[], $4::text[]) AS g (user_id, product_name, role_id)
+                            """,
+                            str(guild_id), *(list(column) for column in zip(*grants))
+                        )
+                    return inserted
+    except asyncpg.PostgresError as e:
+        raise DatabaseError(f"Failed to import verified licenses for guild {guild_id}.") from e
+
+
 async def get_verified_license(user_id, guild_id, product_name) -> bool:
     try:
-        async with (await get_database_pool()).acquire() as conn:
-            row = await conn.fetchrow(
-                """
-                SELECT 1 FROM verified_licenses
-                WHERE user_id = $1 AND guild_id = $2 AND product_name = $3
-                """,
-                str(user_id), str(guild_id), product_name
-            )
-            return row is not None
+        with span("db"):
+            async with (await get_database_pool()).acquire() as conn:
+                row = await conn.fetchrow(
+                    """
+                    SELECT 1 FROM verified_licenses
+                    WHERE user_id = $1 AND guild_id = $2 AND product_name = $3
+                    """,
+                    str(user_id), str(guild_id), product_name
+                )
+                return row is not None
     except asyncpg.PostgresError as e:
         raise DatabaseError(f"Failed to check verified license for user {user_id}.") from e
 
 
+def _rotated_secrets(rows) -> list[tuple[str, str, str, str]]:
+    updates = []
+    for row in rows:
+        original_secret = row["product_secret"]
+        try:
+            new_secret = reencrypt_if_needed(original_secret)
+        except EncryptionError as e:
+            logger.error(
+                f"[Key Rotation] Failed to re-encrypt product '{row['product_name']}' "
+                f"in guild {row['guild_id']}: {e}"
+            )
+            continue
+        if original_secret != new_secret:
+            updates.append((new_secret, row["guild_id"], row["product_name"], original_secret))
+    return updates
+
+
 async def run_auto_rotation():
     logger.info("Checking for data validation and key rotation...")
 
     pool = await get_database_pool()
-    rotated_count = 0
 
     try:
         async with pool.acquire() as conn:
             rows = await conn.fetch("SELECT guild_id, product_name, product_secret FROM products")
-            for row in rows:
-                original_secret = row["product_secret"]
-                try:
-                    new_secret = reencrypt_if_needed(original_secret)
-                except EncryptionError as e:
-                    logger.error(
-                        f"[Key Rotation] Failed to re-encrypt product '{row['product_name']}' "
-                        f"in guild {row['guild_id']}: {e}"
-                    )
-                    continue
-                if original_secret != new_secret:
-                    await conn.execute(
-                        "UPDATE products SET product_secret = $1 WHERE guild_id = $2 AND product_name = $3",
-                        new_secret, row["guild_id"], row["product_name"]
-                    )
-                    rotated_count += 1
     except asyncpg.PostgresError as e:
         raise DatabaseError("Key rotation failed during database operation.") from e
 
-    if rotated_count > 0:
-        logger.info(f"SECURITY ROTATION: Re-encrypted {rotated_count} records with the new key.")
+    # Runs alongside live traffic after startup, so the per-row crypto stays off the event loop.
+    updates = await asyncio.to_thread(_rotated_secrets, rows)
+
+    if updates:
+        try:
+            async with pool.acquire() as conn:
+                await conn.executemany(
+                    # Only if unchanged since the read — a product replaced meanwhile keeps its new secret.
+                    "UPDATE products SET product_secret = $1 "
+                    "WHERE guild_id = $2 AND product_name = $3 AND product_secret = $4",
+                    updates
+                )
+        except asyncpg.PostgresError as e:
+            raise DatabaseError("Key rotation failed during database operation.") from e
+        logger.info(f"SECURITY ROTATION: Re-encrypted {len(updates)} records with the new key.")
     else:
         logger.info("Database is already fully encrypted with the latest key.")
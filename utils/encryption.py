@@ -1,26 +1,36 @@
-from cryptography.fernet import Fernet, MultiFernet
+import functools
 import os
-from dotenv import load_dotenv
 from utils.errors import ConfigurationError, EncryptionError
 
-load_dotenv()
 
-keys_str = os.getenv("ENCRYPTION_KEYS") or os.getenv("ENCRYPTION_KEY")
-if not keys_str:
-    raise ConfigurationError("No encryption keys found in .env (ENCRYPTION_KEYS or ENCRYPTION_KEY).")
+@functools.cache
+def _ciphers():
+    # Built on first use rather than at import, so loading the bot doesn't pay for the
+    # cryptography import and key parsing before it can connect. Bad keys still surface
+    # early: the key rotation check right after startup is the first caller.
+    from cryptography.fernet import Fernet, MultiFernet
 
-# key[0] is the Primary (New) key. key[1+] are Old keys used for decryption only.
-keys = [k.strip() for k in keys_str.split(",") if k.strip()]
-try:
-    fernet_instances = [Fernet(k.encode()) for k in keys]
-except Exception as e:
-    raise ConfigurationError(f"Invalid Fernet key format in ENCRYPTION_KEYS.") from e
+    keys_str = os.getenv("ENCRYPTION_KEYS") or os.getenv("ENCRYPTION_KEY")
+    if not keys_str:
+        raise ConfigurationError("No encryption keys found in .env (ENCRYPTION_KEYS or ENCRYPTION_KEY).")
+
+    # key[0] is the Primary (New) key. key[1+] are Old keys used for decryption only.
+    keys = [k.strip() for k in keys_str.split(",") if k.strip()]
+    try:
+        fernet_instances = [Fernet(k.encode()) for k in keys]
+    except Exception as e:
+        raise ConfigurationError(f"Invalid Fernet key format in ENCRYPTION_KEYS.") from e
+
+    return fernet_instances[0], MultiFernet(fernet_instances)
 
-cipher_suite = MultiFernet(fernet_instances)
+
+def _cipher_suite():
+    return _ciphers()[1]
 
 
 def encrypt_data(data: str) -> str:
     """Encrypts data using the PRIMARY (Newest) key."""
+    cipher_suite = _cipher_suite()
     try:
         return cipher_suite.encrypt(data.encode()).decode()
     except Exception as e:
@@ -29,6 +39,7 @@ def encrypt_data(data: str) -> str:
 
 def decrypt_data(data: str) -> str:
     """Decrypts data using any valid key."""
+    cipher_suite = _cipher_suite()
     try:
         return cipher_suite.decrypt(data.encode()).decode()
     except Exception as e:
@@ -43,6 +54,14 @@ def reencrypt_if_needed(token: str) -> str:
     """
     if not token:
         return token
+    primary, cipher_suite = _ciphers()
+    # MultiFernet.rotate always produces a fresh token, so check the primary key first —
+    # otherwise every startup would rewrite every secret.
+    try:
+        primary.decrypt(token.encode())
+        return token
+    except Exception:
+        pass
     try:
         return cipher_suite.rotate(token.encode()).decode()
     except Exception as e:
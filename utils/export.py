@@ -0,0 +1,111 @@
+import base64
+import datetime
+import json
+import logging
+import os
+
+from utils.database import get_database_pool
+
+logger = logging.getLogger(__name__)
+
+EXPORT_PAGE_ROWS = int(os.getenv("EXPORT_PAGE_ROWS", "5000"))
+
+
+class ExportSpec:
+    def __init__(self, table: str, columns: list[str], key: list[str], guild_column: str | None, date_column: str | None):
+        self.table = table
+        self.columns = columns
+        self.key = key                  # keyset order; must match an index (the primary key here)
+        self.guild_column = guild_column
+        self.date_column = date_column
+
+
+# Exportable tables. Only the listed columns are read — product secrets never leave the database.
+EXPORTS = {
+    "verified_licenses": ExportSpec(
+        "verified_licenses", ["user_id", "guild_id", "product_name", "verified_at"],
+        key=["user_id", "guild_id", "product_name"], guild_column="guild_id", date_column="verified_at",
+    ),
+    "products": ExportSpec(
+        "products", ["guild_id", "product_name", "role_id"],
+        key=["guild_id", "product_name"], guild_column="guild_id", date_column=None,
+    ),
+    "feedback": ExportSpec(
+        "feedback", ["id", "guild_id", "guild_name", "author_id", "author_name", "subject", "message", "created_at"],
+        key=["id"], guild_column="guild_id", date_column="created_at",
+    ),
+    "blacklisted_guilds": ExportSpec(
+        "blacklisted_guilds", ["guild_id", "reason", "added_at"],
+        key=["guild_id"], guild_column="guild_id", date_column="added_at",
+    ),
+}
+
+
+def encode_cursor(values: list) -> str:
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(token: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except ValueError as e:
+        raise ValueError("invalid cursor") from e
+    if not isinstance(values, list):
+        raise ValueError("invalid cursor")
+    return values
+
+
+def json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+async def export_pages(spec: ExportSpec, *, guild_id: str | None = None, since: datetime.datetime | None = None,
+                       until: datetime.datetime | None = None, after: list | None = None, limit: int | None = None):
+    """
+    Yield rows of `spec` in key order, one page (list of records) at a time. Each page is read
+    through a server-side cursor on a freshly acquired connection that goes back to the pool
+    before the page is yielded, so a slow client never pins a connection and memory stays at
+    one page however large the export is. The next page resumes from the last key seen.
+    """
+    if after is not None and len(after) != len(spec.key):
+        raise ValueError("invalid cursor")
+    remaining = limit
+    while remaining is None or remaining > 0:
+        conditions, args = [], []
+        if guild_id is not None and spec.guild_column:
+            args.append(guild_id)
+            conditions.append(f"{spec.guild_column} = ${len(args)}")
+        if since is not None and spec.date_column:
+            args.append(since)
+            conditions.append(f"{spec.date_column} >= ${len(args)}")
+        if until is not None and spec.date_column:
+            args.append(until)
+            conditions.append(f"{spec.date_column} < ${len(args)}")
+        if after is not None:
+            placeholders = []
+            for value in after:
+                args.append(value)
+                placeholders.append(f"${len(args)}")
+            conditions.append(f"({', '.join(spec.key)}) > ({', '.join(placeholders)})")
+        page_size = EXPORT_PAGE_ROWS if remaining is None else min(EXPORT_PAGE_ROWS, remaining)
+        query = (
+            f"SELECT {', '.join(spec.columns)} FROM {spec.table}"
+            f"{' WHERE ' + ' AND '.join(conditions) if conditions else ''}"
+            f" ORDER BY {', '.join(spec.key)}"
+        )
+
+        async with (await get_database_pool()).acquire() as conn:
+            async with conn.transaction(readonly=True):
+                cursor = await conn.cursor(query, *args)
+                page = await cursor.fetch(page_size)
+
+        if not page:
+            return
+        yield page
+        after = [page[-1][column] for column in spec.key]
+        if remaining is not None:
+            remaining -= len(page)
+        if len(page) < page_size:
+            return
@@ -0,0 +1,28 @@
+import os
+
+import disnake
+
+# Lean mode trims the gateway cache for deployments in thousands of guilds.
+LEAN_CACHE = os.getenv("LEAN_CACHE", "0").lower() in ("1", "true", "yes")
+
+
+def client_options(lean: bool = LEAN_CACHE) -> dict:
+    """
+    Intents and cache settings for the bot's client.
+
+    The bot is driven by interactions: it needs each guild with its roles and channels, its own
+    member (for hierarchy and permission checks), and whatever the interaction payload carries
+    about the user. Lean mode keeps exactly that — only the `guilds` intent, no member cache
+    beyond itself, no guild chunking and no message cache — while the default keeps disnake's
+    standard intents and caches.
+    """
+    if not lean:
+        intents = disnake.Intents.default()
+        intents.guilds = True
+        return {"intents": intents}
+    return {
+        "intents": disnake.Intents(guilds=True),
+        "member_cache_flags": disnake.MemberCacheFlags.none(),
+        "chunk_guilds_at_startup": False,
+        "max_messages": None,
+    }
@@ -0,0 +1,137 @@
+import logging
+import os
+import time
+from collections import OrderedDict
+
+import asyncpg
+
+from utils.database import get_database_pool
+from utils.errors import DatabaseError
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+GUILD_CACHE_MAX_GUILDS = int(os.getenv("GUILD_CACHE_MAX_GUILDS", "20000"))
+GUILD_CACHE_TTL = float(os.getenv("GUILD_CACHE_TTL", "300"))
+
+
+class GuildCache:
+    """
+    Per-guild permission grants and log channel, the two small settings read on every admin
+    command and every outbox batch, plus the verification message's channel so channel deletions
+    can be matched without a query. Entries are loaded on first use (or by the warm-start
+    preload), updated by the commands that change them, and expire after GUILD_CACHE_TTL so an
+    edit made outside the bot is picked up eventually. Least recently used guilds are evicted
+    past GUILD_CACHE_MAX_GUILDS.
+    """
+
+    def __init__(self, max_guilds: int = GUILD_CACHE_MAX_GUILDS, ttl: float = GUILD_CACHE_TTL):
+        self.max_guilds = max_guilds
+        self.ttl = ttl
+        self._permissions: OrderedDict[str, tuple[float, dict[str, set[str]]]] = OrderedDict()
+        self._log_channels: OrderedDict[str, tuple[float, str | None]] = OrderedDict()
+        self._verification_channels: OrderedDict[str, tuple[float, str | None]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, table: OrderedDict, guild_id: str):
+        entry = table.get(guild_id)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            self.misses += 1
+            return None
+        table.move_to_end(guild_id)
+        self.hits += 1
+        return entry
+
+    def _put(self, table: OrderedDict, guild_id: str, value):
+        table[guild_id] = (time.monotonic(), value)
+        table.move_to_end(guild_id)
+        while len(table) > self.max_guilds:
+            table.popitem(last=False)
+
+    # Permissions: guild_id -> permission key -> role IDs granted it.
+
+    async def role_ids_with_permission(self, guild_id, permission: str) -> set[str]:
+        guild_id = str(guild_id)
+        entry = self._get(self._permissions, guild_id)
+        if entry is None:
+            try:
+                with span("db"):
+                    async with (await get_database_pool()).acquire() as conn:
+                        rows = await conn.fetch(
+                            "SELECT role_id, permission FROM guild_role_permissions WHERE guild_id = $1", guild_id
+                        )
+            except asyncpg.PostgresError as e:
+                raise DatabaseError(f"Failed to fetch permissions for guild {guild_id}.") from e
+            grants = {}
+            for row in rows:
+                grants.setdefault(row["permission"], set()).add(row["role_id"])
+            self._put(self._permissions, guild_id, grants)
+            return grants.get(permission, set())
+        return entry[1].get(permission, set())
+
+    def prime_permissions(self, guild_id, grants: dict[str, set[str]]):
+        self._put(self._permissions, str(guild_id), grants)
+
+    def invalidate_permissions(self, guild_id):
+        self._permissions.pop(str(guild_id), None)
+
+    # Log channels and verification message channels: guild_id -> channel_id, or None when unset.
+
+    async def log_channels(self, guild_ids) -> dict[str, str | None]:
+        return await self._channels(
+            self._log_channels, guild_ids,
+            "SELECT guild_id, channel_id FROM server_log_channels WHERE guild_id = ANY($1::text[]) AND NOT channel_missing",
+            "log channels",
+        )
+
+    async def verification_channels(self, guild_ids) -> dict[str, str | None]:
+        return await self._channels(
+            self._verification_channels, guild_ids,
+            "SELECT guild_id, channel_id FROM verification_message WHERE guild_id = ANY($1::text[])",
+            "verification message channels",
+        )
+
+    async def _channels(self, table: OrderedDict, guild_ids, query: str, what: str) -> dict[str, str | None]:
+        result, missing = {}, []
+        for guild_id in map(str, guild_ids):
+            entry = self._get(table, guild_id)
+            if entry is None:
+                missing.append(guild_id)
+            else:
+                result[guild_id] = entry[1]
+        if missing:
+            try:
+                with span("db"):
+                    async with (await get_database_pool()).acquire() as conn:
+                        rows = await conn.fetch(query, missing)
+            except asyncpg.PostgresError as e:
+                raise DatabaseError(f"Failed to fetch {what}.") from e
+            found = {row["guild_id"]: row["channel_id"] for row in rows}
+            for guild_id in missing:
+                result[guild_id] = found.get(guild_id)
+                self._put(table, guild_id, result[guild_id])
+        return result
+
+    def set_log_channel(self, guild_id, channel_id):
+        self._put(self._log_channels, str(guild_id), str(channel_id) if channel_id else None)
+
+    def set_verification_channel(self, guild_id, channel_id):
+        self._put(self._verification_channels, str(guild_id), str(channel_id) if channel_id else None)
+
+    def invalidate_guild(self, guild_id):
+        self._permissions.pop(str(guild_id), None)
+        self._log_channels.pop(str(guild_id), None)
+        self._verification_channels.pop(str(guild_id), None)
+
+    def snapshot(self) -> dict:
+        return {
+            "permission_guilds": len(self._permissions),
+            "log_channel_guilds": len(self._log_channels),
+            "verification_channel_guilds": len(self._verification_channels),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+guild_cache = GuildCache()
@@ -0,0 +1,114 @@
+import asyncio
+import datetime
+import logging
+import math
+import os
+import time
+
+import asyncpg
+
+from utils.database import get_database_pool
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", "5"))
+HEALTH_CHECK_TIMEOUT = float(os.getenv("HEALTH_CHECK_TIMEOUT", "2"))
+
+
+class HealthCheck:
+    """
+    Dependency checks behind /internal/health and /internal/ready. A report is reused for
+    HEALTH_CACHE_SECONDS and concurrent probes share the one being built, so however often the
+    orchestrator polls, Postgres sees at most one `SELECT 1` per interval. Each check is
+    time-boxed by HEALTH_CHECK_TIMEOUT so a stuck dependency shows up as a failure, not a hang.
+    """
+
+    def __init__(self):
+        self._report: dict | None = None
+        self._checked_at = 0.0
+        self._running: asyncio.Task | None = None
+        self.runs = 0
+
+    async def report(self, bot, db_ready: asyncio.Event) -> dict:
+        if self._report is not None and time.monotonic() - self._checked_at < HEALTH_CACHE_SECONDS:
+            return self._report
+        if self._running is None or self._running.done():
+            self._running = asyncio.create_task(self._run(bot, db_ready), name="health-check")
+        return await asyncio.shield(self._running)
+
+    async def _run(self, bot, db_ready: asyncio.Event) -> dict:
+        from handlers.verify_license_modal import verification_queue
+        from utils.activation_log import activation_log
+        from utils.outbox import outbox_dispatcher
+        from utils.payhip import payhip_circuit, OPEN
+        from utils.role_scheduler import role_scheduler
+
+        self.runs += 1
+        latency = bot.latency
+        gateway = {
+            "connected": not bot.is_closed() and bot.ws is not None,
+            "ready": bot.is_ready(),
+            "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+            "guilds": len(bot.guilds),
+        }
+        database = await self._check_database(db_ready)
+        payhip = payhip_circuit.snapshot()
+        queue = verification_queue.snapshot()
+        outbox = outbox_dispatcher.snapshot()
+        jobs = {
+            "outbox": {"running": outbox["running"], "pending_log_batches": outbox["pending_log_batches"]},
+            "verification_queue": {"depth": queue["depth"], "busy": queue["busy"], "max_depth": queue["max_depth"]},
+            "role_queue": {"backlog": role_scheduler.snapshot()["backlog_total"]},
+            "activation_log": {"pending_events": activation_log.snapshot()["pending_events"]},
+        }
+
+        ready = gateway["connected"] and gateway["ready"] and database["ok"] and outbox["running"]
+        if not ready:
+            status = "unavailable"
+        elif payhip["state"] == OPEN or queue["depth"] >= queue["max_depth"]:
+            status = "degraded"
+        else:
+            status = "ok"
+
+        report = {
+            "status": status,
+            "ready": ready,
+            "checked_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "gateway": gateway,
+            "database": database,
+            "payhip": payhip,
+            "jobs": jobs,
+        }
+        self._report = report
+        self._checked_at = time.monotonic()
+        return report
+
+    async def _check_database(self, db_ready: asyncio.Event) -> dict:
+        if not db_ready.is_set():
+            return {"ok": False, "initialized": False}
+        pool = await get_database_pool()
+        result = {
+            "ok": False,
+            "initialized": True,
+            "pool": {"size": pool.get_size(), "idle": pool.get_idle_size(), "max": pool.get_max_size()},
+        }
+
+        async def ping():
+            async with pool.acquire() as conn:
+                await conn.fetchval("SELECT 1")
+
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(ping(), HEALTH_CHECK_TIMEOUT)
+            result["ok"] = True
+        except asyncio.TimeoutError:
+            result["error"] = f"no response within {HEALTH_CHECK_TIMEOUT:g}s (pool exhausted or database stalled)"
+        except (asyncpg.PostgresError, OSError) as e:
+            result["error"] = str(e)
+        result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if not result["ok"]:
+            logger.warning(f"[Health] Database check failed: {result['error']}")
+        return result
+
+
+health_check = HealthCheck()
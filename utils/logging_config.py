@@ -1,15 +1,166 @@
+import atexit
+import json
 import logging
 import os
+import queue
+import re
 import sys
-from logging.handlers import TimedRotatingFileHandler
-from datetime import datetime
+import threading
+import time
+from logging.handlers import TimedRotatingFileHandler, QueueHandler, QueueListener
+from datetime import datetime, timezone
 
-def setup_logging(log_level_str="INFO"):
+# Structured fields a log call can attach via `extra=log_fields(...)`; the JSON formatter
+# emits them as top-level keys so the dashboard doesn't have to regex-parse messages.
+STRUCTURED_FIELDS = ("guild_id", "user_id", "product", "outcome")
+
+# Hot-path warning tags that can fire once per user action during a spam wave. Records with
+# these "[Tag]" prefixes are sampled per guild per window instead of written one by one.
+SAMPLED_TAGS = {
+    tag.strip() for tag in
+    os.getenv("LOG_SAMPLED_TAGS", "Cooldown,Validation Failed,Invalid Key,Already Used").split(",")
+    if tag.strip()
+}
+SAMPLE_WINDOW = float(os.getenv("LOG_SAMPLE_WINDOW", "60"))
+SAMPLE_BURST = int(os.getenv("LOG_SAMPLE_BURST", "5"))      # messages let through per key per window
+SAMPLE_EVERY = int(os.getenv("LOG_SAMPLE_EVERY", "100"))    # then 1 in N, so a flood stays visible
+
+_TAG_PATTERN = re.compile(r"^\[([^\]]+)\]")
+
+_listener: QueueListener | None = None
+_sampling_filter: "SamplingFilter | None" = None
+
+
+def log_fields(guild_id=None, user_id=None, product=None, outcome=None) -> dict:
+    """Build the `extra` dict for a structured log call, skipping unset fields."""
+    fields = {"guild_id": guild_id, "user_id": user_id, "product": product, "outcome": outcome}
+    return {k: (str(v) if k.endswith("_id") else v) for k, v in fields.items() if v is not None}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: timestamp, level, logger, message plus any structured fields."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc_info"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Rate-limits repetitive hot-path warnings keyed by (tag, guild). Within each window the
+    first SAMPLE_BURST records pass, then one in SAMPLE_EVERY; the rest are counted and a
+    "suppressed N similar messages" summary is logged when the window closes.
+    """
+
+    def __init__(self, tags=SAMPLED_TAGS, window=SAMPLE_WINDOW, burst=SAMPLE_BURST, every=SAMPLE_EVERY):
+        super().__init__()
+        self.tags = set(tags)
+        self.window = window
+        self.burst = burst
+        self.every = max(1, every)
+        self._lock = threading.RLock()
+        self._windows: dict[tuple, list] = {}   # (tag, guild_id) -> [window_start, seen, suppressed]
+        self.suppressed_total: dict[str, int] = {}
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="log-sampling", daemon=True)
+        self._flusher.start()
+
+    def filter(self, record):
+        # Direct (non-queued) mode attaches this filter to several handlers; decide once per record.
+        decision = getattr(record, "_sampled", None)
+        if decision is not None:
+            return decision
+        decision = self._decide(record)
+        record._sampled = decision
+        return decision
+
+    def _decide(self, record) -> bool:
+        if not isinstance(record.msg, str):
+            return True
+        match = _TAG_PATTERN.match(record.msg)
+        if not match or match.group(1) not in self.tags:
+            return True
+        key = (match.group(1), getattr(record, "guild_id", None))
+        now = time.monotonic()
+        with self._lock:
+            state = self._windows.get(key)
+            if state is None or now - state[0] >= self.window:
+                if state is not None:
+                    self._summarize(key, state)
+                state = self._windows[key] = [now, 0, 0]
+            state[1] += 1
+            if state[1] <= self.burst or (state[1] - self.burst) % self.every == 0:
+                return True
+            state[2] += 1
+            self.suppressed_total[key[0]] = self.suppressed_total.get(key[0], 0) + 1
+            return False
+
+    def _summarize(self, key, state):
+        # Called with the lock held. The summary tag isn't sampled, so it can't recurse into us.
+        tag, guild_id = key
+        if state[2]:
+            logging.getLogger(__name__).warning(
+                f"[Log Sampling] Suppressed {state[2]} similar '[{tag}]' messages "
+                f"(guild {guild_id or 'n/a'}, {state[1]} total in {self.window:.0f}s).",
+                extra=log_fields(guild_id=guild_id, outcome="suppressed"),
+            )
+
+    def flush(self, force: bool = False):
+        """Summarize and drop every window that has closed (or all of them when forced)."""
+        now = time.monotonic()
+        with self._lock:
+            for key, state in list(self._windows.items()):
+                if force or now - state[0] >= self.window:
+                    self._summarize(key, state)
+                    del self._windows[key]
+
+    def _flush_loop(self):
+        while not self._stop.wait(min(self.window, 10.0)):
+            self.flush()
+
+    def close(self):
+        self._stop.set()
+        self.flush(force=True)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "suppressed_total": dict(self.suppressed_total),
+                "open_windows": len(self._windows),
+                "suppressed_in_open_windows": sum(state[2] for state in self._windows.values()),
+            }
+
+
+def sampling_snapshot() -> dict:
+    """Suppression counters for the internal metrics endpoint."""
+    return _sampling_filter.snapshot() if _sampling_filter else {}
+
+
+def setup_logging(log_level_str="INFO", log_format=None, queued=True):
     """
     Sets up logging to both a rotating file (for the dashboard) 
     and sys.stdout (for Portainer/Docker logs).
+
+    With `queued` (the default) the root logger only enqueues records; a QueueListener thread
+    does the file and stdout writes so log calls never block the event loop on I/O.
+    `log_format="json"` (or LOG_FORMAT=json) switches both outputs to JSON lines.
     """
+    global _listener, _sampling_filter
     logging_level = getattr(logging, log_level_str.upper(), logging.INFO)
+    log_format = (log_format or os.getenv("LOG_FORMAT", "text")).lower()
 
     # Ensure logs/ folder exists
     log_dir = "logs"
@@ -29,10 +180,13 @@ def setup_logging(log_level_str="INFO"):
         utc=True
     )
     file_handler.suffix = "%Y-%m-%d"
-    file_formatter = logging.Formatter(
-        "%(asctime)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    if log_format == "json":
+        file_formatter = JsonFormatter()
+    else:
+        file_formatter = logging.Formatter(
+            "%(asctime)s - %(levelname)s - %(message)s",
+            datefmt="%Y-%m-%d %H:%M:%S"
+        )
     file_handler.setFormatter(file_formatter)
 
     # 2. Console Handler (Crucial for Portainer/Docker)
@@ -47,13 +201,54 @@ def setup_logging(log_level_str="INFO"):
     # Clear existing handlers to prevent duplicates (better than checking instances)
     if logger.hasHandlers():
         logger.handlers.clear()
+    stop_logging()
+    _sampling_filter = SamplingFilter()
 
-    logger.addHandler(file_handler)
-    logger.addHandler(console_handler)
+    if queued:
+        log_queue = queue.SimpleQueue()
+        queue_handler = _StructuredQueueHandler(log_queue)
+        # Sample before enqueueing so suppressed records cost nothing downstream.
+        queue_handler.addFilter(_sampling_filter)
+        logger.addHandler(queue_handler)
+        _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        for handler in (file_handler, console_handler):
+            handler.addFilter(_sampling_filter)
+            logger.addHandler(handler)
 
     # Optional: Initial cleanup check for very old files not caught by the handler
     delete_old_logs(log_dir, days=7)
 
+def stop_logging():
+    """Drain the queue and stop the listener thread; safe to call more than once."""
+    global _listener, _sampling_filter
+    if _sampling_filter is not None:
+        # Emit pending suppression summaries while the handlers are still attached.
+        _sampling_filter.close()
+        _sampling_filter = None
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
+
+
+class _StructuredQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The stock prepare() flattens the traceback into the message text, which would stop the
+        # JSON formatter from emitting it as its own field. Merge args eagerly (they may not be
+        # safe to format later on the listener thread) and carry the traceback as exc_text.
+        record = logging.makeLogRecord(record.__dict__)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.exc_info = None
+        return record
+
+
 def delete_old_logs(log_dir, days=7):
     """Manually cleans up files older than the specified days."""
     now = datetime.now()
@@ -0,0 +1,295 @@
+import asyncio
+import logging
+import os
+
+import aiohttp
+import asyncpg
+import disnake
+
+from utils.activation_log import ActivationEvent, activation_log
+from utils.database import get_database_pool
+from utils.errors import DatabaseError
+from utils.guild_cache import guild_cache
+from utils.logging_config import log_fields
+from utils.role_scheduler import role_scheduler, APPLIED, FORBIDDEN, MISSING
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_BATCH = int(os.getenv("OUTBOX_BATCH", "50"))                  # entries claimed per round
+OUTBOX_CONCURRENCY = int(os.getenv("OUTBOX_CONCURRENCY", "5"))       # Discord calls in flight
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))     # then the entry is marked dead
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "5"))   # idle poll when not nudged
+
+# A claimed entry is invisible to other dispatchers for this long; if this process dies
+# mid-batch, the entry becomes due again once the lease runs out.
+_LEASE_SECONDS = 120
+_BACKOFF_BASE = 5
+_BACKOFF_MAX = 900
+
+
+class PermanentFailure(Exception):
+    """The side effect can never succeed (guild left, role or member gone); drop the entry."""
+
+
+class RetryLater(Exception):
+    """The side effect failed for a reason that may clear up; back off and try again."""
+
+
+class OutboxDispatcher:
+    """
+    Applies the side effects recorded in `verification_outbox` alongside each verification:
+    role assignment and the log-channel announcement, plus role removal for revoked products. Entries are claimed in batches with
+    FOR UPDATE SKIP LOCKED, so several processes can share the table, and retried with
+    exponential backoff until they succeed or run out of attempts.
+    """
+
+    def __init__(self):
+        self._bot = None
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._stopping = False
+        self._settling: set[asyncio.Task] = set()
+        self.delivered = 0
+        self.retried = 0
+        self.dropped = 0
+        self.dead = 0
+
+    def start(self, bot):
+        """Start the dispatcher loop; safe to call again on reconnect."""
+        if self._task is not None and not self._task.done():
+            return
+        self._bot = bot
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="verification-outbox")
+
+    def notify(self):
+        """Wake the dispatcher after committing new entries instead of waiting for the next poll."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def stop(self, timeout: float = 10.0):
+        """Finish the batch in progress (bounded); anything left is picked up after restart."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self.notify()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+            # Post pending log batches now instead of waiting out the window.
+            await activation_log.close()
+            if self._settling:
+                await asyncio.wait_for(asyncio.gather(*self._settling), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("[Outbox] Shutdown timed out; unfinished entries will be retried after restart.")
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        # Role and channel lookups need the guild cache.
+        await self._bot.wait_until_ready()
+        while not self._stopping:
+            try:
+                handled = await self.dispatch_once()
+            except (asyncpg.PostgresError, DatabaseError, OSError) as e:
+                logger.error(f"[Outbox] Dispatch round failed: {e}")
+                handled = 0
+            except Exception:
+                # Keep the loop alive; the claimed entries come back once their lease runs out.
+                logger.exception("[Outbox] Unexpected error in dispatch round")
+                handled = 0
+            if handled >= OUTBOX_BATCH or self._stopping:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), OUTBOX_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def dispatch_once(self) -> int:
+        """Claim and deliver one batch of due entries; returns how many were claimed."""
+        async with (await get_database_pool()).acquire() as conn:
+            rows = await conn.fetch(
+                """
+                UPDATE verification_outbox SET next_attempt_at = NOW() + make_interval(secs => $2)
+                WHERE id IN (
+                    SELECT id FROM verification_outbox
+                    WHERE NOT dead AND next_attempt_at <= NOW()
+                    ORDER BY next_attempt_at, id
+                    LIMIT $1
+                    FOR UPDATE SKIP LOCKED
+                )
+                RETURNING id, guild_id, user_id, product_name, action, role_id, attempts, created_at
+                """,
+                OUTBOX_BATCH, _LEASE_SECONDS
+            )
+        if not rows:
+            return 0
+        log_guilds = {row["guild_id"] for row in rows if row["action"] == "log_activation"}
+        log_channels = await guild_cache.log_channels(log_guilds) if log_guilds else {}
+
+        semaphore = asyncio.Semaphore(OUTBOX_CONCURRENCY)
+        done, failed, posts = [], [], []
+
+        async def deliver(row):
+            async with semaphore:
+                try:
+                    if row["action"] == "add_role":
+                        await self._add_role(row)
+                    elif row["action"] == "remove_role":
+                        await self._remove_role(row)
+                    elif row["action"] == "log_activation":
+                        # Handed to the per-guild aggregator; settled once the batch message is posted.
+                        future = self._log_activation(row, log_channels.get(row["guild_id"]))
+                        if future is not None:
+                            posts.append((row, future))
+                            return
+                    else:
+                        raise PermanentFailure(f"unknown action '{row['action']}'")
+                    self.delivered += 1
+                    done.append(row["id"])
+                except PermanentFailure as e:
+                    self.dropped += 1
+                    logger.warning(
+                        f"[Outbox] Dropping {row['action']} for user {row['user_id']} ('{row['product_name']}'): {e}",
+                        extra=log_fields(row["guild_id"], row["user_id"], row["product_name"], "outbox_dropped"),
+                    )
+                    done.append(row["id"])
+                except (RetryLater, disnake.HTTPException, aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    failed.append((row, str(e)))
+                except Exception as e:
+                    logger.exception(f"[Outbox] Unexpected error delivering {row['action']} for user {row['user_id']}")
+                    failed.append((row, f"{type(e).__name__}: {e}"))
+
+        await asyncio.gather(*(deliver(row) for row in rows))
+        if posts:
+            task = asyncio.create_task(self._settle_when_posted(posts))
+            self._settling.add(task)
+            task.add_done_callback(self._settling.discard)
+        await self._settle(done, failed)
+        return len(rows)
+
+    async def _settle(self, done: list, failed: list):
+        retries = []
+        for row, error in failed:
+            attempts = row["attempts"] + 1
+            is_dead = attempts >= OUTBOX_MAX_ATTEMPTS
+            delay = min(_BACKOFF_MAX, _BACKOFF_BASE * 2 ** (attempts - 1))
+            retries.append((row["id"], attempts, delay, error[:500], is_dead))
+            fields = log_fields(row["guild_id"], row["user_id"], row["product_name"], "outbox_dead" if is_dead else "outbox_retry")
+            if is_dead:
+                self.dead += 1
+                logger.error(f"[Outbox] Giving up on {row['action']} for user {row['user_id']} after {attempts} attempts: {error}", extra=fields)
+            else:
+                self.retried += 1
+                logger.warning(f"[Outbox] {row['action']} for user {row['user_id']} failed (attempt {attempts}), retrying in {delay}s: {error}", extra=fields)
+
+        async with (await get_database_pool()).acquire() as conn:
+            async with conn.transaction():
+                if done:
+                    await conn.execute("DELETE FROM verification_outbox WHERE id = ANY($1::bigint[])", done)
+                if retries:
+                    await conn.executemany(
+                        """
+                        UPDATE verification_outbox
+                        SET attempts = $2, next_attempt_at = NOW() + make_interval(secs => $3),
+                            last_error = $4, dead = $5
+                        WHERE id = $1
+                        """,
+                        retries
+                    )
+
+    def _resolve(self, row):
+        guild = self._bot.get_guild(int(row["guild_id"]))
+        if guild is None:
+            raise PermanentFailure("bot is no longer in the guild")
+        role = guild.get_role(int(row["role_id"])) if row["role_id"] else None
+        return guild, role
+
+    async def _add_role(self, row):
+        guild, role = self._resolve(row)
+        if role is None:
+            raise PermanentFailure("role was deleted")
+        outcome = await role_scheduler.add(
+            guild.id, int(row["user_id"]), role.id, reason=f"KeyVerify: verified '{row['product_name']}'"
+        )
+        if outcome == MISSING:
+            raise PermanentFailure("member left the guild")
+        if outcome == FORBIDDEN:
+            # Retried with backoff: an admin may still fix the bot's role position.
+            raise RetryLater("missing permission to assign the role")
+        if outcome != APPLIED:
+            return
+        member = guild.get_member(int(row["user_id"])) or f"user {row['user_id']}"
+        logger.info(
+            f"[Role Assigned] Gave role '{role.name}' to {member} in '{guild.name}' for product '{row['product_name']}'.",
+            extra=log_fields(guild.id, row["user_id"], row["product_name"], "role_assigned"),
+        )
+
+    async def _remove_role(self, row):
+        guild, role = self._resolve(row)
+        if role is None:
+            raise PermanentFailure("role was deleted")
+        outcome = await role_scheduler.remove(
+            guild.id, int(row["user_id"]), role.id, reason=f"KeyVerify: '{row['product_name']}' revoked"
+        )
+        if outcome == MISSING:
+            raise PermanentFailure("member left the guild")
+        if outcome == FORBIDDEN:
+            raise RetryLater("missing permission to remove the role")
+        if outcome != APPLIED:
+            return
+        member = guild.get_member(int(row["user_id"])) or f"user {row['user_id']}"
+        logger.info(
+            f"[Role Removed] Removed role '{role.name}' from {member} in '{guild.name}' for revoked product '{row['product_name']}'.",
+            extra=log_fields(guild.id, row["user_id"], row["product_name"], "role_removed"),
+        )
+
+    def _log_activation(self, row, channel_id) -> asyncio.Future | None:
+        if channel_id is None:
+            return None
+        guild, role = self._resolve(row)
+        channel = guild.get_channel(int(channel_id))
+        if channel is None:
+            raise PermanentFailure("log channel was deleted")
+        event = ActivationEvent(
+            user_id=row["user_id"],
+            product_name=row["product_name"],
+            role_mention=role.mention if role else f"<@&{row['role_id']}>",
+            timestamp=row["created_at"],
+        )
+        return activation_log.add(guild.id, channel, event)
+
+    async def _settle_when_posted(self, posts: list):
+        # Log entries stay leased until the aggregator has actually posted them.
+        results = await asyncio.gather(*(future for _, future in posts), return_exceptions=True)
+        done, failed = [], []
+        for (row, _), result in zip(posts, results):
+            if isinstance(result, disnake.NotFound):
+                self.dropped += 1
+                logger.warning(f"[Outbox] Dropping log_activation for user {row['user_id']}: log channel was deleted")
+                done.append(row["id"])
+            elif isinstance(result, BaseException):
+                failed.append((row, str(result)))
+            else:
+                self.delivered += 1
+                done.append(row["id"])
+        try:
+            await self._settle(done, failed)
+        except (asyncpg.PostgresError, DatabaseError, OSError) as e:
+            # The lease expires and the entries are retried; the aggregator may post them twice.
+            logger.error(f"[Outbox] Could not settle {len(posts)} log entries: {e}")
+
+    def snapshot(self) -> dict:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "delivered": self.delivered,
+            "retried": self.retried,
+            "dropped": self.dropped,
+            "dead": self.dead,
+            "pending_log_batches": sum(1 for task in self._settling if not task.done()),
+        }
+
+
+outbox_dispatcher = OutboxDispatcher()
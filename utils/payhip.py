@@ -0,0 +1,99 @@
+import datetime
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# Overridable so load tests and staging can point at a local stand-in instead of payhip.com.
+PAYHIP_API_URL = os.getenv("PAYHIP_API_URL", "https://payhip.com/api/v2").rstrip("/")
+
+VERIFY_URL = f"{PAYHIP_API_URL}/license/verify"
+INCREMENT_USAGE_URL = f"{PAYHIP_API_URL}/license/usage"
+DECREASE_USAGE_URL = f"{PAYHIP_API_URL}/license/decrease"
+
+PAYHIP_CIRCUIT_THRESHOLD = int(os.getenv("PAYHIP_CIRCUIT_THRESHOLD", "5"))    # consecutive failures before opening
+PAYHIP_CIRCUIT_COOLDOWN = float(os.getenv("PAYHIP_CIRCUIT_COOLDOWN", "30"))  # seconds to fail fast once open
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class PayhipCircuit:
+    """
+    Tracks whether Payhip is answering. Timeouts, network errors and 5xx responses count as
+    failures; after PAYHIP_CIRCUIT_THRESHOLD in a row the circuit opens and calls fail fast for
+    PAYHIP_CIRCUIT_COOLDOWN seconds instead of making users wait on a dead endpoint. After the
+    cooldown one trial call is let through, and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, threshold: int = PAYHIP_CIRCUIT_THRESHOLD, cooldown: float = PAYHIP_CIRCUIT_COOLDOWN):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self._opened_at: float | None = None
+        self._probe_started: float | None = None
+        self.last_success: float | None = None   # wall-clock, for reporting
+        self.last_failure: float | None = None
+        self.last_error: str | None = None
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return CLOSED
+        return OPEN if time.monotonic() - self._opened_at < self.cooldown else HALF_OPEN
+
+    def allow(self) -> bool:
+        """Whether a Payhip call may be made now; every allowed call must be followed by record_*()."""
+        state = self.state
+        if state == CLOSED:
+            return True
+        now = time.monotonic()
+        # One trial call at a time; a trial that never reported back expires after a cooldown.
+        if state == HALF_OPEN and (self._probe_started is None or now - self._probe_started > self.cooldown):
+            self._probe_started = now
+            return True
+        self.rejected += 1
+        return False
+
+    def record_response(self, status: int):
+        if status >= 500:
+            self.record_failure(f"HTTP {status}")
+        else:
+            self.record_success()
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logger.info("[Payhip] Circuit closed — Payhip is responding again.")
+        self.failures = 0
+        self._opened_at = None
+        self._probe_started = None
+        self.last_success = time.time()
+
+    def record_failure(self, error: str):
+        self.failures += 1
+        self.last_failure = time.time()
+        self.last_error = error
+        if self._probe_started is not None or (self._opened_at is None and self.failures >= self.threshold):
+            logger.warning(
+                f"[Payhip] Circuit opened after {self.failures} consecutive failures ({error}); "
+                f"failing fast for {self.cooldown:g}s."
+            )
+            self._opened_at = time.monotonic()
+            self._probe_started = None
+
+    def snapshot(self) -> dict:
+        stamp = lambda t: datetime.datetime.fromtimestamp(t, datetime.timezone.utc).isoformat() if t else None
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "last_success_at": stamp(self.last_success),
+            "last_failure_at": stamp(self.last_failure),
+            "last_error": self.last_error,
+            "rejected": self.rejected,
+        }
+
+
+payhip_circuit = PayhipCircuit()
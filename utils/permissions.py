@@ -1,7 +1,8 @@
 import disnake
 import config
 import logging
-from utils.database import get_role_ids_with_permission
+from utils.guild_cache import guild_cache
+from utils.rate_limit import rate_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -12,11 +13,14 @@ PERMISSIONS = [
     ("add_product",        "Add products"),
     ("edit_product",       "Edit products"),
     ("remove_product",     "Remove products"),
+    ("import_products",    "Import products from CSV"),
+    ("import_verified",    "Import verified users from CSV"),
     ("list_products",      "List products"),
     ("reset_key",          "Reset license keys"),
     ("start_verification", "Post verification button"),
     ("set_log_channel",    "Set log channel"),
     ("remove_user",        "Remove users"),
+    ("revoke_product",     "Revoke all verifications of a product"),
     ("send_feedback",      "Send feedback to the developer"),
 ]
 
@@ -44,6 +48,7 @@ async def is_authorized(inter: disnake.ApplicationCommandInteraction, permission
     Authorization rules:
       - Commands are guild-only; in DMs `inter.guild` is None  -> denied (this is what
         previously crashed with 'NoneType has no attribute owner_id').
+      - Callers over the "admin" rate limit are denied with a retry hint.
       - The server owner always passes.
       - Everyone else must hold a role the owner granted this specific permission.
     """
@@ -51,10 +56,16 @@ async def is_authorized(inter: disnake.ApplicationCommandInteraction, permission
         await _deny(inter, "❌ This command can only be used inside a server.")
         return False
 
+    # Throttle before touching the database, so command spam can't turn into query spam.
+    retry_after = await rate_limiter.check("admin", inter)
+    if retry_after:
+        await _deny(inter, f"⏳ You're using commands too fast, try again in `{int(retry_after) + 1}s`.")
+        return False
+
     if inter.author.id == inter.guild.owner_id:
         return True
 
-    granted_role_ids = await get_role_ids_with_permission(str(inter.guild.id), permission_key)
+    granted_role_ids = await guild_cache.role_ids_with_permission(inter.guild.id, permission_key)
     if granted_role_ids and any(str(role.id) in granted_role_ids for role in inter.author.roles):
         return True
 
@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+from bisect import bisect_left, insort
+from collections import OrderedDict
+
+from utils.database import get_database_pool
+from utils.tracing import span
+
+logger = logging.getLogger(__name__)
+
+PRODUCT_INDEX_MAX_GUILDS = int(os.getenv("PRODUCT_INDEX_MAX_GUILDS", "5000"))
+
+AUTOCOMPLETE_LIMIT = 25  # Discord's cap on autocomplete choices
+
+
+class ProductIndex:
+    """
+    Per-guild sorted list of product names for slash-command autocomplete. A guild's names are
+    loaded with one query the first time they're needed and then kept in sync by the commands
+    that add, rename or remove products, so keystrokes never touch the database. Lookups are
+    case-insensitive prefix matches via bisect, topped up with substring matches.
+    """
+
+    def __init__(self, max_guilds: int = PRODUCT_INDEX_MAX_GUILDS):
+        self.max_guilds = max_guilds
+        self._guilds: OrderedDict[str, list[tuple[str, str]]] = OrderedDict()  # guild_id -> sorted (folded, name)
+        self._loading: dict[str, asyncio.Future] = {}
+        self._versions: dict[str, int] = {}
+        self.loads = 0
+
+    async def _entries(self, guild_id) -> list[tuple[str, str]]:
+        guild_id = str(guild_id)
+        entries = self._guilds.get(guild_id)
+        if entries is not None:
+            self._guilds.move_to_end(guild_id)
+            return entries
+        # Concurrent keystrokes for a cold guild share one load.
+        if guild_id in self._loading:
+            return await asyncio.shield(self._loading[guild_id])
+        future = self._loading[guild_id] = asyncio.get_running_loop().create_future()
+        try:
+            with span("db"):
+                async with (await get_database_pool()).acquire() as conn:
+                    rows = await conn.fetch("SELECT product_name FROM products WHERE guild_id = $1", guild_id)
+            entries = sorted((row["product_name"].casefold(), row["product_name"]) for row in rows)
+            self.loads += 1
+            self._store(guild_id, entries)
+            future.set_result(entries)
+            return entries
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._loading[guild_id]
+
+    def _store(self, guild_id: str, entries: list):
+        self._guilds[guild_id] = entries
+        self._guilds.move_to_end(guild_id)
+        while len(self._guilds) > self.max_guilds:
+            self._guilds.popitem(last=False)
+
+    def prime(self, guild_id, names: list[str]):
+        """Install a guild's full name list from a bulk load (warm start); loaded guilds are left alone."""
+        guild_id = str(guild_id)
+        if guild_id not in self._guilds and guild_id not in self._loading:
+            self._store(guild_id, sorted((name.casefold(), name) for name in names))
+
+    async def complete(self, guild_id, text: str, limit: int = AUTOCOMPLETE_LIMIT) -> list[str]:
+        entries = await self._entries(guild_id)
+        needle = text.strip().casefold()
+        start = bisect_left(entries, (needle, ""))
+        matches = []
+        for folded, name in entries[start:]:
+            if not folded.startswith(needle) or len(matches) == limit:
+                break
+            matches.append(name)
+        if len(matches) < limit and needle:
+            seen = set(matches)
+            for folded, name in entries:
+                if needle in folded and name not in seen:
+                    matches.append(name)
+                    if len(matches) == limit:
+                        break
+        return matches
+
+    async def contains(self, guild_id, name: str) -> bool:
+        entries = await self._entries(guild_id)
+        key = (name.casefold(), name)
+        i = bisect_left(entries, key)
+        return i < len(entries) and entries[i] == key
+
+    def version(self, guild_id) -> int:
+        """Catalog version for caches derived from a guild's products; bumped by every mutation hook."""
+        return self._versions.get(str(guild_id), 0)
+
+    def _bump(self, guild_id):
+        guild_id = str(guild_id)
+        self._versions[guild_id] = self._versions.get(guild_id, 0) + 1
+
+    # Mutation hooks: only guilds already in memory need updating; others load fresh when next used.
+
+    def add(self, guild_id, name: str):
+        self._bump(guild_id)
+        entries = self._guilds.get(str(guild_id))
+        if entries is not None:
+            key = (name.casefold(), name)
+            i = bisect_left(entries, key)
+            if i == len(entries) or entries[i] != key:
+                insort(entries, key)
+
+    def remove(self, guild_id, name: str):
+        self._bump(guild_id)
+        entries = self._guilds.get(str(guild_id))
+        if entries is not None:
+            key = (name.casefold(), name)
+            i = bisect_left(entries, key)
+            if i < len(entries) and entries[i] == key:
+                del entries[i]
+
+    def rename(self, guild_id, old_name: str, new_name: str):
+        self.remove(guild_id, old_name)
+        self.add(guild_id, new_name)
+
+    def changed(self, guild_id):
+        """A product changed in a way that keeps its name (e.g. its role); derived caches rebuild."""
+        self._bump(guild_id)
+
+    def invalidate(self, guild_id):
+        self._bump(guild_id)
+        self._guilds.pop(str(guild_id), None)
+
+    def snapshot(self) -> dict:
+        return {
+            "guilds": len(self._guilds),
+            "names": sum(len(entries) for entries in self._guilds.values()),
+            "loads": self.loads,
+        }
+
+
+product_index = ProductIndex()
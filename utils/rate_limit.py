@@ -0,0 +1,179 @@
+import logging
+import os
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+
+import asyncpg
+
+from utils.database import get_database_pool
+from utils.errors import ConfigurationError, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+# Limits per action as "scope:rate/seconds" entries; scope is user, guild or global.
+# A request is allowed only if every bucket that applies to it has room.
+DEFAULT_LIMITS = {
+    "verify": "user:1/20",            # Verify button clicks
+    "license_submit": "user:3/60",    # license key modal submissions
+    "reset_key": "user:5/60",         # /reset_key modal submissions
+    "admin": "user:10/30",            # admin slash commands
+}
+
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory").lower()
+RATE_LIMIT_MAX_KEYS = int(os.getenv("RATE_LIMIT_MAX_KEYS", "100000"))
+
+
+@dataclass(frozen=True)
+class Limit:
+    scope: str
+    rate: int
+    per: float
+
+
+def parse_limits(spec: str) -> list[Limit]:
+    limits = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        try:
+            scope, quota = part.split(":")
+            rate, per = quota.split("/")
+            limit = Limit(scope.strip(), int(rate), float(per))
+        except ValueError as e:
+            raise ConfigurationError(f"Invalid rate limit '{part}' — expected scope:rate/seconds.") from e
+        if limit.scope not in ("user", "guild", "global"):
+            raise ConfigurationError(f"Invalid rate limit scope '{limit.scope}' in '{part}'.")
+        if limit.rate > 0:
+            limits.append(limit)
+    return limits
+
+
+class MemoryBackend:
+    """
+    Fixed-window counters capped at `max_keys`, in one insertion-ordered dict per window
+    length. A key moves to the end whenever its window resets, so within a dict the front
+    always holds the window that expires first; expired entries are evicted from the fronts,
+    and past the cap the soonest-expiring window goes first.
+    """
+
+    def __init__(self, max_keys: int = RATE_LIMIT_MAX_KEYS):
+        self.max_keys = max_keys
+        self._windows: dict[float, OrderedDict[str, tuple[float, int]]] = {}  # per -> key -> (window_start, hits)
+
+    async def hit(self, key: str, limit: Limit, now: float) -> float:
+        buckets = self._windows.setdefault(limit.per, OrderedDict())
+        window_start, hits = buckets.get(key, (now, 0))
+        if window_start + limit.per <= now:
+            window_start, hits = now, 0
+        hits += 1
+        buckets[key] = (window_start, hits)
+        if hits == 1:
+            buckets.move_to_end(key)
+        self._evict(now)
+        return window_start + limit.per - now if hits > limit.rate else 0.0
+
+    def _evict(self, now: float):
+        for per, buckets in self._windows.items():
+            while buckets and next(iter(buckets.values()))[0] + per <= now:
+                buckets.popitem(last=False)
+        while self.size() > self.max_keys:
+            per, buckets = min(
+                ((per, buckets) for per, buckets in self._windows.items() if buckets),
+                key=lambda item: next(iter(item[1].values()))[0] + item[0],
+            )
+            buckets.popitem(last=False)
+
+    def size(self) -> int:
+        return sum(len(buckets) for buckets in self._windows.values())
+
+
+class PostgresBackend:
+    """
+    Shared fixed-window counters in `rate_limit_buckets`, so every shard/process enforces
+    the same budget and limits survive restarts. One round trip per bucket check.
+    """
+
+    _PURGE_EVERY = 1000
+
+    def __init__(self):
+        self._calls = 0
+
+    async def hit(self, key: str, limit: Limit, now: float) -> float:
+        pool = await get_database_pool()
+        async with pool.acquire() as conn:
+            row = await conn.fetchrow(
+                """
+                INSERT INTO rate_limit_buckets AS b (key, window_start, hits, expires_at)
+                VALUES ($1, $2, 1, $2 + $3)
+                ON CONFLICT (key) DO UPDATE SET
+                    window_start = CASE WHEN b.expires_at <= $2 THEN $2 ELSE b.window_start END,
+                    hits         = CASE WHEN b.expires_at <= $2 THEN 1 ELSE b.hits + 1 END,
+                    expires_at   = CASE WHEN b.expires_at <= $2 THEN $2 + $3 ELSE b.expires_at END
+                RETURNING hits, expires_at
+                """,
+                key, now, limit.per
+            )
+            self._calls += 1
+            if self._calls % self._PURGE_EVERY == 0:
+                await conn.execute("DELETE FROM rate_limit_buckets WHERE expires_at < $1", now)
+        return row["expires_at"] - now if row["hits"] > limit.rate else 0.0
+
+    def size(self) -> int | None:
+        return None
+
+
+class RateLimiter:
+    def __init__(self, limits: dict[str, list[Limit]], backend):
+        self.limits = limits
+        self.backend = backend
+        self.rejections = defaultdict(int)
+
+    async def hit(self, action: str, user_id=None, guild_id=None) -> float:
+        """Count one request; returns 0 if allowed, otherwise seconds until it would be."""
+        now = time.time()
+        retry_after = 0.0
+        for limit in self.limits.get(action, []):
+            if limit.scope == "user":
+                key = f"{action}:user:{user_id}"
+            elif limit.scope == "guild":
+                key = f"{action}:guild:{guild_id}"
+            else:
+                key = f"{action}:global"
+            try:
+                retry_after = max(retry_after, await self.backend.hit(key, limit, now))
+            except (asyncpg.PostgresError, DatabaseError, OSError) as e:
+                # A limiter outage shouldn't take verification down with it — fail open.
+                logger.error(f"[Rate Limit] Backend error for '{key}', allowing request: {e}")
+        if retry_after:
+            self.rejections[action] += 1
+        return retry_after
+
+    async def check(self, action: str, inter) -> float:
+        return await self.hit(action, inter.author.id, inter.guild_id)
+
+    def snapshot(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "tracked_keys": self.backend.size(),
+            "rejections": dict(self.rejections),
+            "limits": {
+                action: [f"{l.scope}:{l.rate}/{l.per:g}" for l in limits]
+                for action, limits in self.limits.items()
+            },
+        }
+
+
+def _build_limiter() -> RateLimiter:
+    limits = {
+        action: parse_limits(os.getenv(f"RATE_LIMIT_{action.upper()}", default))
+        for action, default in DEFAULT_LIMITS.items()
+    }
+    if RATE_LIMIT_BACKEND == "postgres":
+        backend = PostgresBackend()
+    elif RATE_LIMIT_BACKEND == "memory":
+        backend = MemoryBackend()
+    else:
+        raise ConfigurationError(f"Unknown RATE_LIMIT_BACKEND '{RATE_LIMIT_BACKEND}' (memory or postgres).")
+    return RateLimiter(limits, backend)
+
+
+rate_limiter = _build_limiter()
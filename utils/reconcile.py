@@ -0,0 +1,152 @@
+import logging
+import os
+from collections import OrderedDict
+
+import asyncpg
+import disnake
+
+from utils.database import get_database_pool
+from utils.errors import DatabaseError
+from utils.guild_cache import guild_cache
+from utils.product_index import product_index, PRODUCT_INDEX_MAX_GUILDS
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_NOTIFY_OWNER = os.getenv("RECONCILE_NOTIFY_OWNER", "1").lower() not in ("0", "false", "no")
+
+
+class Reconciler:
+    """
+    Reacts to role and channel deletions as they happen instead of finding out at read time.
+    A per-guild role -> products index, reloaded whenever product_index's catalog version for
+    the guild moves, lets the listener ignore the roles no product uses without a query. A
+    product whose role is deleted is flagged `role_missing` (hidden from the Verify dropdown and
+    refused before Payhip); a deleted log channel is flagged `channel_missing` and dropped from
+    the guild cache. The server owner gets a DM either way.
+    """
+
+    def __init__(self, max_guilds: int = PRODUCT_INDEX_MAX_GUILDS):
+        self.max_guilds = max_guilds
+        self._roles: OrderedDict[str, tuple[int, dict[str, set[str]]]] = OrderedDict()
+        self.roles_flagged = 0
+        self.channels_flagged = 0
+        self.notified = 0
+        self.notify_failures = 0
+
+    def prime(self, guild_id, pairs):
+        """Install a guild's (product_name, role_id) pairs from a bulk load; loaded guilds are left alone."""
+        if str(guild_id) not in self._roles:
+            self._store(str(guild_id), pairs)
+
+    def _store(self, guild_id: str, pairs):
+        roles: dict[str, set[str]] = {}
+        for product_name, role_id in pairs:
+            if role_id:
+                roles.setdefault(role_id, set()).add(product_name)
+        self._roles[guild_id] = (product_index.version(guild_id), roles)
+        self._roles.move_to_end(guild_id)
+        while len(self._roles) > self.max_guilds:
+            self._roles.popitem(last=False)
+
+    async def products_for_role(self, guild_id, role_id) -> set[str]:
+        guild_id = str(guild_id)
+        entry = self._roles.get(guild_id)
+        if entry is None or entry[0] != product_index.version(guild_id):
+            try:
+                async with (await get_database_pool()).acquire() as conn:
+                    rows = await conn.fetch("SELECT product_name, role_id FROM products WHERE guild_id = $1", guild_id)
+            except asyncpg.PostgresError as e:
+                raise DatabaseError(f"Failed to load product roles for guild {guild_id}.") from e
+            self._store(guild_id, [(row["product_name"], row["role_id"]) for row in rows])
+            entry = self._roles[guild_id]
+        self._roles.move_to_end(guild_id)
+        return entry[1].get(str(role_id), set())
+
+    async def role_deleted(self, bot, role: disnake.Role):
+        guild = role.guild
+        if not await self.products_for_role(guild.id, role.id):
+            return
+        try:
+            async with (await get_database_pool()).acquire() as conn:
+                rows = await conn.fetch(
+                    "UPDATE products SET role_missing = TRUE WHERE guild_id = $1 AND role_id = $2 RETURNING product_name",
+                    str(guild.id), str(role.id)
+                )
+        except asyncpg.PostgresError as e:
+            raise DatabaseError(f"Failed to flag products for deleted role {role.id}.") from e
+        if not rows:
+            return
+        names = sorted(row["product_name"] for row in rows)
+        self.roles_flagged += len(names)
+        # The dropdown and other catalog-derived caches rebuild on the next click.
+        product_index.changed(guild.id)
+        logger.warning(f"[Role Deleted] Role '{role.name}' was deleted in '{guild.name}'; flagged products: {', '.join(names)}.")
+        await self._notify_owner(
+            bot, guild,
+            f"⚠️ The role **{role.name}** was deleted in **{guild.name}**. Members can't verify "
+            f"{', '.join(f'**{name}**' for name in names)} until you assign a new role with `/edit_product`."
+        )
+
+    async def channel_deleted(self, bot, channel: disnake.abc.GuildChannel):
+        guild = channel.guild
+        guild_id, channel_id = str(guild.id), str(channel.id)
+        # Most deleted channels were never used by the bot; the cache answers that without a query.
+        log_channel_id = (await guild_cache.log_channels([guild_id])).get(guild_id)
+        message_channel_id = (await guild_cache.verification_channels([guild_id])).get(guild_id)
+        if channel_id not in (log_channel_id, message_channel_id):
+            return
+        try:
+            async with (await get_database_pool()).acquire() as conn:
+                flagged = message_removed = None
+                if log_channel_id == channel_id:
+                    flagged = await conn.fetchval(
+                        "UPDATE server_log_channels SET channel_missing = TRUE "
+                        "WHERE guild_id = $1 AND channel_id = $2 RETURNING guild_id",
+                        guild_id, channel_id
+                    )
+                if message_channel_id == channel_id:
+                    # The verification message went with its channel.
+                    message_removed = await conn.fetchval(
+                        "DELETE FROM verification_message WHERE guild_id = $1 AND channel_id = $2 RETURNING guild_id",
+                        guild_id, channel_id
+                    )
+        except asyncpg.PostgresError as e:
+            raise DatabaseError(f"Failed to reconcile deleted channel {channel.id}.") from e
+
+        notes = []
+        if flagged:
+            self.channels_flagged += 1
+            guild_cache.set_log_channel(guild.id, None)
+            logger.warning(f"[Channel Deleted] Log channel #{channel.name} was deleted in '{guild.name}'; activation logs are paused.")
+            notes.append("Verification logs are paused until you pick a new channel with `/set_lchannel`.")
+        if message_channel_id == channel_id:
+            guild_cache.set_verification_channel(guild.id, None)
+        if message_removed:
+            logger.warning(f"[Channel Deleted] The verification message channel #{channel.name} was deleted in '{guild.name}'.")
+            notes.append("The Verify button was in it; post it again with `/start_verification`.")
+        if notes:
+            await self._notify_owner(bot, guild, f"⚠️ The channel **#{channel.name}** was deleted in **{guild.name}**. " + " ".join(notes))
+
+    async def _notify_owner(self, bot, guild: disnake.Guild, message: str):
+        if not RECONCILE_NOTIFY_OWNER or guild.owner_id is None:
+            return
+        try:
+            owner = bot.get_user(guild.owner_id) or await bot.fetch_user(guild.owner_id)
+            await owner.send(message)
+            self.notified += 1
+        except disnake.HTTPException as e:
+            # DMs closed or the owner left Discord; the log line above still records it.
+            self.notify_failures += 1
+            logger.info(f"[Reconcile] Could not DM the owner of '{guild.name}': {e}")
+
+    def snapshot(self) -> dict:
+        return {
+            "guilds_indexed": len(self._roles),
+            "roles_flagged": self.roles_flagged,
+            "channels_flagged": self.channels_flagged,
+            "owners_notified": self.notified,
+            "notify_failures": self.notify_failures,
+        }
+
+
+reconciler = Reconciler()
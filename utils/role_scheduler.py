@@ -0,0 +1,177 @@
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict, deque
+
+import disnake
+
+from utils.logging_config import log_fields
+
+logger = logging.getLogger(__name__)
+
+ROLE_MAX_RETRIES = int(os.getenv("ROLE_MAX_RETRIES", "3"))   # extra attempts after a 429
+
+# Outcomes a role mutation future resolves with. Transient failures (5xx, network) raise instead.
+APPLIED = "applied"
+SUPERSEDED = "superseded"    # a later add/remove of the same role for the same member replaced it
+FORBIDDEN = "forbidden"      # missing Manage Roles, or the role is above the bot's top role
+MISSING = "missing"          # member left or role was deleted
+
+_FORBIDDEN_WARN_EVERY = 600  # seconds between permission warnings per guild
+
+
+class _GuildQueue:
+    def __init__(self):
+        # FIFO of ("member", member_id) and ("job", (factory, future)) entries.
+        self.order: deque = deque()
+        # member_id -> role_id -> [add?, reason, futures]; later ops for the same role overwrite earlier ones.
+        self.members: OrderedDict[int, dict] = OrderedDict()
+        self.worker: asyncio.Task | None = None
+
+    def backlog(self) -> int:
+        return sum(len(roles) for roles in self.members.values()) + sum(1 for kind, _ in self.order if kind == "job")
+
+
+class RoleScheduler:
+    """
+    Per-guild queue for role mutations. Every add/remove for a guild goes through one worker, so
+    bursts are serialized inside Discord's per-guild member-update budget instead of racing for
+    it. Pending operations are merged per member: repeats collapse and an add followed by a remove
+    of the same role cancel out. 429s are retried and Forbidden/NotFound are logged here, so
+    callers only look at the outcome.
+    """
+
+    def __init__(self):
+        self._http = None
+        self._guilds: dict[int, _GuildQueue] = {}
+        self._forbidden_warned: dict[int, float] = {}
+        self.stats = {"applied": 0, "merged": 0, "forbidden": 0, "missing": 0, "failed": 0, "rate_limited": 0}
+
+    def start(self, bot):
+        self._http = bot.http
+
+    def add(self, guild_id: int, member_id: int, role_id: int, reason: str | None = None) -> asyncio.Future:
+        return self._enqueue(guild_id, member_id, role_id, True, reason)
+
+    def remove(self, guild_id: int, member_id: int, role_id: int, reason: str | None = None) -> asyncio.Future:
+        return self._enqueue(guild_id, member_id, role_id, False, reason)
+
+    def submit(self, guild_id: int, job_factory) -> asyncio.Future:
+        """Run another guild-scoped REST call (e.g. role creation) in the same serialized queue."""
+        future = asyncio.get_running_loop().create_future()
+        queue = self._guilds.setdefault(guild_id, _GuildQueue())
+        queue.order.append(("job", (job_factory, future)))
+        self._wake(guild_id, queue)
+        return future
+
+    def _enqueue(self, guild_id, member_id, role_id, add, reason) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        queue = self._guilds.setdefault(guild_id, _GuildQueue())
+        roles = queue.members.get(member_id)
+        if roles is None:
+            roles = queue.members[member_id] = {}
+            queue.order.append(("member", member_id))
+        pending = roles.get(role_id)
+        if pending is None:
+            roles[role_id] = [add, reason, [future]]
+        elif pending[0] == add:
+            self.stats["merged"] += 1
+            pending[2].append(future)
+        else:
+            # Opposite operation on the same role: only the latest intent is sent to Discord.
+            self.stats["merged"] += 1
+            for earlier in pending[2]:
+                if not earlier.done():
+                    earlier.set_result(SUPERSEDED)
+            roles[role_id] = [add, reason, [future]]
+        self._wake(guild_id, queue)
+        return future
+
+    def _wake(self, guild_id, queue):
+        if queue.worker is None or queue.worker.done():
+            queue.worker = asyncio.create_task(self._work(guild_id, queue), name=f"roles-{guild_id}")
+
+    async def _work(self, guild_id: int, queue: _GuildQueue):
+        while queue.order:
+            kind, item = queue.order.popleft()
+            if kind == "job":
+                factory, future = item
+                try:
+                    result = await factory()
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+                continue
+            roles = queue.members.pop(item, {})
+            for role_id, (add, reason, futures) in roles.items():
+                try:
+                    outcome = await self._apply(guild_id, item, role_id, add, reason)
+                except Exception as e:
+                    self.stats["failed"] += 1
+                    logger.error(f"[Role Queue] {'Adding' if add else 'Removing'} role {role_id} for user {item} in guild {guild_id} failed: {e}")
+                    for future in futures:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                self.stats[outcome] += 1
+                for future in futures:
+                    if not future.done():
+                        future.set_result(outcome)
+        # Idle guilds don't keep a worker or an entry around.
+        if self._guilds.get(guild_id) is queue and not queue.order:
+            del self._guilds[guild_id]
+
+    async def _apply(self, guild_id, member_id, role_id, add, reason) -> str:
+        call = self._http.add_role if add else self._http.remove_role
+        for attempt in range(ROLE_MAX_RETRIES + 1):
+            try:
+                await call(guild_id, member_id, role_id, reason=reason)
+                return APPLIED
+            except disnake.Forbidden:
+                self._warn_forbidden(guild_id, member_id, role_id)
+                return FORBIDDEN
+            except disnake.NotFound:
+                return MISSING
+            except disnake.HTTPException as e:
+                # disnake already waits out bucket limits; a 429 here means its own retries ran out.
+                if e.status != 429 or attempt == ROLE_MAX_RETRIES:
+                    raise
+                self.stats["rate_limited"] += 1
+                retry_after = float(e.response.headers.get("Retry-After", 1 + attempt))
+                logger.warning(f"[Role Queue] Rate limited in guild {guild_id}; retrying in {retry_after:.1f}s.")
+                await asyncio.sleep(retry_after)
+
+    def _warn_forbidden(self, guild_id, member_id, role_id):
+        now = time.monotonic()
+        if now - self._forbidden_warned.get(guild_id, 0) < _FORBIDDEN_WARN_EVERY:
+            return
+        self._forbidden_warned[guild_id] = now
+        logger.warning(
+            f"[Permission Error] Missing permission to change role {role_id} in guild {guild_id} — "
+            f"the bot needs Manage Roles and its role must sit above the product roles.",
+            extra=log_fields(guild_id, member_id, outcome="forbidden"),
+        )
+
+    async def drain(self, timeout: float = 10.0):
+        workers = [q.worker for q in self._guilds.values() if q.worker and not q.worker.done()]
+        if not workers:
+            return
+        _, pending = await asyncio.wait(workers, timeout=timeout)
+        if pending:
+            logger.warning(f"[Role Queue] Shutdown with {len(pending)} guild queue(s) still busy.")
+
+    def snapshot(self, top: int = 20) -> dict:
+        backlog = sorted(((q.backlog(), gid) for gid, q in self._guilds.items()), reverse=True)
+        return {
+            "active_guilds": len(self._guilds),
+            "backlog_total": sum(n for n, _ in backlog),
+            "backlog_by_guild": {str(gid): n for n, gid in backlog[:top]},
+            **self.stats,
+        }
+
+
+role_scheduler = RoleScheduler()
@@ -0,0 +1,90 @@
+import logging
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+# disnake logs these around command sync when CommandSyncFlags.sync_commands_debug is set.
+_SYNC_LOGGER = "disnake.ext.commands.interaction_bot_base"
+_SYNC_STARTED = "Application command synchronization"
+_SYNC_FINISHED = "Command synchronization task has finished"
+
+
+class _CommandSyncTimer(logging.Filter):
+    """Times command sync from disnake's sync debug log lines; never drops a record."""
+
+    def __init__(self, profiler: "StartupProfiler"):
+        super().__init__()
+        self.profiler = profiler
+        self._started: float | None = None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        message = str(record.msg)
+        if message.startswith(_SYNC_STARTED) and self._started is None:
+            self._started = time.perf_counter()
+        elif message.startswith(_SYNC_FINISHED):
+            if self._started is not None:
+                self.profiler.phases.setdefault("command_sync", time.perf_counter() - self._started)
+            self.profiler.mark("commands_synced")
+        return True
+
+
+class StartupProfiler:
+    """
+    Records how long each cold-start phase takes (imports, cog loads, database connect and
+    schema, command sync, ...) plus milestones measured from process start, so slow starts
+    can be pinned on a phase. The summary is logged once at first ready and exported on
+    /internal/metrics. Phases may overlap: background ones run alongside the critical path.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: dict[str, float] = {}
+        self.milestones: dict[str, float] = {}
+        self.failed: set[str] = set()
+        self.reported = False
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.failed.add(name)
+            raise
+        finally:
+            # Repeated phases (e.g. schema setup after a reconnect) keep their first timing.
+            self.phases.setdefault(name, time.perf_counter() - started)
+
+    def mark(self, name: str):
+        """Record a milestone as seconds since process start; only the first occurrence counts."""
+        self.milestones.setdefault(name, time.perf_counter() - self.started)
+
+    def watch_command_sync(self):
+        """
+        Time command sync through disnake's public `sync_commands_debug` logging rather than
+        its private sync method. Needs the flag on and INFO logging; otherwise the phase is
+        simply missing from the report.
+        """
+        logging.getLogger(_SYNC_LOGGER).addFilter(_CommandSyncTimer(self))
+
+    def report(self):
+        """Log the phase breakdown, slowest first. Called once when the bot is first ready."""
+        if self.reported:
+            return
+        self.reported = True
+        slowest = sorted(self.phases.items(), key=lambda item: item[1], reverse=True)
+        breakdown = ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in slowest[:12])
+        milestones = ", ".join(f"{name} at {seconds:.2f}s" for name, seconds in self.milestones.items())
+        logger.info(f"[Startup] {milestones}. Phases: {breakdown}.")
+
+    def snapshot(self) -> dict:
+        return {
+            "milestones_seconds": {name: round(seconds, 4) for name, seconds in self.milestones.items()},
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in self.phases.items()},
+            "failed": sorted(self.failed),
+        }
+
+
+startup = StartupProfiler()
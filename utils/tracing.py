@@ -0,0 +1,185 @@
+import functools
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import disnake
+from disnake.webhook.async_ import AsyncWebhookAdapter
+
+logger = logging.getLogger(__name__)
+
+# Discord fails an interaction that is not acknowledged within 3 seconds of being created.
+ACK_BUDGET = 3.0
+ACK_WARN_SECONDS = float(os.getenv("TRACE_ACK_WARN_SECONDS", "2.0"))
+
+# Recent traces kept per handler for the aggregate view on the internal API.
+_HISTORY_SIZE = 500
+
+_current_trace: ContextVar["InteractionTrace | None"] = ContextVar("current_trace", default=None)
+_history: dict[str, deque] = defaultdict(lambda: deque(maxlen=_HISTORY_SIZE))
+_warnings: dict[str, int] = defaultdict(int)
+
+
+class InteractionTrace:
+    """Timings for a single interaction, from handler start to handler exit."""
+
+    def __init__(self, name: str, inter: disnake.Interaction):
+        self.name = name
+        self.guild_id = inter.guild_id
+        self.user_id = inter.author.id if inter.author else None
+        self.started = time.monotonic()
+        # Time the interaction spent in transit/queued before our handler ran; it counts against the budget.
+        created_at = getattr(inter, "created_at", None)
+        self.gateway_delay = max(0.0, time.time() - created_at.timestamp()) if created_at else 0.0
+        self.ack = None
+        self.first_followup = None
+        self.total = None
+        self.spans: dict[str, float] = defaultdict(float)
+
+    def _elapsed(self) -> float:
+        return self.gateway_delay + (time.monotonic() - self.started)
+
+    def mark_ack(self):
+        if self.ack is None:
+            self.ack = self._elapsed()
+
+    def mark_followup(self):
+        if self.first_followup is None:
+            self.first_followup = self._elapsed()
+
+    def as_dict(self) -> dict:
+        return {
+            "handler": self.name,
+            "guild_id": self.guild_id,
+            "time_to_ack": self.ack,
+            "time_to_first_followup": self.first_followup,
+            "total": self.total,
+            "spans": dict(self.spans),
+        }
+
+
+def begin(inter: disnake.Interaction, name: str) -> InteractionTrace:
+    trace = InteractionTrace(name, inter)
+    _current_trace.set(trace)
+    return trace
+
+
+def finish():
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    _current_trace.set(None)
+    trace.total = trace._elapsed()
+    _history[trace.name].append(trace)
+
+    # An unacknowledged interaction that ran past the budget is the "interaction failed" case.
+    ack = trace.ack if trace.ack is not None else trace.total
+    if ack >= ACK_WARN_SECONDS:
+        _warnings[trace.name] += 1
+        spans = ", ".join(f"{kind}={secs * 1000:.0f}ms" for kind, secs in trace.spans.items()) or "none"
+        state = "acknowledged after" if trace.ack is not None else "never acknowledged, handler ran"
+        logger.warning(
+            f"[Ack Budget] '{trace.name}' {state} {ack:.2f}s of {ACK_BUDGET:.0f}s "
+            f"(guild {trace.guild_id}, gateway delay {trace.gateway_delay * 1000:.0f}ms, spans: {spans})."
+        )
+
+
+@contextmanager
+def span(kind: str):
+    """Attribute the wrapped block's wall time to `kind` ("db", "payhip", ...) on the current trace."""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        trace.spans[kind] += time.monotonic() - start
+
+
+def traced(name: str):
+    """
+    Decorator for view/modal callbacks whose last positional argument is the interaction.
+    Slash commands are traced through the bot's before/after invoke hooks instead.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            begin(args[-1], name)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                finish()
+        return wrapper
+    return decorator
+
+
+def _percentile(values: list, pct: float):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[min(len(values) - 1, int(len(values) * pct))], 4)
+
+
+def snapshot() -> dict:
+    """Per-handler aggregates over the recent trace history."""
+    result = {}
+    for name, traces in _history.items():
+        traces = list(traces)
+        acks = [t.ack for t in traces if t.ack is not None]
+        followups = [t.first_followup for t in traces if t.first_followup is not None]
+        totals = [t.total for t in traces]
+        span_totals = defaultdict(float)
+        for t in traces:
+            for kind, secs in t.spans.items():
+                span_totals[kind] += secs
+        result[name] = {
+            "count": len(traces),
+            "ack_warnings": _warnings[name],
+            "unacknowledged": sum(1 for t in traces if t.ack is None),
+            "time_to_ack": {"p50": _percentile(acks, 0.5), "p95": _percentile(acks, 0.95), "max": _percentile(acks, 1.0)},
+            "time_to_first_followup": {"p50": _percentile(followups, 0.5), "p95": _percentile(followups, 0.95)},
+            "total": {"p50": _percentile(totals, 0.5), "p95": _percentile(totals, 0.95), "max": _percentile(totals, 1.0)},
+            "span_avg": {kind: round(secs / len(traces), 4) for kind, secs in span_totals.items()},
+            "slowest": max(traces, key=lambda t: t.total).as_dict() if traces else None,
+        }
+    return result
+
+
+_installed = False
+
+
+def install():
+    """
+    Hook disnake's webhook adapter so acknowledgements and followups are timestamped on
+    whichever trace is active in the calling task. Every response path (send_message,
+    defer, send_modal, followup.send, edit_original_response) goes through these methods.
+    """
+    global _installed
+    if _installed:
+        return
+    _installed = True
+
+    def _wrap(method, mark):
+        @functools.wraps(method)
+        async def wrapper(self, *args, **kwargs):
+            result = await method(self, *args, **kwargs)
+            trace = _current_trace.get()
+            if trace is not None:
+                mark(trace)
+            return result
+        return wrapper
+
+    AsyncWebhookAdapter.create_interaction_response = _wrap(
+        AsyncWebhookAdapter.create_interaction_response, InteractionTrace.mark_ack
+    )
+    AsyncWebhookAdapter.execute_webhook = _wrap(
+        AsyncWebhookAdapter.execute_webhook, InteractionTrace.mark_followup
+    )
+    AsyncWebhookAdapter.edit_original_interaction_response = _wrap(
+        AsyncWebhookAdapter.edit_original_interaction_response, InteractionTrace.mark_followup
+    )
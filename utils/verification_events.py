@@ -0,0 +1,174 @@
+import asyncio
+import datetime
+import logging
+import os
+import re
+from collections import deque
+
+import asyncpg
+
+from utils.database import get_database_pool
+from utils.errors import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+VERIFICATION_EVENTS_FLUSH_SECONDS = float(os.getenv("VERIFICATION_EVENTS_FLUSH_SECONDS", "2"))
+VERIFICATION_EVENTS_BATCH = int(os.getenv("VERIFICATION_EVENTS_BATCH", "500"))            # flush early at this size
+VERIFICATION_EVENTS_MAX_BUFFER = int(os.getenv("VERIFICATION_EVENTS_MAX_BUFFER", "50000"))  # oldest dropped past this
+VERIFICATION_EVENTS_RETENTION_MONTHS = int(os.getenv("VERIFICATION_EVENTS_RETENTION_MONTHS", "12"))
+
+_PARTITIONS_AHEAD = 2
+_MAINTENANCE_SECONDS = 6 * 3600
+_PARTITION_NAME = re.compile(r"^verification_events_(\d{4})(\d{2})$")
+_COLUMNS = ["occurred_at", "event_type", "guild_id", "user_id", "actor_id", "product_name", "outcome", "detail"]
+
+
+def _month_start(day: datetime.date, offset: int = 0) -> datetime.date:
+    index = day.year * 12 + day.month - 1 + offset
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _opt(value) -> str | None:
+    return None if value is None else str(value)
+
+
+class VerificationEventLog:
+    """
+    Append-only audit trail of verifications, key resets and user removals in
+    `verification_events`, a table partitioned by month. Events are buffered in memory and
+    written with COPY every VERIFICATION_EVENTS_FLUSH_SECONDS (sooner once a batch fills).
+    Partitions are created ahead of time, and months older than
+    VERIFICATION_EVENTS_RETENTION_MONTHS are dropped whole instead of deleted row by row.
+    """
+
+    def __init__(self):
+        self._buffer: deque[tuple] = deque()
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._lock = asyncio.Lock()
+        self._stopping = False
+        self._maintained_at = 0.0
+        self.written = 0
+        self.dropped = 0
+        self.flush_failures = 0
+        self.partitions_dropped = 0
+
+    def record(self, event_type: str, guild_id, user_id=None, product_name: str | None = None,
+               outcome: str = "", actor_id=None, detail: str | None = None):
+        if len(self._buffer) >= VERIFICATION_EVENTS_MAX_BUFFER:
+            # Database unreachable for a long time: keep the newest events.
+            self._buffer.popleft()
+            self.dropped += 1
+        self._buffer.append((
+            datetime.datetime.now(datetime.timezone.utc), event_type, str(guild_id),
+            _opt(user_id), _opt(actor_id), product_name, outcome, detail,
+        ))
+        if len(self._buffer) >= VERIFICATION_EVENTS_BATCH and self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        """Start the writer loop; safe to call again on reconnect."""
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="verification-events")
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop the loop and write out whatever is still buffered."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[Events] Shutdown timed out; {len(self._buffer)} verification events were not saved.")
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            if not self._maintained_at or asyncio.get_running_loop().time() - self._maintained_at >= _MAINTENANCE_SECONDS:
+                try:
+                    await self.maintain()
+                except DatabaseError as e:
+                    logger.error(f"[Events] {e}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), VERIFICATION_EVENTS_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def maintain(self, today: datetime.date | None = None):
+        """Create this month's and the next partitions, and drop the ones past retention."""
+        today = today or datetime.datetime.now(datetime.timezone.utc).date()
+        cutoff = _month_start(today, -VERIFICATION_EVENTS_RETENTION_MONTHS)
+        try:
+            async with (await get_database_pool()).acquire() as conn:
+                for offset in range(_PARTITIONS_AHEAD + 1):
+                    start, end = _month_start(today, offset), _month_start(today, offset + 1)
+                    await conn.execute(
+                        f"CREATE TABLE IF NOT EXISTS verification_events_{start:%Y%m} PARTITION OF verification_events "
+                        f"FOR VALUES FROM ('{start.isoformat()} 00:00+00') TO ('{end.isoformat()} 00:00+00')"
+                    )
+                partitions = await conn.fetch(
+                    "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                    "WHERE i.inhparent = 'verification_events'::regclass"
+                )
+                for row in partitions:
+                    match = _PARTITION_NAME.match(row["relname"])
+                    if match and datetime.date(int(match[1]), int(match[2]), 1) < cutoff:
+                        await conn.execute(f"DROP TABLE IF EXISTS {row['relname']}")
+                        self.partitions_dropped += 1
+                        logger.info(f"[Events] Dropped partition {row['relname']} (older than {VERIFICATION_EVENTS_RETENTION_MONTHS} months).")
+        except asyncpg.PostgresError as e:
+            raise DatabaseError("Failed to maintain verification_events partitions.") from e
+        self._maintained_at = asyncio.get_running_loop().time()
+
+    async def flush(self) -> int:
+        """COPY everything buffered; returns the number of events written."""
+        async with self._lock:
+            if not self._buffer:
+                return 0
+            records = list(self._buffer)
+            self._buffer.clear()
+            try:
+                await self._copy(records)
+            except asyncpg.CheckViolationError:
+                # No partition for these rows yet (e.g. just past a month boundary): create it and retry once.
+                try:
+                    await self.maintain()
+                    await self._copy(records)
+                except (asyncpg.PostgresError, OSError, DatabaseError) as e:
+                    return self._requeue(records, e)
+            except (asyncpg.PostgresError, OSError, DatabaseError) as e:
+                return self._requeue(records, e)
+            self.written += len(records)
+            return len(records)
+
+    async def _copy(self, records: list[tuple]):
+        async with (await get_database_pool()).acquire() as conn:
+            await conn.copy_records_to_table("verification_events", records=records, columns=_COLUMNS)
+
+    def _requeue(self, records: list[tuple], error: Exception) -> int:
+        self.flush_failures += 1
+        logger.error(f"[Events] Failed to write {len(records)} verification events: {error}")
+        # Older events go back in front of anything recorded meanwhile, within the buffer cap.
+        room = max(0, VERIFICATION_EVENTS_MAX_BUFFER - len(self._buffer))
+        self.dropped += max(0, len(records) - room)
+        self._buffer.extendleft(reversed(records[max(0, len(records) - room):] if room else []))
+        return 0
+
+    def snapshot(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+            "flush_failures": self.flush_failures,
+            "partitions_dropped": self.partitions_dropped,
+            "retention_months": VERIFICATION_EVENTS_RETENTION_MONTHS,
+        }
+
+
+verification_events = VerificationEventLog()
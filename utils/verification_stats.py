@@ -0,0 +1,175 @@
+import asyncio
+import datetime
+import logging
+import os
+from collections import Counter
+
+import asyncpg
+
+from utils.database import get_database_pool
+from utils.errors import DatabaseError
+
+logger = logging.getLogger(__name__)
+
+VERIFICATION_STATS_FLUSH_SECONDS = float(os.getenv("VERIFICATION_STATS_FLUSH_SECONDS", "5"))
+VERIFICATION_STATS_BATCH = int(os.getenv("VERIFICATION_STATS_BATCH", "1000"))   # rows per upsert
+
+# The outcome counted as a success; every other outcome is a failure reason.
+VERIFIED = "verified"
+
+_UPSERT = """
+    INSERT INTO verification_stats (guild_id, product_name, day, outcome, count)
+    SELECT * FROM unnest($1::text[], $2::text[], $3::date[], $4::text[], $5::int[])
+    ON CONFLICT (guild_id, product_name, day, outcome)
+    DO UPDATE SET count = verification_stats.count + EXCLUDED.count
+"""
+
+
+def _totals(counts) -> dict:
+    attempts = sum(counts.values())
+    successes = counts.get(VERIFIED, 0)
+    return {
+        "attempts": attempts,
+        "successes": successes,
+        "failures": {outcome: n for outcome, n in counts.items() if outcome != VERIFIED},
+    }
+
+
+class VerificationStats:
+    """
+    Per-(guild, product, day) verification counters: how many attempts ended in each outcome.
+    Recording only bumps an in-memory counter; a background task folds the counts into
+    `verification_stats` every VERIFICATION_STATS_FLUSH_SECONDS with batched upserts, so the
+    verification path never writes for it and readers never count `verified_licenses`.
+    Counts from a failed flush are kept and retried on the next one.
+    """
+
+    def __init__(self):
+        self._pending: Counter = Counter()   # (guild_id, product_name, day, outcome) -> count
+        self._task: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._lock = asyncio.Lock()
+        self._stopping = False
+        self.recorded = 0
+        self.flushed_rows = 0
+        self.flush_failures = 0
+
+    def record(self, guild_id, product_name: str, outcome: str):
+        day = datetime.datetime.now(datetime.timezone.utc).date()
+        self._pending[(str(guild_id), product_name, day, outcome)] += 1
+        self.recorded += 1
+
+    def start(self):
+        """Start the flush loop; safe to call again on reconnect."""
+        if self._task is not None and not self._task.done():
+            return
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="verification-stats")
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop the loop and write out whatever is still pending."""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        try:
+            await asyncio.wait_for(self._task, timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"[Stats] Shutdown timed out; {sum(self._pending.values())} verification counts were not saved.")
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), VERIFICATION_STATS_FLUSH_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            await self.flush()
+
+    async def flush(self) -> int:
+        """Upsert all pending counts; returns the number of rows written."""
+        async with self._lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, Counter()
+            items = list(pending.items())
+            try:
+                async with (await get_database_pool()).acquire() as conn:
+                    async with conn.transaction():
+                        for start in range(0, len(items), VERIFICATION_STATS_BATCH):
+                            batch = items[start:start + VERIFICATION_STATS_BATCH]
+                            await conn.execute(_UPSERT, *(list(column) for column in zip(*(key + (n,) for key, n in batch))))
+            except (asyncpg.PostgresError, OSError, DatabaseError) as e:
+                self.flush_failures += 1
+                # Put the counts back (adding anything recorded meanwhile) for the next flush.
+                self._pending.update(pending)
+                logger.error(f"[Stats] Failed to flush {len(items)} verification counters: {e}")
+                return 0
+            self.flushed_rows += len(items)
+            return len(items)
+
+    def rename(self, guild_id, old_name: str, new_name: str):
+        """Move unflushed counts to a renamed product; stored rows are moved by the rename itself."""
+        guild_id = str(guild_id)
+        for key in [key for key in self._pending if key[0] == guild_id and key[1] == old_name]:
+            self._pending[(guild_id, new_name) + key[2:]] += self._pending.pop(key)
+
+    async def product_totals(self, guild_id) -> dict[str, dict]:
+        """All-time attempts, successes and failure reasons per product in a guild."""
+        guild_id = str(guild_id)
+        try:
+            async with (await get_database_pool()).acquire() as conn:
+                rows = await conn.fetch(
+                    "SELECT product_name, outcome, SUM(count) AS count FROM verification_stats "
+                    "WHERE guild_id = $1 GROUP BY product_name, outcome",
+                    guild_id
+                )
+        except asyncpg.PostgresError as e:
+            raise DatabaseError(f"Failed to fetch verification stats for guild {guild_id}.") from e
+        counts: dict[str, Counter] = {}
+        for row in rows:
+            counts.setdefault(row["product_name"], Counter())[row["outcome"]] += row["count"]
+        for (pending_guild, product_name, _, outcome), n in self._pending.items():
+            if pending_guild == guild_id:
+                counts.setdefault(product_name, Counter())[outcome] += n
+        return {product_name: _totals(c) for product_name, c in counts.items()}
+
+    async def daily(self, guild_id=None, since: datetime.date | None = None, until: datetime.date | None = None) -> list[dict]:
+        """Per-(guild, product, day) counters, optionally filtered to one guild and a day range (inclusive)."""
+        guild_id = str(guild_id) if guild_id else None
+        try:
+            async with (await get_database_pool()).acquire() as conn:
+                rows = await conn.fetch(
+                    """
+                    SELECT guild_id, product_name, day, outcome, count FROM verification_stats
+                    WHERE ($1::text IS NULL OR guild_id = $1)
+                      AND ($2::date IS NULL OR day >= $2)
+                      AND ($3::date IS NULL OR day <= $3)
+                    """,
+                    guild_id, since, until
+                )
+        except asyncpg.PostgresError as e:
+            raise DatabaseError("Failed to fetch verification stats.") from e
+        counts: dict[tuple, Counter] = {}
+        for row in rows:
+            counts.setdefault((row["guild_id"], row["product_name"], row["day"]), Counter())[row["outcome"]] += row["count"]
+        for (pending_guild, product_name, day, outcome), n in self._pending.items():
+            if (guild_id is None or pending_guild == guild_id) and (since is None or day >= since) and (until is None or day <= until):
+                counts.setdefault((pending_guild, product_name, day), Counter())[outcome] += n
+        return [
+            {"guild_id": g, "product_name": p, "day": d.isoformat(), **_totals(c)}
+            for (g, p, d), c in sorted(counts.items())
+        ]
+
+    def snapshot(self) -> dict:
+        return {
+            "flush_seconds": VERIFICATION_STATS_FLUSH_SECONDS,
+            "pending_counters": len(self._pending),
+            "recorded": self.recorded,
+            "flushed_rows": self.flushed_rows,
+            "flush_failures": self.flush_failures,
+        }
+
+
+verification_stats = VerificationStats()
@@ -0,0 +1,153 @@
+import logging
+import os
+import time
+
+import asyncpg
+
+from utils.database import get_database_pool
+from utils.errors import DatabaseError
+from utils.guild_cache import guild_cache
+from utils.product_index import product_index
+from utils.reconcile import reconciler
+
+logger = logging.getLogger(__name__)
+
+WARM_START = os.getenv("WARM_START", "1").lower() not in ("0", "false", "no")
+WARM_START_MAX_ROWS = int(os.getenv("WARM_START_MAX_ROWS", "200000"))
+_PREFETCH = 2000
+
+
+class WarmStart:
+    """
+    Preloads the per-guild caches right after startup so the first wave of interactions after a
+    deploy doesn't each run its own small query. Each table is read with one streamed query
+    filtered to the guilds the bot is in; loading stops once WARM_START_MAX_ROWS rows have been
+    taken, and guilds past the cap simply load on first use as before.
+    """
+
+    def __init__(self):
+        self.result: dict | None = None
+        self._cut = False
+
+    async def _stream(self, conn, query: str, guild_ids: list[str], budget: int):
+        # Rows arrive ordered by guild; yields (guild_id, rows) for each complete guild in budget.
+        current, group, taken = None, [], 0
+        async for row in conn.cursor(query, guild_ids, prefetch=_PREFETCH):
+            if row["guild_id"] != current:
+                if group:
+                    yield current, group
+                current, group = row["guild_id"], []
+            taken += 1
+            if taken > budget:
+                # A guild cut off mid-way is dropped rather than cached incomplete.
+                self.result["capped"] = self._cut = True
+                return
+            group.append(row)
+        if group:
+            yield current, group
+
+    async def preload(self, bot) -> dict:
+        self.result = {"guilds": len(bot.guilds), "rows": 0, "capped": False, "tables": {}}
+        if not WARM_START or not bot.guilds:
+            return self.result
+        started = time.perf_counter()
+        guild_ids = [str(guild.id) for guild in bot.guilds]
+        budget = WARM_START_MAX_ROWS
+        grants, log_channels, message_channels = {}, {}, {}
+
+        async def load(conn, table, query, apply) -> bool:
+            """Stream one table into `apply`; returns whether it was read in full."""
+            nonlocal budget
+            count, self._cut = 0, False
+            async for guild_id, rows in self._stream(conn, query, guild_ids, budget):
+                apply(guild_id, rows)
+                count += len(rows)
+            budget -= count
+            self.result["tables"][table] = count
+            self.result["rows"] += count
+            return not self._cut
+
+        try:
+            async with (await get_database_pool()).acquire() as conn:
+                async with conn.transaction(readonly=True):
+                    def apply_products(guild_id, rows):
+                        product_index.prime(guild_id, [row["product_name"] for row in rows])
+                        reconciler.prime(guild_id, [(row["product_name"], row["role_id"]) for row in rows])
+
+                    products_complete = await load(
+                        conn, "products",
+                        "SELECT guild_id, product_name, role_id FROM products WHERE guild_id = ANY($1::text[]) ORDER BY guild_id",
+                        apply_products,
+                    )
+
+                    def apply_grants(guild_id, rows):
+                        for row in rows:
+                            grants.setdefault(guild_id, {}).setdefault(row["permission"], set()).add(row["role_id"])
+
+                    grants_complete = await load(
+                        conn, "guild_role_permissions",
+                        "SELECT guild_id, role_id, permission FROM guild_role_permissions "
+                        "WHERE guild_id = ANY($1::text[]) ORDER BY guild_id",
+                        apply_grants,
+                    )
+                    def apply_log_channel(guild_id, rows):
+                        log_channels[guild_id] = rows[0]["channel_id"]
+
+                    log_channels_complete = await load(
+                        conn, "server_log_channels",
+                        "SELECT guild_id, channel_id FROM server_log_channels "
+                        "WHERE guild_id = ANY($1::text[]) AND NOT channel_missing ORDER BY guild_id",
+                        apply_log_channel,
+                    )
+
+                    def apply_message_channel(guild_id, rows):
+                        message_channels[guild_id] = rows[0]["channel_id"]
+
+                    message_channels_complete = await load(
+                        conn, "verification_message",
+                        "SELECT guild_id, channel_id FROM verification_message WHERE guild_id = ANY($1::text[]) ORDER BY guild_id",
+                        apply_message_channel,
+                    )
+                    blacklisted = [
+                        row["guild_id"] for row in await conn.fetch(
+                            "SELECT guild_id FROM blacklisted_guilds WHERE guild_id = ANY($1::text[])", guild_ids
+                        )
+                    ]
+        except (asyncpg.PostgresError, OSError, DatabaseError) as e:
+            # Timeouts are OSError too; whatever wasn't preloaded loads on first use.
+            logger.error(f"[Warm Start] Preload failed after {self.result['rows']} rows: {e}")
+            self.result["error"] = str(e)
+            return self.result
+
+        # Where a table was read in full, guilds without rows are cached as having none.
+        if products_complete:
+            for guild_id in guild_ids:
+                product_index.prime(guild_id, [])
+                reconciler.prime(guild_id, [])
+        for guild_id in (guild_ids if grants_complete else grants):
+            guild_cache.prime_permissions(guild_id, grants.get(guild_id, {}))
+        for guild_id in (guild_ids if log_channels_complete else log_channels):
+            guild_cache.set_log_channel(guild_id, log_channels.get(guild_id))
+        for guild_id in (guild_ids if message_channels_complete else message_channels):
+            guild_cache.set_verification_channel(guild_id, message_channels.get(guild_id))
+
+        self.result["seconds"] = round(time.perf_counter() - started, 3)
+        logger.info(
+            f"[Warm Start] Preloaded {self.result['rows']} rows for {len(guild_ids)} guilds in "
+            f"{self.result['seconds'] * 1000:.0f}ms ({', '.join(f'{t} {n}' for t, n in self.result['tables'].items())})"
+            + (f"; stopped at the {WARM_START_MAX_ROWS}-row cap." if self.result["capped"] else ".")
+        )
+
+        # Servers blacklisted while the bot was offline never triggered on_guild_join.
+        for guild_id in blacklisted:
+            guild = bot.get_guild(int(guild_id))
+            if guild:
+                logger.warning(f"[Blacklist] Found blacklisted guild '{guild.name}' ({guild.id}) at startup. Leaving.")
+                await guild.leave()
+        return self.result
+
+    def snapshot(self) -> dict:
+        return {"enabled": WARM_START, "max_rows": WARM_START_MAX_ROWS, "last": self.result}
+
+
+warm_start = WarmStart()
@@ -0,0 +1,119 @@
+import asyncio
+import contextvars
+import logging
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised by WorkQueue.submit when the queue is at its maximum depth."""
+
+
+class WorkQueue:
+    """
+    Bounded FIFO of coroutine jobs served by a fixed number of worker tasks.
+
+    Bounds both the number of jobs in flight (`workers`) and the number waiting
+    (`max_depth`), so a burst turns into a queue with backpressure instead of thousands of
+    concurrent outbound connections and pool acquires. Workers start on first submit.
+    """
+
+    def __init__(self, name: str, workers: int, max_depth: int):
+        self.name = name
+        self.worker_count = max(1, workers)
+        self.max_depth = max_depth
+        self._queue: asyncio.Queue | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._workers: list[asyncio.Task] = []
+        self._busy = 0
+        self._wait_times = deque(maxlen=1000)
+        self.processed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # First use, or a new event loop (tests/benchmarks): the old queue and workers are dead.
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._workers = []
+            self._busy = 0
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker(), name=f"{self.name}-worker-{i}")
+                for i in range(self.worker_count)
+            ]
+
+    def submit(self, job_factory) -> tuple[asyncio.Future, int]:
+        """
+        Queue `job_factory()` (a coroutine function) for a worker.
+
+        Returns (future, position): the future resolves with the job's result, and position is
+        the job's place in line — 0 means an idle worker picks it up immediately.
+        Raises QueueFullError when `max_depth` jobs are already waiting.
+        """
+        self._ensure_started()
+        if self._queue.qsize() >= self.max_depth:
+            self.rejected += 1
+            raise QueueFullError(f"{self.name} queue is full ({self.max_depth} waiting).")
+        future = self._loop.create_future()
+        # Run the job in the submitter's context so its tracing spans land on the right trace.
+        self._queue.put_nowait((job_factory, future, contextvars.copy_context(), time.monotonic()))
+        position = max(0, self._queue.qsize() - (len(self._workers) - self._busy))
+        return future, position
+
+    async def _worker(self):
+        while True:
+            job_factory, future, context, enqueued = await self._queue.get()
+            self._busy += 1
+            self._wait_times.append(time.monotonic() - enqueued)
+            try:
+                result = await asyncio.create_task(job_factory(), context=context)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                if asyncio.current_task().cancelling():
+                    raise  # the worker itself is being stopped
+                # Only the job was cancelled; keep serving the queue.
+                self.failed += 1
+                logger.warning(f"[{self.name}] Job was cancelled.")
+            except Exception as e:
+                self.failed += 1
+                logger.exception(f"[{self.name}] Job failed: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self.processed += 1
+                if not future.done():
+                    future.set_result(result)
+            finally:
+                self._busy -= 1
+                self._queue.task_done()
+
+    async def drain(self, timeout: float = 10.0):
+        """Wait for queued jobs to finish (bounded), then stop the workers."""
+        if self._queue is not None:
+            try:
+                await asyncio.wait_for(self._queue.join(), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"[{self.name}] Shutdown with {self._queue.qsize()} job(s) still queued.")
+        for task in self._workers:
+            task.cancel()
+        self._workers = []
+
+    def snapshot(self) -> dict:
+        waits = sorted(self._wait_times)
+        pick = lambda pct: round(waits[min(len(waits) - 1, int(len(waits) * pct))], 4) if waits else None
+        return {
+            "workers": self.worker_count,
+            "busy": self._busy,
+            "depth": self._queue.qsize() if self._queue else 0,
+            "max_depth": self.max_depth,
+            "processed": self.processed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "wait_seconds": {"p50": pick(0.5), "p95": pick(0.95), "max": pick(1.0)},
+        }